@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Stockage des adaptations dans une base SQLite embarquée (adaptations/adaptations.db), au lieu d'un fichier JSON par run.
+Index sur l'empreinte de l'annonce, l'entreprise, l'intitulé et la date : listing paginé, recherche et
+réutilisation d'une adaptation sont des requêtes indexées plutôt que des parcours de dossier.
+Mode WAL : lectures concurrentes pendant les écritures (plusieurs threads / workers).
+Le texte de l'annonce et les tweaks Gemini sont rangés dans le magasin d'artefacts (artefacts.py, dédupliqués par
+empreinte) ; la ligne ne garde que leurs empreintes, réhydratées par obtenir().
+"""
+
+import hashlib
+import json
+import re
+import secrets
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+ADAPTATIONS_DIR = BASE_DIR / "adaptations"
+DB_PATH = ADAPTATIONS_DIR / "adaptations.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS adaptations (
+    id TEXT PRIMARY KEY,
+    description_hash TEXT NOT NULL DEFAULT '',
+    entreprise TEXT NOT NULL DEFAULT '',
+    titre TEXT NOT NULL DEFAULT '',
+    cree_le TEXT NOT NULL,
+    source TEXT NOT NULL DEFAULT '',
+    score_global REAL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_adaptations_hash ON adaptations(description_hash);
+CREATE INDEX IF NOT EXISTS idx_adaptations_entreprise ON adaptations(entreprise COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_adaptations_titre ON adaptations(titre COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_adaptations_date ON adaptations(cree_le);
+"""
+
+# Fichiers de l'ancien format : adaptations/<AAAAMMJJHHMM>_<hash>.json (inbox.json, etc. ignorés)
+_RE_ANCIEN_FICHIER = re.compile(r"^\d{12}_[0-9a-f]{12}$")
+
+# Champs du payload déplacés dans le magasin d'artefacts
+_CHAMPS_TWEAKS = ("resume", "experiences", "mots_cles_cache", "poste_offre")
+
+_local = threading.local()
+
+
+def hash_description(description: str) -> str:
+    """Empreinte de l'annonce (sha256 du texte, 12 caractères), colonne indexée description_hash et partie des ids."""
+    return hashlib.sha256((description or "").strip().encode("utf-8")).hexdigest()[:12]
+
+
+def nouvel_id(description: str) -> str:
+    """
+    Identifiant d'une nouvelle adaptation : horodatage à la seconde + empreinte du texte + suffixe aléatoire
+    (AAAAMMJJHHMMSS_<hash>_<aléa>). La même annonce adaptée deux fois dans la même seconde donne deux lignes
+    distinctes (enregistrer fait un INSERT OR REPLACE sur l'id) ; l'empreinte reste cherchable par description_hash.
+    """
+    return f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{hash_description(description)}_{secrets.token_hex(3)}"
+
+
+def _connexion(path: Path | None = None) -> sqlite3.Connection:
+    """Connexion par thread (sqlite3 ne partage pas une connexion entre threads), schéma créé au premier accès."""
+    path = Path(path or DB_PATH)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(str(path))
+    if conn is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        conns[str(path)] = conn
+    return conn
+
+
+def _vers_artefacts(adaptation_id: str, payload: dict) -> dict:
+    """Remplace description et tweaks par leurs empreintes dans le magasin d'artefacts (référencés par l'adaptation)."""
+    import artefacts
+
+    payload = dict(payload)
+    proprietaire = f"adaptation:{adaptation_id}"
+    artefacts.dereferencer(proprietaire)
+    description = payload.pop("description", None)
+    if description:
+        payload.setdefault("description_hash", hash_description(description))
+        payload["description_blob"] = artefacts.stocker(
+            description, "text/plain; charset=utf-8", proprietaire=proprietaire, nom="annonce.txt"
+        )
+    tweaks = {k: payload.pop(k) for k in _CHAMPS_TWEAKS if k in payload}
+    if tweaks:
+        donnees = json.dumps(tweaks, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        payload["tweaks_blob"] = artefacts.stocker(donnees, "application/json", proprietaire=proprietaire, nom="tweaks.json")
+    return payload
+
+
+def _depuis_artefacts(payload: dict) -> dict:
+    """Réhydrate description et tweaks depuis le magasin d'artefacts."""
+    import artefacts
+
+    payload = dict(payload)
+    if payload.get("description_blob"):
+        description = artefacts.lire_texte(payload["description_blob"])
+        if description is not None:
+            payload["description"] = description
+    if payload.get("tweaks_blob"):
+        tweaks = artefacts.lire_texte(payload["tweaks_blob"])
+        if tweaks is not None:
+            payload.update(json.loads(tweaks))
+    return payload
+
+
+def enregistrer(adaptation_id: str, payload: dict, cree_le: str | None = None, path: Path | None = None) -> str:
+    """Insère (ou remplace) une adaptation. payload : resume, experiences, mots_cles_cache, rapport, source, description, …"""
+    conn = _connexion(path)
+    payload = _vers_artefacts(adaptation_id, payload)
+    rapport = payload.get("rapport") or {}
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO adaptations (id, description_hash, entreprise, titre, cree_le, source, score_global, payload)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                adaptation_id,
+                payload.get("description_hash") or "",
+                (payload.get("entreprise") or "").strip(),
+                (payload.get("titre") or "").strip(),
+                cree_le or datetime.utcnow().isoformat(timespec="seconds"),
+                payload.get("source") or "",
+                rapport.get("score_global") if isinstance(rapport, dict) else None,
+                json.dumps(payload, ensure_ascii=False, separators=(",", ":")),
+            ),
+        )
+    return adaptation_id
+
+
+def supprimer(adaptation_id: str, path: Path | None = None) -> bool:
+    """Supprime une adaptation ; ses artefacts deviennent collectables (artefacts.gc) s'ils ne servent plus ailleurs."""
+    import artefacts
+
+    conn = _connexion(path)
+    with conn:
+        n = conn.execute("DELETE FROM adaptations WHERE id = ?", (adaptation_id,)).rowcount
+    artefacts.dereferencer(f"adaptation:{adaptation_id}")
+    return bool(n)
+
+
+def _ligne(row: sqlite3.Row, avec_payload: bool) -> dict:
+    d = {k: row[k] for k in ("id", "description_hash", "entreprise", "titre", "cree_le", "source", "score_global")}
+    if avec_payload:
+        d["payload"] = _depuis_artefacts(json.loads(row["payload"]))
+    return d
+
+
+def obtenir(adaptation_id: str, path: Path | None = None) -> dict | None:
+    """Adaptation complète (métadonnées + payload) ou None."""
+    row = _connexion(path).execute("SELECT * FROM adaptations WHERE id = ?", (adaptation_id,)).fetchone()
+    return _ligne(row, True) if row else None
+
+
+def derniere_par_description(description: str, path: Path | None = None) -> dict | None:
+    """Adaptation la plus récente pour la même annonce (lookup indexé sur l'empreinte)."""
+    row = _connexion(path).execute(
+        "SELECT * FROM adaptations WHERE description_hash = ? ORDER BY cree_le DESC LIMIT 1",
+        (hash_description(description),),
+    ).fetchone()
+    return _ligne(row, True) if row else None
+
+
+def rechercher(
+    q: str = "",
+    entreprise: str = "",
+    titre: str = "",
+    description_hash: str = "",
+    depuis: str = "",
+    jusqua: str = "",
+    page: int = 1,
+    par_page: int = 20,
+    path: Path | None = None,
+) -> dict:
+    """
+    Listing paginé, du plus récent au plus ancien. entreprise / titre : préfixe (insensible à la casse, indexé) ;
+    q : texte libre sur entreprise ou titre ; depuis / jusqua : dates ISO (AAAA-MM-JJ).
+    Retourne { total, page, par_page, resultats: [ métadonnées sans payload ] }.
+    """
+    clauses, params = [], []
+    if entreprise:
+        clauses.append("entreprise LIKE ? COLLATE NOCASE")
+        params.append(f"{entreprise}%")
+    if titre:
+        clauses.append("titre LIKE ? COLLATE NOCASE")
+        params.append(f"{titre}%")
+    if q:
+        clauses.append("(entreprise LIKE ? COLLATE NOCASE OR titre LIKE ? COLLATE NOCASE)")
+        params.extend([f"%{q}%", f"%{q}%"])
+    if description_hash:
+        clauses.append("description_hash = ?")
+        params.append(description_hash)
+    if depuis:
+        clauses.append("cree_le >= ?")
+        params.append(depuis)
+    if jusqua:
+        clauses.append("cree_le < ?")
+        params.append(jusqua)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    page = max(1, int(page))
+    par_page = max(1, min(int(par_page), 200))
+    conn = _connexion(path)
+    total = conn.execute(f"SELECT COUNT(*) FROM adaptations{where}", params).fetchone()[0]
+    rows = conn.execute(
+        f"SELECT id, description_hash, entreprise, titre, cree_le, source, score_global FROM adaptations{where}"
+        " ORDER BY cree_le DESC LIMIT ? OFFSET ?",
+        params + [par_page, (page - 1) * par_page],
+    ).fetchall()
+    return {"total": total, "page": page, "par_page": par_page, "resultats": [_ligne(r, False) for r in rows]}
+
+
+def descriptions(path: Path | None = None) -> list[str]:
+    """Textes d'annonces stockés (description complète, sinon description_preview)."""
+    textes = []
+    for (payload,) in _connexion(path).execute("SELECT payload FROM adaptations"):
+        data = json.loads(payload)
+        texte = ""
+        if data.get("description_blob"):
+            import artefacts
+            texte = artefacts.lire_texte(data["description_blob"]) or ""
+        texte = texte or data.get("description_preview") or ""
+        if texte.strip():
+            textes.append(texte)
+    return textes
+
+
+def importer_json(dossier: Path | None = None, path: Path | None = None) -> int:
+    """Import unique des anciens fichiers adaptations/<AAAAMMJJHHMM>_<hash>.json. Retourne le nombre importé."""
+    dossier = Path(dossier or ADAPTATIONS_DIR)
+    n = 0
+    for p in sorted(dossier.glob("*.json")) if dossier.is_dir() else []:
+        if not _RE_ANCIEN_FICHIER.match(p.stem):
+            continue
+        try:
+            payload = json.loads(p.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if not isinstance(payload, dict):
+            continue
+        horodatage, _, suffixe = p.stem.partition("_")
+        cree_le = datetime.strptime(horodatage, "%Y%m%d%H%M").isoformat(timespec="seconds")
+        if not payload.get("description"):
+            payload = {**payload, "description_hash": suffixe}
+        enregistrer(p.stem, payload, cree_le=cree_le, path=path)
+        n += 1
+    return n
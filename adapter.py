@@ -20,6 +20,15 @@ except ImportError:
 
 import os
 
+from mesures import etape
+from telemetrie_llm import appel as appel_llm
+
+# Fan-out (opt-in) : nombre d'expériences par requête et nombre max de requêtes Gemini simultanées
+FAN_OUT_TAILLE_GROUPE = int(os.environ.get("CV_BOT_FAN_OUT_GROUPE", "1") or 1)
+FAN_OUT_MAX_CONCURRENCE = int(os.environ.get("CV_BOT_FAN_OUT_CONCURRENCE", "4") or 4)
+
+MODEL_ID = "gemini-2.5-flash"
+PROMPT_JSON_INVALIDE = "Ta réponse précédente n'était pas un JSON valide. Retourne UNIQUEMENT l'objet JSON demandé, rien d'autre.\n\n"
 
 # Prompt système strict : cadrer Gemini pour qu'il ne retourne que le schéma autorisé
 SYSTEM_PROMPT = """Tu es un expert en rédaction de CV et en ATS (systèmes de suivi de candidatures).
@@ -50,35 +59,53 @@ Format de sortie : UNIQUEMENT un objet JSON, sans markdown, sans commentaire, sa
 """
 
 
-def _build_user_prompt(cv_base: dict, offre: dict, rapport: dict | None) -> str:
-    """Construit le prompt utilisateur : extrait minimal du CV (resume + exp avec id + bullet_points) + offre."""
-    experiences_input = []
-    for exp in cv_base.get("experiences", []):
-        experiences_input.append({
+def _experiences_input(experiences: list) -> list:
+    """Extrait minimal des expériences pour le prompt (id, poste, entreprise, bullet_points)."""
+    return [
+        {
             "id": exp.get("id", ""),
             "poste": exp.get("poste", ""),
             "entreprise": exp.get("entreprise", ""),
             "bullet_points": exp.get("bullet_points", []),
-        })
+        }
+        for exp in experiences
+    ]
 
+
+def _offre_context(offre: dict) -> str:
+    """Bloc <offre_emploi> partagé par le prompt complet et les prompts de fan-out."""
     mots = ", ".join(offre.get("mots_cles_extraits") or [])
     comp = ", ".join(offre.get("competences_requises") or [])
-
     return f"""<offre_emploi>
 <titre>{offre.get("titre", "")}</titre>
 <entreprise>{offre.get("entreprise", "")}</entreprise>
 <mots_cles_prioritaires>{mots}</mots_cles_prioritaires>
 <competences_requises>{comp}</competences_requises>
 <description_extrait>{ (offre.get("description_brute") or "")[:4000] }</description_extrait>
-</offre_emploi>
+</offre_emploi>"""
 
-<cv_source_resume>
+
+def _fragment_cv(cv_base: dict) -> str:
+    """Extrait minimal du CV pour le prompt complet (resume + exp avec id + bullet_points)."""
+    experiences_input = _experiences_input(cv_base.get("experiences", []))
+    return f"""<cv_source_resume>
 {json.dumps(cv_base.get("resume", ""), ensure_ascii=False)}
 </cv_source_resume>
 
 <cv_source_experiences>
 {json.dumps(experiences_input, ensure_ascii=False, indent=2)}
-</cv_source_experiences>
+</cv_source_experiences>"""
+
+
+def _build_user_prompt(cv_base: dict, offre: dict, rapport: dict | None) -> str:
+    """Construit le prompt utilisateur : extrait minimal du CV + offre. Fragment CV précalculé si cv_base vient du cache."""
+    from cv_base_cache import instantane_de
+    instantane = instantane_de(cv_base)
+    fragment = instantane.fragment_prompt if instantane is not None else _fragment_cv(cv_base)
+
+    return f"""{_offre_context(offre)}
+
+{fragment}
 
 <instructions>
 À partir du CV source ci-dessus et de l'offre :
@@ -120,52 +147,60 @@ def _extract_json(text: str) -> dict | None:
     return None
 
 
-def adapter_cv(cv_base: dict, offre: dict, rapport: dict | None = None, retry_invalide: bool = True) -> dict:
-    """
-    Appelle Gemini pour produire uniquement les tweaks (resume, bullet_points par id, mots_cles_cache).
-    Ne modifie pas cv_base. Retourne un dict : { "resume", "experiences": [ { "id", "bullet_points" } ], "mots_cles_cache" }.
-    """
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        raise RuntimeError("GEMINI_API_KEY manquante. Ajoutez-la dans le fichier .env.")
+def _build_entete_prompt(cv_base: dict, offre: dict) -> str:
+    """Prompt fan-out pour la partie « en-tête » : resume, mots_cles_cache, poste_offre (sans les expériences)."""
+    return f"""{_offre_context(offre)}
 
-    try:
-        from google import genai
-        from google.genai import types
-    except ImportError:
-        raise ImportError("pip install google-genai")
+<cv_source_resume>
+{json.dumps(cv_base.get("resume", ""), ensure_ascii=False)}
+</cv_source_resume>
+
+<instructions>
+À partir du résumé source ci-dessus et de l'offre :
 
-    client = genai.Client(api_key=api_key)
-    model_id = "gemini-2.5-flash"
-    config = types.GenerateContentConfig(temperature=0.2)
-
-    user_prompt = _build_user_prompt(cv_base, offre, rapport)
-    exp_ids = [e.get("id") for e in cv_base.get("experiences", [])]
-
-    def _call(prompt: str) -> str:
-        full_prompt = SYSTEM_PROMPT.strip() + "\n\n---\n\n" + prompt
-        r = client.models.generate_content(
-            model=model_id,
-            contents=full_prompt,
-            config=config,
-        )
-        if not r or not getattr(r, "text", None):
-            raise ValueError("Réponse Gemini vide")
-        return r.text
-
-    raw = _call(user_prompt)
-    tweaks = _extract_json(raw)
-
-    if tweaks is None and retry_invalide:
-        raw = _call(
-            "Ta réponse précédente n'était pas un JSON valide. Retourne UNIQUEMENT l'objet JSON demandé, rien d'autre.\n\n" + user_prompt,
-        )
-        tweaks = _extract_json(raw or "")
+1. Réécris le résumé (resume) en 2-3 phrases en intégrant le titre du poste visé et des mots-clés exacts de l'offre. Ne invente aucun fait.
+2. Remplis mots_cles_cache avec une seule chaîne de caractères contenant des mots-clés et courtes expressions de l'annonce (séparés par des espaces).
+3. Extrais de l'annonce l'intitulé exact du poste et mets-le dans poste_offre (chaîne, telle qu'écrite dans l'offre).
 
-    if tweaks is None:
-        raise ValueError("Impossible d'extraire un JSON valide de la réponse Gemini.")
+Retourne UNIQUEMENT un JSON avec exactement cette structure (pas d'autre clé, pas de clé experiences) :
+{{
+  "resume": "ton résumé réécrit",
+  "mots_cles_cache": "mot1 mot2 expression courte ...",
+  "poste_offre": "intitulé du poste tel qu'écrit dans l'annonce"
+}}
+</instructions>"""
 
-    # Valider et normaliser le format
+
+def _build_experiences_prompt(experiences: list, offre: dict) -> str:
+    """Prompt fan-out pour un petit groupe d'expériences : uniquement leurs bullet_points."""
+    experiences_input = _experiences_input(experiences)
+    return f"""{_offre_context(offre)}
+
+<cv_source_experiences>
+{json.dumps(experiences_input, ensure_ascii=False, indent=2)}
+</cv_source_experiences>
+
+<instructions>
+Pour chaque expérience ci-dessus, réécris les bullet_points en restant FIDÈLE au contenu original. Si un critère du poste n'est pas déjà décrit dans le bullet, ne prétends pas que la personne l'a fait ; utilise plutôt des tournures comme « pertinent pour un rôle en… », « atout pour… ». Insère un mot-clé de l'offre seulement s'il correspond au contenu original. Maximum 3 bullet points par expérience. Garde les mêmes ids.
+
+Retourne UNIQUEMENT un JSON avec exactement cette structure (pas d'autre clé) :
+{{
+  "experiences": [
+    {{ "id": "exp_1", "bullet_points": ["...", "...", "..."] }}
+  ]
+}}
+</instructions>"""
+
+
+def _fan_out_active(fan_out: bool | None) -> bool:
+    """fan_out explicite, sinon variable d'environnement CV_BOT_FAN_OUT (désactivé par défaut)."""
+    if fan_out is not None:
+        return fan_out
+    return os.environ.get("CV_BOT_FAN_OUT", "").strip().lower() in ("1", "true", "oui", "yes")
+
+
+def _normaliser_tweaks(tweaks: dict, cv_base: dict, offre: dict) -> dict:
+    """Complète les clés manquantes et aligne les expériences sur les ids de cv_base (max 3 bullets, originaux en repli)."""
     if "resume" not in tweaks:
         tweaks["resume"] = cv_base.get("resume", "")
     if "experiences" not in tweaks or not isinstance(tweaks["experiences"], list):
@@ -176,35 +211,230 @@ def adapter_cv(cv_base: dict, offre: dict, rapport: dict | None = None, retry_in
         tweaks["poste_offre"] = (offre.get("titre") or "").strip()
 
     # S'assurer que les ids correspondent et qu'on a au plus 3 bullet points par exp
-    by_id = {t["id"]: t for t in tweaks["experiences"] if t.get("id")}
+    from cv_base_cache import instantane_de
+    instantane = instantane_de(cv_base)
+    exp_ids = instantane.ids if instantane is not None else [e.get("id") for e in cv_base.get("experiences", [])]
+    originaux = {}
+    for exp in cv_base.get("experiences", []):
+        originaux.setdefault(exp.get("id"), exp)
+    by_id = {t["id"]: t for t in tweaks["experiences"] if isinstance(t, dict) and t.get("id")}
     out_experiences = []
     for eid in exp_ids:
         t = by_id.get(eid, {})
         bullets = (t.get("bullet_points") or [])[:3]
         # Si Gemini n'a pas renvoyé cette exp, garder les originaux (limités à 3)
-        if not bullets:
-            for exp in cv_base.get("experiences", []):
-                if exp.get("id") == eid:
-                    bullets = (exp.get("bullet_points") or [])[:3]
-                    break
+        if not bullets and eid in originaux:
+            bullets = (originaux[eid].get("bullet_points") or [])[:3]
         out_experiences.append({"id": eid, "bullet_points": bullets})
     tweaks["experiences"] = out_experiences
+    return tweaks
 
+
+def _prompts_fan_out(cv_base: dict, offre: dict, taille_groupe: int) -> list[str]:
+    """Prompt en-tête puis un prompt par groupe de taille_groupe expériences."""
+    experiences = cv_base.get("experiences", [])
+    taille_groupe = max(1, taille_groupe)
+    groupes = [experiences[i:i + taille_groupe] for i in range(0, len(experiences), taille_groupe)]
+    return [_build_entete_prompt(cv_base, offre)] + [_build_experiences_prompt(g, offre) for g in groupes]
+
+
+def _fusionner_sections(resultats: list) -> dict:
+    """
+    Assemble les réponses [(json, erreur)] des sections. Lève l'erreur si toutes ont échoué, ValueError si aucune
+    section n'a renvoyé de JSON exploitable (même comportement que l'appel unique : repli / nouvel essai).
+    """
+    if not any(isinstance(partiel, dict) for partiel, _ in resultats):
+        erreurs = [e for _, e in resultats if e is not None]
+        if erreurs:
+            raise erreurs[0]
+        raise ValueError("Impossible d'extraire un JSON valide de la réponse Gemini.")
+
+    entete = resultats[0][0] if isinstance(resultats[0][0], dict) else {}
+    tweaks = {k: entete[k] for k in ("resume", "mots_cles_cache", "poste_offre") if k in entete}
+    tweaks["experiences"] = []
+    for partiel, _ in resultats[1:]:
+        if isinstance(partiel, dict) and isinstance(partiel.get("experiences"), list):
+            tweaks["experiences"].extend(partiel["experiences"])
     return tweaks
 
 
+def _adapter_fan_out(call_json, cv_base: dict, offre: dict, taille_groupe: int, max_concurrence: int) -> dict:
+    """
+    Lance en parallèle (au plus max_concurrence requêtes) : une requête en-tête (resume, mots_cles_cache,
+    poste_offre) puis une requête par groupe de taille_groupe expériences. Une section en échec est
+    simplement omise : _normaliser_tweaks retombe alors sur les originaux. Lève l'erreur si tout a échoué.
+    """
+    import contextvars
+    from concurrent.futures import ThreadPoolExecutor
+
+    prompts = _prompts_fan_out(cv_base, offre, taille_groupe)
+
+    def _section(prompt: str):
+        try:
+            return call_json(prompt), None
+        except Exception as e:
+            return None, e
+
+    # Chaque thread du pool reçoit une copie du contexte : les étapes mesurées y restent attribuées à la requête
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrence, len(prompts)))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, _section, p) for p in prompts]
+        resultats = [f.result() for f in futures]
+    return _fusionner_sections(resultats)
+
+
+async def _adapter_fan_out_async(call_json, cv_base: dict, offre: dict, taille_groupe: int, max_concurrence: int) -> dict:
+    """Version asyncio de _adapter_fan_out : sections concurrentes sur la boucle, sans thread par requête."""
+    import asyncio
+
+    prompts = _prompts_fan_out(cv_base, offre, taille_groupe)
+    semaphore = asyncio.Semaphore(max(1, max_concurrence))
+
+    async def _section(prompt: str):
+        async with semaphore:
+            try:
+                return await call_json(prompt), None
+            except Exception as e:
+                return None, e
+
+    resultats = await asyncio.gather(*(_section(p) for p in prompts))
+    return _fusionner_sections(list(resultats))
+
+
+def _client_gemini(timeout_s: float | None = None):
+    """
+    (client, config) Gemini pour l'adaptation. timeout_s : délai de chaque requête HTTP (annulée au-delà).
+    Lève RuntimeError / ImportError si la clé ou le SDK manque.
+    """
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        raise RuntimeError("GEMINI_API_KEY manquante. Ajoutez-la dans le fichier .env.")
+
+    try:
+        from google import genai
+        from google.genai import types
+    except ImportError:
+        raise ImportError("pip install google-genai")
+
+    http_options = types.HttpOptions(timeout=max(1, int(timeout_s * 1000))) if timeout_s else None
+    return genai.Client(api_key=api_key, http_options=http_options), types.GenerateContentConfig(temperature=0.2)
+
+
+def _prompt_complet(prompt: str) -> str:
+    return SYSTEM_PROMPT.strip() + "\n\n---\n\n" + prompt
+
+
+def _texte_reponse(r) -> str:
+    if not r or not getattr(r, "text", None):
+        raise ValueError("Réponse Gemini vide")
+    return r.text
+
+
+def adapter_cv(
+    cv_base: dict,
+    offre: dict,
+    rapport: dict | None = None,
+    retry_invalide: bool = True,
+    fan_out: bool | None = None,
+    max_concurrence: int = FAN_OUT_MAX_CONCURRENCE,
+    taille_groupe: int = FAN_OUT_TAILLE_GROUPE,
+    budget_s: float | None = None,
+) -> dict:
+    """
+    Appelle Gemini pour produire uniquement les tweaks (resume, bullet_points par id, mots_cles_cache).
+    Ne modifie pas cv_base. Retourne un dict : { "resume", "experiences": [ { "id", "bullet_points" } ], "mots_cles_cache" }.
+    fan_out=True (ou CV_BOT_FAN_OUT=1) découpe l'adaptation en requêtes concurrentes plus courtes (en-tête + groupes
+    d'expériences) : la latence tend vers celle de la section la plus lente.
+    budget_s : délai total ; chaque requête HTTP est annulée au-delà (timeout du client) et aucune requête
+    (nouvel essai JSON) n'est lancée une fois le délai écoulé. Lève TimeoutError.
+    """
+    import time
+
+    client, config = _client_gemini(timeout_s=budget_s)
+    operation = "adaptation.section" if _fan_out_active(fan_out) else "adaptation"
+    echeance = time.monotonic() + budget_s if budget_s else None
+
+    def _call(prompt: str, tentative: int = 0) -> str:
+        if echeance is not None and time.monotonic() >= echeance:
+            raise TimeoutError(f"Gemini au-delà du budget de {budget_s:g} s")
+        with etape("gemini"), appel_llm(operation, MODEL_ID, offre.get("description_brute", ""), tentative) as a:
+            a.reponse = client.models.generate_content(model=MODEL_ID, contents=_prompt_complet(prompt), config=config)
+            return _texte_reponse(a.reponse)
+
+    def _call_json(prompt: str) -> dict | None:
+        parsed = _extract_json(_call(prompt))
+        if parsed is None and retry_invalide:
+            parsed = _extract_json(_call(PROMPT_JSON_INVALIDE + prompt, tentative=1) or "")
+        return parsed
+
+    if _fan_out_active(fan_out):
+        tweaks = _adapter_fan_out(_call_json, cv_base, offre, taille_groupe, max_concurrence)
+    else:
+        tweaks = _call_json(_build_user_prompt(cv_base, offre, rapport))
+
+    if tweaks is None:
+        raise ValueError("Impossible d'extraire un JSON valide de la réponse Gemini.")
+
+    # Valider et normaliser le format
+    return _normaliser_tweaks(tweaks, cv_base, offre)
+
+
+async def adapter_cv_async(
+    cv_base: dict,
+    offre: dict,
+    rapport: dict | None = None,
+    retry_invalide: bool = True,
+    fan_out: bool | None = None,
+    max_concurrence: int = FAN_OUT_MAX_CONCURRENCE,
+    taille_groupe: int = FAN_OUT_TAILLE_GROUPE,
+) -> dict:
+    """
+    Version asyncio de adapter_cv (client Gemini asynchrone client.aio) : mêmes prompts, même résultat.
+    Un seul processus / thread peut garder des dizaines d'adaptations en vol (lot CLI, fan-out dans une requête).
+    """
+    client, config = _client_gemini()
+    operation = "adaptation.section" if _fan_out_active(fan_out) else "adaptation"
+
+    async def _call(prompt: str, tentative: int = 0) -> str:
+        with etape("gemini"), appel_llm(operation, MODEL_ID, offre.get("description_brute", ""), tentative) as a:
+            a.reponse = await client.aio.models.generate_content(model=MODEL_ID, contents=_prompt_complet(prompt), config=config)
+            return _texte_reponse(a.reponse)
+
+    async def _call_json(prompt: str) -> dict | None:
+        parsed = _extract_json(await _call(prompt))
+        if parsed is None and retry_invalide:
+            parsed = _extract_json(await _call(PROMPT_JSON_INVALIDE + prompt, tentative=1) or "")
+        return parsed
+
+    if _fan_out_active(fan_out):
+        tweaks = await _adapter_fan_out_async(_call_json, cv_base, offre, taille_groupe, max_concurrence)
+    else:
+        tweaks = await _call_json(_build_user_prompt(cv_base, offre, rapport))
+
+    if tweaks is None:
+        raise ValueError("Impossible d'extraire un JSON valide de la réponse Gemini.")
+    return _normaliser_tweaks(tweaks, cv_base, offre)
+
+
 def apply_tweaks_to_cv(cv_base: dict, tweaks: dict) -> dict:
-    """Fusionne cv_base avec les tweaks (resume, bullet_points, mots_cles_cache, titre_professionnel). Ne modifie pas cv_base."""
-    from copy import deepcopy
-    merged = deepcopy(cv_base)
+    """
+    Fusionne cv_base avec les tweaks (resume, bullet_points, mots_cles_cache, titre_professionnel). Ne modifie pas cv_base.
+    Fusion par partage de structure (copy-on-write) : seuls le dict racine, la liste des expériences et les expériences
+    modifiées sont recréés ; formations, compétences, expériences inchangées, etc. sont partagées avec cv_base.
+    Le résultat sérialise en JSON exactement comme une copie profonde, mais ne doit pas être muté en profondeur.
+    """
+    merged = dict(cv_base)
     merged["resume"] = tweaks.get("resume", merged.get("resume", ""))
     merged["mots_cles_cache"] = tweaks.get("mots_cles_cache", "")
     poste_offre = str(tweaks.get("poste_offre") or "").strip()
     if poste_offre:
         merged["titre_professionnel"] = f"Étudiant ESSEC - {poste_offre}"
     by_id = {t["id"]: t for t in tweaks.get("experiences", []) if t.get("id")}
-    for exp in merged.get("experiences", []):
-        eid = exp.get("id")
-        if eid and eid in by_id:
-            exp["bullet_points"] = by_id[eid].get("bullet_points", exp.get("bullet_points", []))
+    if "experiences" in cv_base:
+        experiences = []
+        for exp in cv_base.get("experiences") or []:
+            eid = exp.get("id")
+            if eid and eid in by_id:
+                exp = {**exp, "bullet_points": by_id[eid].get("bullet_points", exp.get("bullet_points", []))}
+            experiences.append(exp)
+        merged["experiences"] = experiences
     return merged
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Adaptation locale déterministe (sans IA) : construit un dict de tweaks valide en quelques millisecondes
+à partir du rapport de rules.appliquer_regles et des mots-clés extraits de l'offre.
+Même format que adapter.adapter_cv : { resume, experiences: [ { id, bullet_points } ], mots_cles_cache, poste_offre }.
+Sert de brouillon instantané et de repli quand Gemini est indisponible ou trop lent.
+"""
+
+import os
+import re
+
+from normalisation import normaliser_terme, tokens_normalises
+from rules import _formes_normalisees, _mots_offre, _present
+
+# Budget de latence (secondes) accordé à Gemini avant de servir le brouillon local ; 0 = pas de limite
+LLM_BUDGET_S = float(os.environ.get("CV_BOT_LLM_BUDGET_S", "0") or 0)
+
+_RE_INTITULE = re.compile(r"^\s*(?:intitulé(?: du poste)?|poste|job title|titre du poste)\s*[:\-–]\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+_RE_ENTREPRISE = re.compile(r"^\s*(?:entreprise|société|employeur|company)\s*[:\-–]\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+
+
+def _mots_presents(texte: str, mots_offre: set) -> list[str]:
+    """Mots-clés de l'offre présents dans le texte, comparés sur leurs formes normalisées."""
+    tokens = tokens_normalises(texte)
+    tokens_set, texte_norm = set(tokens), f" {' '.join(tokens)} "
+    return [m for f, m in _formes_normalisees(mots_offre).items() if _present(f, tokens_set, texte_norm)]
+
+
+def _densite(bullet: str, mots_offre: set) -> float:
+    """Densité de mots-clés : nombre de mots-clés de l'offre présents / nombre de mots du bullet."""
+    n = len(tokens_normalises(bullet))
+    if not n:
+        return 0.0
+    return len(_mots_presents(bullet, mots_offre)) / n
+
+
+def _trier_bullets(bullets: list, mots_offre: set) -> list:
+    """Bullets non vides triés par densité décroissante (tri stable : l'ordre d'origine départage), max 3."""
+    bullets = [b for b in bullets or [] if isinstance(b, str) and b.strip()]
+    return sorted(bullets, key=lambda b: -_densite(b, mots_offre))[:3]
+
+
+def _poste_offre(offre: dict) -> str:
+    """Intitulé du poste : titre fourni, sinon ligne « Poste : … » de l'annonce, sinon première ligne courte."""
+    titre = (offre.get("titre") or "").strip()
+    if titre:
+        return titre
+    description = offre.get("description_brute") or ""
+    m = _RE_INTITULE.search(description)
+    if m:
+        return m.group(1).strip()[:100]
+    for ligne in description.splitlines():
+        ligne = ligne.strip(" \t#*-•")
+        if ligne:
+            if len(ligne) <= 80 and not ligne.endswith("."):
+                return ligne
+            break
+    return ""
+
+
+def _entreprise_offre(offre: dict) -> str:
+    """Entreprise : champ fourni, sinon ligne « Entreprise : … » (ou Société / Employeur / Company) de l'annonce, sinon ""."""
+    entreprise = (offre.get("entreprise") or "").strip()
+    if entreprise:
+        return entreprise
+    m = _RE_ENTREPRISE.search(offre.get("description_brute") or "")
+    return m.group(1).strip()[:100] if m else ""
+
+
+def _resume_template(cv_base: dict, poste: str, mots_cv: list[str]) -> str:
+    """Résumé en 2 phrases : première phrase du résumé source + phrase de lien vers le poste (sans inventer)."""
+    resume = (cv_base.get("resume") or "").strip()
+    phrases = re.split(r"(?<=[.!?])\s+", resume) if resume else []
+    debut = phrases[0] if phrases else (cv_base.get("titre_professionnel") or "").strip()
+    lien = f"Profil pertinent pour un poste de {poste}" if poste else "Profil pertinent pour ce poste"
+    if mots_cv:
+        lien += f", avec des compétences en {', '.join(mots_cv[:4])}"
+    lien += "."
+    return f"{debut} {lien}".strip() if debut else lien
+
+
+def adapter_cv_local(cv_base: dict, offre: dict, rapport: dict | None = None) -> dict:
+    """
+    Tweaks déterministes (pas d'appel réseau) : bullets réordonnés par densité de mots-clés,
+    mots_cles_cache = mots-clés extraits, poste_offre tiré de l'offre, résumé à partir d'un template.
+    Ne modifie pas cv_base.
+    """
+    mots_offre = _mots_offre(offre)
+    mots_extraits = [m for m in (offre.get("mots_cles_extraits") or []) if isinstance(m, str)]
+    manquants = set((rapport or {}).get("mots_cles_manquants") or [])
+
+    experiences = []
+    textes_cv = [cv_base.get("resume") or ""]
+    for exp in cv_base.get("experiences", []):
+        bullets = exp.get("bullet_points") or []
+        experiences.append({"id": exp.get("id"), "bullet_points": _trier_bullets(bullets, mots_offre) or bullets[:3]})
+        textes_cv.extend(b for b in bullets if isinstance(b, str))
+        textes_cv.extend(m for m in exp.get("mots_cles") or [] if isinstance(m, str))
+
+    # Mots-clés de l'offre réellement présents dans le CV, dans l'ordre de priorité de l'extraction
+    presents = {normaliser_terme(m) for m in _mots_presents(" ".join(textes_cv), set(mots_extraits))}
+    mots_cv = []
+    for m in mots_extraits:
+        if normaliser_terme(m) in presents and m not in manquants:
+            # Éviter les redites (« gestion de » quand « gestion de projet » est déjà retenu)
+            if not any(m in deja or deja in m for deja in mots_cv):
+                mots_cv.append(m)
+
+    poste = _poste_offre(offre)
+    return {
+        "resume": _resume_template(cv_base, poste, mots_cv),
+        "experiences": experiences,
+        "mots_cles_cache": " ".join(dict.fromkeys(mots_extraits)),
+        "poste_offre": poste,
+    }
+
+
+def adapter_avec_repli(
+    cv_base: dict,
+    offre: dict,
+    rapport: dict | None = None,
+    budget_s: float | None = None,
+    **kwargs,
+) -> tuple[dict, str, str | None]:
+    """
+    Appelle adapter.adapter_cv ; en cas d'indisponibilité (clé absente, module manquant, erreur) ou de dépassement
+    de budget_s secondes (défaut CV_BOT_LLM_BUDGET_S, 0 = illimité), retourne le brouillon local.
+    Le budget est le délai des requêtes HTTP du client Gemini : une requête trop longue est annulée, pas abandonnée
+    dans un thread (ni quota consommé jusqu'au bout, ni threads orphelins sous charge).
+    Retourne (tweaks, source, erreur) avec source = "llm" ou "regles" et erreur = raison du repli (ou None).
+    """
+    import time
+
+    from adapter import adapter_cv
+
+    budget = LLM_BUDGET_S if budget_s is None else budget_s
+    budget = budget if budget and budget > 0 else None
+    debut = time.monotonic()
+    try:
+        return adapter_cv(cv_base, offre, rapport, budget_s=budget, **kwargs), "llm", None
+    except Exception as e:
+        # Délai du client HTTP (exception propre au SDK) ou échéance atteinte avant un nouvel essai
+        if budget is not None and (isinstance(e, TimeoutError) or time.monotonic() - debut >= budget):
+            return adapter_cv_local(cv_base, offre, rapport), "regles", f"Gemini au-delà du budget de {budget:g} s"
+        return adapter_cv_local(cv_base, offre, rapport), "regles", str(e)
+
+
+async def adapter_avec_repli_async(
+    cv_base: dict,
+    offre: dict,
+    rapport: dict | None = None,
+    budget_s: float | None = None,
+    **kwargs,
+) -> tuple[dict, str, str | None]:
+    """
+    Version asyncio de adapter_avec_repli (adapter.adapter_cv_async). Au-delà du budget, l'appel Gemini
+    est réellement annulé (pas de thread laissé en attente). Retourne (tweaks, source, erreur).
+    """
+    import asyncio
+
+    from adapter import adapter_cv_async
+
+    budget = LLM_BUDGET_S if budget_s is None else budget_s
+    try:
+        appel = adapter_cv_async(cv_base, offre, rapport, **kwargs)
+        if budget and budget > 0:
+            try:
+                return await asyncio.wait_for(appel, timeout=budget), "llm", None
+            except asyncio.TimeoutError:
+                return adapter_cv_local(cv_base, offre, rapport), "regles", f"Gemini au-delà du budget de {budget:g} s"
+        return await appel, "llm", None
+    except Exception as e:
+        return adapter_cv_local(cv_base, offre, rapport), "regles", str(e)
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Sessions d'aperçu incrémental : le serveur garde l'état courant du CV, le client n'envoie plus que des deltas.
+- creer(cv, base_cv, surligner) : rend le CV complet une fois et mémorise ses fragments (en-tête et chaque <section id>).
+- modifier(sid, version, patch) : applique un JSON Patch (RFC 6902) au CV, rend, et ne renvoie que les fragments
+  dont le HTML a changé ({ id: html }) — quelques centaines d'octets au lieu du CV complet dans les deux sens.
+  Si la structure change (section apparue / disparue, photo, en-tête du document), "complet": true : recharger.
+- suivre(sid) : flux des changements pour un abonné Server-Sent Events (GET /api/apercu/<id>/flux). Désactivé par
+  défaut : chaque flux ouvert occupe un thread de worker ; FLUX_MAX flux simultanés au plus par processus, fermés
+  après FLUX_DUREE_S (le navigateur se reconnecte). La réponse du PATCH suffit pour l'onglet qui modifie.
+Sessions stockées dans adaptations/apercu/<id>.json (partagées entre workers gunicorn), supprimées après
+APERCU_TTL_S sans modification. Le rendu lui-même est fourni par l'appelant (app._render_cv_html).
+"""
+
+import copy
+import hashlib
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from pathlib import Path
+
+from verrous import signature, verrou_fichier
+
+BASE_DIR = Path(__file__).resolve().parent
+APERCU_DIR = BASE_DIR / "adaptations" / "apercu"
+APERCU_TTL_S = float(os.environ.get("CV_BOT_APERCU_TTL_S", "7200") or 7200)
+FLUX_MAX = int(os.environ.get("CV_BOT_APERCU_FLUX_MAX", "0") or 0)
+FLUX_DUREE_S = float(os.environ.get("CV_BOT_APERCU_FLUX_DUREE_S", "600") or 600)
+
+# Blocs remplaçables de template.html : éléments <header> / <section> portant un id (non imbriqués)
+_RE_FRAGMENT = re.compile(r'<(section|header)\b[^>]*\bid="([^"]+)"[^>]*>.*?</\1>', re.DOTALL)
+_RE_ID_SESSION = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+# Réveille les flux SSE de ce processus dès qu'une session change (les autres workers sont vus par scrutation)
+_changement = threading.Condition()
+_flux_ouverts = 0
+_flux_lock = threading.Lock()
+
+
+def decouper(html: str) -> tuple[str, dict[str, str]]:
+    """(empreinte du squelette, { id: html du fragment }) ; le squelette est le document sans le contenu des fragments."""
+    fragments = {m.group(2): m.group(0) for m in _RE_FRAGMENT.finditer(html)}
+    squelette = _RE_FRAGMENT.sub(lambda m: f"<!--{m.group(2)}-->", html)
+    return hashlib.sha256(squelette.encode("utf-8")).hexdigest()[:16], fragments
+
+
+# --- JSON Patch (RFC 6902) -----------------------------------------------------------------------------------------
+
+
+def _jetons(pointeur: str) -> list[str]:
+    """Pointeur JSON (RFC 6901) → liste de clés ; "" désigne le document entier."""
+    if pointeur == "":
+        return []
+    if not pointeur.startswith("/"):
+        raise ValueError(f"Pointeur JSON invalide : {pointeur!r}")
+    return [j.replace("~1", "/").replace("~0", "~") for j in pointeur[1:].split("/")]
+
+
+def _index(liste: list, jeton: str, ajout: bool = False) -> int:
+    if ajout and jeton == "-":
+        return len(liste)
+    if not jeton.isdigit() or (len(jeton) > 1 and jeton.startswith("0")):
+        raise ValueError(f"Indice de liste invalide : {jeton!r}")
+    i = int(jeton)
+    if i > len(liste) or (i == len(liste) and not ajout):
+        raise ValueError(f"Indice hors limites : {i}")
+    return i
+
+
+def _parent(doc, jetons: list[str]):
+    cible = doc
+    for jeton in jetons[:-1]:
+        if isinstance(cible, list):
+            cible = cible[_index(cible, jeton)]
+        elif isinstance(cible, dict) and jeton in cible:
+            cible = cible[jeton]
+        else:
+            raise ValueError(f"Chemin inexistant : /{'/'.join(jetons)}")
+    return cible
+
+
+def _lire(doc, pointeur: str):
+    cible = doc
+    for jeton in _jetons(pointeur):
+        if isinstance(cible, list):
+            cible = cible[_index(cible, jeton)]
+        elif isinstance(cible, dict) and jeton in cible:
+            cible = cible[jeton]
+        else:
+            raise ValueError(f"Chemin inexistant : {pointeur}")
+    return cible
+
+
+def _ajouter(doc, pointeur: str, valeur):
+    jetons = _jetons(pointeur)
+    if not jetons:
+        return valeur
+    parent, cle = _parent(doc, jetons), jetons[-1]
+    if isinstance(parent, list):
+        parent.insert(_index(parent, cle, ajout=True), valeur)
+    elif isinstance(parent, dict):
+        parent[cle] = valeur
+    else:
+        raise ValueError(f"Chemin inexistant : {pointeur}")
+    return doc
+
+
+def _retirer(doc, pointeur: str):
+    jetons = _jetons(pointeur)
+    if not jetons:
+        raise ValueError("Impossible de retirer le document entier")
+    parent, cle = _parent(doc, jetons), jetons[-1]
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, cle))
+    if isinstance(parent, dict) and cle in parent:
+        return parent.pop(cle)
+    raise ValueError(f"Chemin inexistant : {pointeur}")
+
+
+def appliquer_patch(doc, operations: list) -> dict:
+    """Applique une liste d'opérations JSON Patch sur une copie de doc. Lève ValueError (document inchangé) si invalide."""
+    if not isinstance(operations, list):
+        raise ValueError("Le patch doit être une liste d'opérations")
+    doc = copy.deepcopy(doc)
+    for op in operations:
+        if not isinstance(op, dict) or not isinstance(op.get("path"), str):
+            raise ValueError(f"Opération invalide : {op!r}")
+        nom, chemin = op.get("op"), op["path"]
+        if nom in ("add", "replace", "test") and "value" not in op:
+            raise ValueError(f"Opération {nom} sans valeur : {chemin}")
+        if nom == "add":
+            doc = _ajouter(doc, chemin, copy.deepcopy(op["value"]))
+        elif nom == "remove":
+            _retirer(doc, chemin)
+        elif nom == "replace":
+            if not _jetons(chemin):
+                doc = copy.deepcopy(op["value"])
+                continue
+            _retirer(doc, chemin)
+            doc = _ajouter(doc, chemin, copy.deepcopy(op["value"]))
+        elif nom in ("move", "copy"):
+            source = op.get("from")
+            if not isinstance(source, str):
+                raise ValueError(f"Opération {nom} sans « from » : {chemin}")
+            if nom == "move" and chemin.startswith(source + "/"):
+                # RFC 6902 §4.4 : un nœud ne peut pas être déplacé dans l'un de ses enfants
+                raise ValueError(f"Déplacement de {source} dans son propre enfant {chemin}")
+            valeur = _retirer(doc, source) if nom == "move" else copy.deepcopy(_lire(doc, source))
+            doc = _ajouter(doc, chemin, valeur)
+        elif nom == "test":
+            if _lire(doc, chemin) != op["value"]:
+                raise ValueError(f"Test échoué : {chemin}")
+        else:
+            raise ValueError(f"Opération inconnue : {nom!r}")
+    if not isinstance(doc, dict):
+        raise ValueError("Le CV doit rester un objet JSON")
+    return doc
+
+
+# --- Sessions ------------------------------------------------------------------------------------------------------
+
+
+def _chemin(sid: str) -> Path:
+    if not _RE_ID_SESSION.match(sid or ""):
+        raise KeyError(sid)
+    return APERCU_DIR / f"{sid}.json"
+
+
+def _lire_session(chemin: Path) -> dict | None:
+    try:
+        return json.loads(chemin.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _ecrire_session(chemin: Path, session: dict) -> None:
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    tmp = chemin.with_name(f"{chemin.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(session, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, chemin)
+    with _changement:
+        _changement.notify_all()
+
+
+def purger(ttl_s: float | None = None) -> int:
+    """Supprime les sessions non modifiées depuis ttl_s secondes (défaut APERCU_TTL_S). Retourne le nombre supprimé."""
+    limite = time.time() - (APERCU_TTL_S if ttl_s is None else ttl_s)
+    n = 0
+    for f in APERCU_DIR.glob("*.json"):
+        try:
+            if f.stat().st_mtime < limite:
+                f.unlink()
+                f.with_name(f"{f.name}.lock").unlink(missing_ok=True)
+                n += 1
+        except OSError:
+            continue
+    return n
+
+
+def creer(cv: dict, base_cv: dict | None, surligner: bool, rendre) -> dict:
+    """
+    Nouvelle session à partir d'un CV complet. rendre(cv, base_cv, surligner) → HTML du document.
+    Retourne { "session", "version", "html" } (document complet, à charger une fois dans l'iframe).
+    """
+    purger()
+    html = rendre(cv, base_cv, surligner)
+    squelette, fragments = decouper(html)
+    sid = secrets.token_urlsafe(12)
+    _ecrire_session(_chemin(sid), {
+        "version": 1,
+        "cv": cv,
+        "base_cv": base_cv,
+        "surligner": surligner,
+        "squelette": squelette,
+        "fragments": fragments,
+    })
+    return {"session": sid, "version": 1, "html": html}
+
+
+def document(sid: str, rendre) -> dict:
+    """Document complet de la version courante (resynchronisation du client). Lève KeyError si la session n'existe pas."""
+    session = _lire_session(_chemin(sid))
+    if session is None:
+        raise KeyError(sid)
+    return {"session": sid, "version": session["version"], "html": rendre(session["cv"], session["base_cv"], session["surligner"])}
+
+
+class ConflitVersion(Exception):
+    """Le patch a été calculé sur une version qui n'est plus la version courante de la session."""
+
+    def __init__(self, version: int):
+        super().__init__(f"Version courante : {version}")
+        self.version = version
+
+
+def modifier(sid: str, version: int | None, patch: list, rendre) -> dict:
+    """
+    Applique un JSON Patch à la session (version : celle sur laquelle le client a calculé le patch ; None = sans contrôle).
+    Retourne { "version", "fragments": { id: html } modifiés, "complet": bool }.
+    Lève KeyError (session inconnue ou expirée), ConflitVersion, ValueError (patch invalide).
+    """
+    chemin = _chemin(sid)
+    with verrou_fichier(chemin):
+        session = _lire_session(chemin)
+        if session is None:
+            raise KeyError(sid)
+        if version is not None and version != session["version"]:
+            raise ConflitVersion(session["version"])
+        cv = appliquer_patch(session["cv"], patch)
+        squelette, fragments = decouper(rendre(cv, session["base_cv"], session["surligner"]))
+        precedents = session["fragments"]
+        complet = squelette != session["squelette"]
+        modifies = {} if complet else {i: h for i, h in fragments.items() if precedents.get(i) != h}
+        session.update(version=session["version"] + 1, cv=cv, squelette=squelette, fragments=fragments)
+        _ecrire_session(chemin, session)
+    return {"version": session["version"], "fragments": modifies, "complet": complet}
+
+
+def reserver_flux() -> bool:
+    """Réserve une place de flux SSE dans ce processus ; False si désactivé (FLUX_MAX = 0) ou complet."""
+    global _flux_ouverts
+    with _flux_lock:
+        if _flux_ouverts >= FLUX_MAX:
+            return False
+        _flux_ouverts += 1
+        return True
+
+
+def liberer_flux() -> None:
+    global _flux_ouverts
+    with _flux_lock:
+        _flux_ouverts = max(0, _flux_ouverts - 1)
+
+
+def suivre(sid: str, intervalle_s: float = 0.5, battement_s: float = 15.0, duree_s: float | None = None):
+    """
+    Événements pour un abonné (itérateur) : dict { "version", "fragments", "complet" } à chaque changement
+    de la session, None comme battement de cœur (garder la connexion ouverte). S'arrête quand la session disparaît
+    ou après duree_s (défaut FLUX_DUREE_S). Lève KeyError tout de suite si la session n'existe pas.
+    """
+    chemin = _chemin(sid)
+    session = _lire_session(chemin)
+    if session is None:
+        raise KeyError(sid)
+    return _evenements(chemin, session, intervalle_s, battement_s, FLUX_DUREE_S if duree_s is None else duree_s)
+
+
+def _evenements(chemin: Path, session: dict, intervalle_s: float, battement_s: float, duree_s: float):
+    version, squelette, vus = session["version"], session["squelette"], dict(session["fragments"])
+    sig, dernier_envoi = signature(chemin), time.monotonic()
+    fin = dernier_envoi + duree_s
+    while time.monotonic() < fin:
+        with _changement:
+            _changement.wait(intervalle_s)
+        actuelle = signature(chemin)
+        if actuelle is None:
+            return
+        if actuelle != sig:
+            sig = actuelle
+            session = _lire_session(chemin)
+            if session is not None and session["version"] != version:
+                complet = session["squelette"] != squelette
+                modifies = {} if complet else {i: h for i, h in session["fragments"].items() if vus.get(i) != h}
+                version, squelette, vus = session["version"], session["squelette"], dict(session["fragments"])
+                dernier_envoi = time.monotonic()
+                yield {"version": version, "fragments": modifies, "complet": complet}
+                continue
+        if time.monotonic() - dernier_envoi >= battement_s:
+            dernier_envoi = time.monotonic()
+            yield None
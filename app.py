@@ -5,14 +5,17 @@ applique les tweaks (resume + bullet_points + mots_cles_cache) via Gemini.
 Les tweaks sont stockés dans adaptations/ ; cv_base.json n'est jamais modifié.
 """
 
-import json
-import hashlib
+import threading
+import time
 from pathlib import Path
-from datetime import datetime
 
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_file, send_from_directory
 from dotenv import load_dotenv
 
+import mesures
+import profilage
+from mesures import etape
+
 load_dotenv(Path(__file__).resolve().parent / ".env")
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -21,12 +24,21 @@ ADAPTATIONS_DIR = BASE_DIR / "adaptations"
 
 app = Flask(__name__, static_folder="static", static_url_path="")
 
+_inbox = None
+_inbox_signature = None
+_inbox_lock = threading.Lock()
+
 
 def _load_cv_base() -> dict:
-    if not CV_BASE_PATH.exists():
-        raise FileNotFoundError("cv_base.json introuvable. Lance d'abord : python main.py --setup")
-    with open(CV_BASE_PATH, encoding="utf-8") as f:
-        return json.load(f)
+    """cv_base.json via le cache versionné (relu seulement s'il a changé). Dict partagé : ne pas le modifier."""
+    from cv_base_cache import charger
+    return charger(CV_BASE_PATH).cv
+
+
+def _cv_base_index():
+    """Index des règles ATS de la version courante de cv_base.json (précalculé dans le cache)."""
+    from cv_base_cache import charger
+    return charger(CV_BASE_PATH).index
 
 
 def _apply_tweaks(cv_base: dict, tweaks: dict) -> dict:
@@ -35,57 +47,43 @@ def _apply_tweaks(cv_base: dict, tweaks: dict) -> dict:
     return apply_tweaks_to_cv(cv_base, tweaks)
 
 
-def _save_adaptation(adaptation_id: str, payload: dict) -> Path:
-    """Sauvegarde une adaptation dans adaptations/<id>.json. Ne touche jamais cv_base.json."""
-    ADAPTATIONS_DIR.mkdir(parents=True, exist_ok=True)
-    path = ADAPTATIONS_DIR / f"{adaptation_id}.json"
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
-    return path
+def _save_adaptation(adaptation_id: str, payload: dict) -> str:
+    """Sauvegarde une adaptation dans la base adaptations/adaptations.db. Ne touche jamais cv_base.json."""
+    from adaptations_db import enregistrer
+    return enregistrer(adaptation_id, payload)
 
 
 def _adaptation_id_from_description(description: str) -> str:
     """Identifiant unique pour une adaptation (hash du texte + timestamp court)."""
-    h = hashlib.sha256(description.strip().encode("utf-8")).hexdigest()[:12]
-    ts = datetime.utcnow().strftime("%Y%m%d%H%M")
-    return f"{ts}_{h}"
+    from adaptations_db import nouvel_id
+    return nouvel_id(description)
 
 
 def _diff_highlight_html(base: str, current: str) -> str:
-    """Retourne le texte 'current' en HTML : seules les parties différentes de 'base' sont dans <span class="cv-changed"> (diff par mot)."""
-    import html
-    from difflib import SequenceMatcher
-    base = (base or "").strip()
-    current = (current or "").strip()
-    if base == current:
-        return html.escape(current)
-    base_words = base.split()
-    current_words = current.split()
-    if not current_words:
-        return ""
-    matcher = SequenceMatcher(None, base_words, current_words)
-    out = []
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-        segment = current_words[j1:j2]
-        if not segment:
-            continue
-        text = " ".join(segment)
-        escaped = html.escape(text)
-        if tag == "equal":
-            out.append(escaped)
-        else:
-            out.append(f'<span class="cv-changed">{escaped}</span>')
-    return " ".join(out)
+    """Retourne le texte 'current' en HTML : seules les parties différentes de 'base' sont dans <span class="cv-changed"> (diff par mot, mémoïsé)."""
+    from diff_mots import diff_highlight_html
+    return diff_highlight_html(base, current)
 
 
 def _render_cv_html(cv: dict, base_cv: dict | None = None, highlight_changes: bool = False, for_preview: bool = False) -> str:
     """Rend le template avec les données CV. Si base_cv + highlight_changes, surligne uniquement les différences exactes (diff caractère). for_preview=True affiche les mots-clés ATS en noir dans l'aperçu."""
     import html
-    from jinja2 import Environment, FileSystemLoader, select_autoescape
     from photo_assets import ensure_compressed_photo, get_photo_url_for_cv
 
-    ensure_compressed_photo(BASE_DIR, cv.get("photo_url"), cv.get("prenom"), cv.get("nom"))
-    photo_url = get_photo_url_for_cv(BASE_DIR, cv.get("photo_url"), cv.get("prenom"), cv.get("nom"))
+    with etape("photo"):
+        ensure_compressed_photo(BASE_DIR, cv.get("photo_url"), cv.get("prenom"), cv.get("nom"))
+        photo_url = get_photo_url_for_cv(BASE_DIR, cv.get("photo_url"), cv.get("prenom"), cv.get("nom"))
+
+    # CV de base sans surlignage : HTML calculé une fois par version de cv_base.json, de la photo et des templates
+    from cv_base_cache import instantane_de
+    instantane = instantane_de(cv)
+    if instantane is not None and not (highlight_changes and base_cv):
+        from verrous import signature
+        gabarits = (signature(BASE_DIR / "template.html"), signature(BASE_DIR / "template.css"))
+        return instantane.derive(
+            ("html", for_preview, photo_url, gabarits),
+            lambda: _render_cv_html({**cv, "photo_url": photo_url} if photo_url else dict(cv), for_preview=for_preview),
+        )
     if photo_url:
         cv = {**cv, "photo_url": photo_url}
 
@@ -93,52 +91,146 @@ def _render_cv_html(cv: dict, base_cv: dict | None = None, highlight_changes: bo
     ctx["for_preview"] = for_preview
 
     base = base_cv or {}
-    if highlight_changes and base_cv:
-        ctx["titre_professionnel_display"] = _diff_highlight_html(
-            (base.get("titre_professionnel") or "").strip(),
-            (cv.get("titre_professionnel") or "").strip(),
-        )
-        ctx["resume_display"] = _diff_highlight_html(
-            (base.get("resume") or "").strip(),
-            (cv.get("resume") or "").strip(),
-        )
+    highlight = bool(highlight_changes and base_cv)
+    by_id = {e.get("id"): e for e in (base.get("experiences") or []) if e.get("id")}
+    from pertinence import choisir_affichage
+    affichage = choisir_affichage(cv)
+
+    # Toutes les paires (base, actuel) du rendu : titre, résumé puis bullets affichés
+    paires = [
+        ((base.get("titre_professionnel") or "").strip(), (cv.get("titre_professionnel") or "").strip()),
+        ((base.get("resume") or "").strip(), (cv.get("resume") or "").strip()),
+    ]
+    for exp, indices in affichage:
+        base_bullets = (by_id.get(exp.get("id")) or {}).get("bullet_points") or []
+        for j in indices:
+            paires.append((base_bullets[j] if j < len(base_bullets) else "", exp["bullet_points"][j]))
+    if highlight:
+        from diff_mots import diff_highlight_lot
+        with etape("diff"):
+            rendus = diff_highlight_lot(paires)
     else:
-        ctx["titre_professionnel_display"] = html.escape((cv.get("titre_professionnel") or "").strip())
-        ctx["resume_display"] = html.escape((cv.get("resume") or "").strip())
+        rendus = [html.escape(current) for _, current in paires]
 
-    by_id = {e.get("id"): e for e in (base.get("experiences") or []) if e.get("id")}
+    ctx["titre_professionnel_display"] = rendus[0]
+    ctx["resume_display"] = rendus[1]
     experiences_for_display = []
-    for exp in (cv.get("experiences") or [])[:6]:
-        bullets_raw = (exp.get("bullet_points") or [])[:2]
-        base_bullets = (by_id.get(exp.get("id")) or {}).get("bullet_points") or []
+    k = 2
+    for exp, indices in affichage:
         bullets_with_hl = []
-        for j, b in enumerate(bullets_raw):
-            base_b = base_bullets[j] if j < len(base_bullets) else ""
-            bullets_with_hl.append({
-                "text": b,
-                "html": _diff_highlight_html(base_b, b) if highlight_changes and base_cv else html.escape(b),
-            })
+        for j in indices:
+            b = exp["bullet_points"][j]
+            bullets_with_hl.append({"text": b, "html": rendus[k] if highlight else html.escape(b)})
+            k += 1
         experiences_for_display.append({**exp, "bullet_points": bullets_with_hl})
     ctx["experiences_for_display"] = experiences_for_display
 
-    env = Environment(
-        loader=FileSystemLoader(str(BASE_DIR)),
-        autoescape=select_autoescape(("html", "xml")),
-    )
-    template = env.get_template("template.html")
-    html = template.render(**ctx)
+    from generator import environnement_templates
+    with etape("jinja"):
+        template = environnement_templates().get_template("template.html")
+        html = template.render(**ctx)
     html = html.replace('href="template.css"', 'href="/template.css"')
     if 'src="assets/' in html:
         html = html.replace('src="assets/', 'src="/assets/')
     return html
 
 
+def _get_inbox():
+    """Boîte d'offres depuis adaptations/inbox.json, rechargée si un autre processus (worker, CLI) l'a modifiée."""
+    global _inbox, _inbox_signature
+    from inbox import INBOX_PATH, BoiteOffres
+    from verrous import signature
+    with _inbox_lock:
+        sig = signature(INBOX_PATH)
+        if _inbox is None or sig != _inbox_signature:
+            _inbox = BoiteOffres.charger()
+            _inbox_signature = sig
+        return _inbox
+
+
+def _modifier_inbox(modification):
+    """Lecture-modification-écriture de la boîte sous verrou inter-processus. Retourne (boite, résultat de modification)."""
+    global _inbox_signature
+    from inbox import INBOX_PATH
+    from verrous import signature, verrou_fichier
+    with verrou_fichier(INBOX_PATH):
+        boite = _get_inbox()
+        resultat = modification(boite)
+        if resultat:
+            boite.sauvegarder()
+            with _inbox_lock:
+                _inbox_signature = signature(INBOX_PATH)
+    return boite, resultat
+
+
 def _offre_from_description(description: str, titre: str = "", entreprise: str = "") -> dict:
     """Construit un dict offre à partir du texte de la fiche de poste (dépôt manuel, pas de scraping)."""
     from mots_cles import offre_from_description
     return offre_from_description(description or "", titre=titre, entreprise=entreprise)
 
 
+@app.before_request
+def _debut_mesures():
+    """Ouvre la collecte des étapes de la requête (en-tête Server-Timing)."""
+    if mesures.ACTIF:
+        g.mesures_jeton, g.mesures_etapes = mesures.demarrer_collecte()
+        g.mesures_debut = time.perf_counter()
+
+
+@app.after_request
+def _server_timing(response):
+    """Ajoute Server-Timing (durée par étape + total) et alimente l'histogramme http.<endpoint>."""
+    etapes = g.get("mesures_etapes")
+    if etapes is not None:
+        mesures.enregistrer(f"http.{request.endpoint or 'inconnu'}", time.perf_counter() - g.mesures_debut)
+        valeur = mesures.server_timing(etapes)
+        if valeur:
+            response.headers["Server-Timing"] = valeur
+    return response
+
+
+@app.teardown_request
+def _fin_mesures(_exc):
+    jeton = g.pop("mesures_jeton", None)
+    if jeton is not None:
+        mesures.arreter_collecte(jeton)
+
+
+if profilage.MODE_SERVEUR:
+    # Hooks installés seulement si CV_BOT_PROFILAGE est défini : aucun coût par requête sinon
+    @app.before_request
+    def _debut_profil():
+        mode = profilage.mode_demande(request.headers.get("X-CV-Bot-Profil") or request.args.get("profil"))
+        if mode:
+            try:
+                g.profil = profilage.Session(f"http.{request.endpoint or 'inconnu'}", mode).demarrer()
+            except RuntimeError:
+                g.profil_refuse = True  # autre requête déjà profilée dans ce worker
+
+    @app.after_request
+    def _fin_profil(response):
+        session = g.get("profil")
+        if session is not None:
+            fichiers = session.arreter()
+            response.headers["X-CV-Bot-Profil"] = ", ".join(f.name for f in fichiers)
+        elif g.get("profil_refuse"):
+            response.headers["X-CV-Bot-Profil"] = "occupe"
+        return response
+
+    @app.teardown_request
+    def _abandon_profil(_exc):
+        # Requête interrompue par une exception : le profil est quand même écrit
+        session = g.pop("profil", None)
+        if session is not None:
+            session.arreter()
+
+
+@app.route("/metrics")
+def metrics():
+    """Histogrammes des durées par étape, format texte Prometheus (propres à ce processus : un worker par scrape)."""
+    return Response(mesures.prometheus(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/")
 def index():
     return send_from_directory(app.static_folder, "index.html")
@@ -160,7 +252,7 @@ def api_cv():
     try:
         cv = _load_cv_base()
         return jsonify(cv)
-    except FileNotFoundError as e:
+    except (FileNotFoundError, ValueError) as e:
         return jsonify({"error": str(e)}), 404
 
 
@@ -173,7 +265,7 @@ def api_cv_preview():
         ensure_compressed_photo(BASE_DIR, cv.get("photo_url"), cv.get("prenom"), cv.get("nom"))
         html = _render_cv_html(cv)
         return html
-    except FileNotFoundError as e:
+    except (FileNotFoundError, ValueError) as e:
         return str(e), 404
 
 
@@ -191,13 +283,104 @@ def api_render_html():
     return html
 
 
+def _rendre_apercu(cv: dict, base_cv: dict | None, surligner: bool) -> str:
+    return _render_cv_html(cv, base_cv=base_cv, highlight_changes=surligner, for_preview=True)
+
+
+@app.route("/api/apercu", methods=["POST"])
+def api_apercu_creer():
+    """
+    Ouvre une session d'aperçu incrémental : le serveur garde le CV, les changements suivants sont des JSON Patch.
+    Body : { "cv": { ... }, "base_cv": { ... } (optionnel, défaut cv_base.json si highlight_changes), "highlight_changes": true }
+    Retourne { "session", "version", "html" } (document complet, une seule fois) et "flux" : true si le flux SSE
+    des changements est activé (CV_BOT_APERCU_FLUX_MAX > 0).
+    """
+    import apercu
+    data = request.get_json() or {}
+    cv = data.get("cv")
+    if not isinstance(cv, dict) or not cv:
+        return jsonify({"error": "Clé 'cv' manquante"}), 400
+    surligner = data.get("highlight_changes") is True
+    base_cv = data.get("base_cv")
+    if surligner and not base_cv:
+        try:
+            base_cv = _load_cv_base()
+        except (FileNotFoundError, ValueError):
+            base_cv = None
+    return jsonify({**apercu.creer(cv, base_cv, surligner, _rendre_apercu), "flux": apercu.FLUX_MAX > 0})
+
+
+@app.route("/api/apercu/<session_id>", methods=["GET"])
+def api_apercu_document(session_id):
+    """Document complet de la version courante de la session (resynchronisation)."""
+    import apercu
+    try:
+        return jsonify(apercu.document(session_id, _rendre_apercu))
+    except KeyError:
+        return jsonify({"error": "Session d'aperçu inconnue ou expirée"}), 404
+
+
+@app.route("/api/apercu/<session_id>", methods=["PATCH"])
+def api_apercu_modifier(session_id):
+    """
+    Applique un delta au CV de la session. Body : { "version": n, "patch": [ opérations JSON Patch RFC 6902 ] }.
+    Retourne { "version", "fragments": { id: html } (sections modifiées seulement), "complet": bool }.
+    404 : session expirée (en recréer une) ; 409 : version dépassée (resynchroniser).
+    """
+    import apercu
+    data = request.get_json() or {}
+    version = data.get("version")
+    try:
+        return jsonify(apercu.modifier(session_id, version if isinstance(version, int) else None, data.get("patch"), _rendre_apercu))
+    except KeyError:
+        return jsonify({"error": "Session d'aperçu inconnue ou expirée"}), 404
+    except apercu.ConflitVersion as e:
+        return jsonify({"error": str(e), "version": e.version}), 409
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({"error": f"Patch invalide : {e}"}), 400
+
+
+@app.route("/api/apercu/<session_id>/flux", methods=["GET"])
+def api_apercu_flux(session_id):
+    """
+    Server-Sent Events : un événement « fragments » par nouvelle version de la session (autres onglets, autres clients).
+    Désactivé par défaut (un flux occupe un thread de worker tant qu'il est ouvert) : CV_BOT_APERCU_FLUX_MAX flux
+    simultanés par processus au plus, 503 au-delà.
+    """
+    import json
+
+    import apercu
+    if apercu.FLUX_MAX <= 0:
+        return jsonify({"error": "Flux d'aperçu désactivé (CV_BOT_APERCU_FLUX_MAX)"}), 404
+    try:
+        evenements = apercu.suivre(session_id)
+    except KeyError:
+        return jsonify({"error": "Session d'aperçu inconnue ou expirée"}), 404
+    if not apercu.reserver_flux():
+        return jsonify({"error": "Trop de flux d'aperçu ouverts"}), 503
+
+    def _flux():
+        yield "retry: 2000\n\n"
+        for evenement in evenements:
+            if evenement is None:
+                yield ": battement\n\n"
+            else:
+                yield f"event: fragments\ndata: {json.dumps(evenement, ensure_ascii=False)}\n\n"
+
+    reponse = Response(_flux(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    reponse.call_on_close(apercu.liberer_flux)
+    return reponse
+
+
 @app.route("/api/adapt", methods=["POST"])
 def api_adapt():
     """
     Reçoit l'annonce en texte. Part toujours de cv_base (jamais modifié).
     Gemini retourne uniquement les tweaks (resume, bullet_points, mots_cles_cache).
     On fusionne tweaks + cv_base pour l'affichage/PDF, et on sauvegarde les tweaks dans adaptations/.
-    Body : { "description": "texte de l'annonce" }
+    Body : { "description": "texte de l'annonce", "fan_out": true (optionnel, requêtes Gemini parallèles par section),
+             "mode": "brouillon" (optionnel, tweaks locaux instantanés sans Gemini), "budget_s": 20 (optionnel) }
+    Si Gemini est indisponible ou dépasse budget_s, le brouillon local (règles) est renvoyé avec "source": "regles".
     """
     data = request.get_json() or {}
     description = data.get("description", "").strip()
@@ -206,39 +389,163 @@ def api_adapt():
 
     try:
         cv_base = _load_cv_base()
-    except FileNotFoundError as e:
+    except (FileNotFoundError, ValueError) as e:
         return jsonify({"error": str(e)}), 404
 
-    offre = _offre_from_description(description)
+    with etape("extraction"):
+        offre = _offre_from_description(description)
+    with etape("idf"):
+        # Hors du chemin de la requête : l'annonce est ajoutée à l'index IDF par un thread de fond
+        from mots_cles import apprendre_offres_en_fond
+        apprendre_offres_en_fond([description])
 
     from rules import appliquer_regles
-    cv_enrichi = appliquer_regles(cv_base, offre)
+    with etape("regles"):
+        cv_enrichi = appliquer_regles(cv_base, offre, index=_cv_base_index())
     rapport = cv_enrichi.get("rapport", {})
 
-    from adapter import adapter_cv
-    try:
-        tweaks = adapter_cv(cv_base, offre, rapport=rapport)
-    except Exception as e:
-        return jsonify({"error": f"Adaptation Gemini : {e}"}), 500
-
-    merged = _apply_tweaks(cv_base, tweaks)
+    from adapter_local import adapter_avec_repli, adapter_cv_local
+    from telemetrie_llm import collecte
+    avertissement = None
+    appels_llm = []
+    if data.get("mode") == "brouillon":
+        with etape("brouillon"):
+            tweaks, source = adapter_cv_local(cv_base, offre, rapport), "regles"
+    else:
+        # Handler WSGI synchrone : pas de boucle asyncio par requête (le client Gemini asynchrone sert au lot CLI et à
+        # la surveillance) ; budget = délai du client HTTP (étape "adaptation" = attente totale, appels mesurés en "gemini")
+        with etape("adaptation"), collecte() as appels_llm:
+            tweaks, source, avertissement = adapter_avec_repli(
+                cv_base,
+                offre,
+                rapport=rapport,
+                budget_s=data.get("budget_s") if isinstance(data.get("budget_s"), (int, float)) else None,
+                fan_out=True if data.get("fan_out") is True else None,
+            )
+
+    with etape("fusion"):
+        merged = _apply_tweaks(cv_base, tweaks)
     adaptation_id = _adaptation_id_from_description(description)
-    _save_adaptation(adaptation_id, {
-        "resume": tweaks.get("resume"),
-        "experiences": tweaks.get("experiences", []),
-        "mots_cles_cache": tweaks.get("mots_cles_cache", ""),
-        "rapport": rapport,
-        "description_preview": description[:200] + "..." if len(description) > 200 else description,
-    })
+    with etape("sauvegarde"):
+        _save_adaptation(adaptation_id, {
+            "resume": tweaks.get("resume"),
+            "experiences": tweaks.get("experiences", []),
+            "mots_cles_cache": tweaks.get("mots_cles_cache", ""),
+            "rapport": rapport,
+            "source": source,
+            "titre": (data.get("titre") or tweaks.get("poste_offre") or "").strip(),
+            "entreprise": (data.get("entreprise") or "").strip(),
+            "description": description,
+            "description_preview": description[:200] + "..." if len(description) > 200 else description,
+            "llm": appels_llm,
+        })
 
     return jsonify({
         "cv": merged,
         "rapport": rapport,
         "tweaks": tweaks,
         "adaptation_id": adaptation_id,
+        "source": source,
+        "avertissement": avertissement,
     })
 
 
+@app.route("/api/adaptations", methods=["GET"])
+def api_adaptations():
+    """
+    Historique des adaptations, paginé (plus récentes d'abord).
+    Query : ?q=texte&entreprise=préfixe&titre=préfixe&hash=empreinte&depuis=AAAA-MM-JJ&jusqua=AAAA-MM-JJ&page=1&par_page=20
+    ?description=texte : adaptations de la même annonce (empreinte calculée côté serveur).
+    """
+    from adaptations_db import hash_description, rechercher
+    args = request.args
+    desc_hash = args.get("hash", "")
+    if args.get("description"):
+        desc_hash = hash_description(args["description"])
+    return jsonify(rechercher(
+        q=args.get("q", ""),
+        entreprise=args.get("entreprise", ""),
+        titre=args.get("titre", ""),
+        description_hash=desc_hash,
+        depuis=args.get("depuis", ""),
+        jusqua=args.get("jusqua", ""),
+        page=args.get("page", default=1, type=int),
+        par_page=args.get("par_page", default=20, type=int),
+    ))
+
+
+@app.route("/api/adaptations/<adaptation_id>", methods=["GET"])
+def api_adaptation(adaptation_id):
+    """Adaptation complète (tweaks, rapport, annonce). Avec cv_base, réaffichable sans nouvel appel Gemini."""
+    from adaptations_db import obtenir
+    adaptation = obtenir(adaptation_id)
+    if adaptation is None:
+        return jsonify({"error": "Adaptation introuvable"}), 404
+    return jsonify(adaptation)
+
+
+@app.route("/api/adaptations/<adaptation_id>", methods=["DELETE"])
+def api_adaptation_supprimer(adaptation_id):
+    """Supprime une adaptation de l'historique (ses artefacts sont libérés au prochain gc)."""
+    from adaptations_db import supprimer
+    if not supprimer(adaptation_id):
+        return jsonify({"error": "Adaptation introuvable"}), 404
+    return jsonify({"ok": True})
+
+
+@app.route("/api/artefacts/<empreinte>", methods=["GET"])
+def api_artefact(empreinte):
+    """Sert un artefact passé (PDF, annonce, tweaks) depuis le magasin, sans nouveau rendu."""
+    import artefacts
+    data = artefacts.lire(empreinte)
+    if data is None:
+        return jsonify({"error": "Artefact introuvable"}), 404
+    from io import BytesIO
+    return send_file(BytesIO(data), mimetype=artefacts.media_type(empreinte), download_name=request.args.get("nom") or empreinte)
+
+
+@app.route("/api/llm/stats", methods=["GET"])
+def api_llm_stats():
+    """Synthèse des appels Gemini journalisés. Query : ?jours=N (défaut : tout le journal)."""
+    from telemetrie_llm import resume
+    jours = request.args.get("jours", type=int)
+    return jsonify(resume(jours if jours and jours > 0 else None))
+
+
+@app.route("/api/inbox", methods=["GET"])
+def api_inbox():
+    """Top-K des offres de la boîte les plus pertinentes pour cv_base. Query : ?k=10.
+    Chaque résultat contient description / titre / entreprise, réutilisables tels quels pour /api/adapt."""
+    try:
+        cv_base = _load_cv_base()
+    except (FileNotFoundError, ValueError) as e:
+        return jsonify({"error": str(e)}), 404
+    k = request.args.get("k", default=10, type=int)
+    boite = _get_inbox()
+    return jsonify({"total": len(boite), "offres": boite.classer(_cv_base_index(), k=k)})
+
+
+@app.route("/api/inbox", methods=["POST"])
+def api_inbox_ajouter():
+    """Ajoute des offres à la boîte. Body : { "offres": [ { "description", "titre", "entreprise" }, ... ] }"""
+    data = request.get_json() or {}
+    offres = [o for o in data.get("offres") or [] if isinstance(o, dict)]
+    if not offres:
+        return jsonify({"error": "Clé 'offres' manquante ou vide"}), 400
+    from inbox import ajouter_offres
+    boite, ids = _modifier_inbox(lambda b: ajouter_offres(b, offres))
+    return jsonify({"ajoutees": ids, "total": len(boite)})
+
+
+@app.route("/api/inbox/<offre_id>", methods=["DELETE"])
+def api_inbox_retirer(offre_id):
+    """Retire une offre de la boîte."""
+    boite, retiree = _modifier_inbox(lambda b: b.retirer(offre_id))
+    if not retiree:
+        return jsonify({"error": "Offre introuvable"}), 404
+    return jsonify({"total": len(boite)})
+
+
 @app.route("/api/pdf", methods=["POST"])
 def api_pdf():
     """
@@ -287,7 +594,8 @@ def api_export_dossier():
     """
     Crée le dossier 'Entreprise - Poste' dans le dossier fourni (ou défaut env),
     y enregistre : CV PDF, Lettre de motivation PDF, Fiche de poste PDF.
-    Body : { "cv", "titre", "entreprise", "description", "dossier": "chemin optionnel" }
+    Body : { "cv", "titre", "entreprise", "description", "dossier": "chemin optionnel", "regenerer_lettre": bool }
+    La lettre déjà rédigée pour ce CV et cette annonce est réutilisée, sauf si regenerer_lettre est vrai.
     """
     data = request.get_json() or {}
     cv = data.get("cv")
@@ -295,6 +603,7 @@ def api_export_dossier():
     entreprise = (data.get("entreprise") or "").strip()
     description = (data.get("description") or "").strip()
     dossier = (data.get("dossier") or "").strip() or None
+    regenerer_lettre = bool(data.get("regenerer_lettre"))
 
     if not cv:
         return jsonify({"error": "Clé 'cv' manquante"}), 400
@@ -303,7 +612,7 @@ def api_export_dossier():
 
     try:
         from export_package import export_dossier
-        result = export_dossier(cv, titre, entreprise, description, output_base=dossier)
+        result = export_dossier(cv, titre, entreprise, description, output_base=dossier, regenerer_lettre=regenerer_lettre)
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -314,13 +623,14 @@ def api_export_dossier_zip():
     """
     Génère le dossier candidature (CV + lettre + fiche de poste) en mémoire et renvoie un ZIP.
     Pour usage avec "Parcourir" (File System Access) : le client dézippe dans le dossier choisi.
-    Body : { "cv", "titre", "entreprise", "description" }
+    Body : { "cv", "titre", "entreprise", "description", "regenerer_lettre": bool }
     """
     data = request.get_json() or {}
     cv = data.get("cv")
     titre = (data.get("titre") or "").strip()
     entreprise = (data.get("entreprise") or "").strip()
     description = (data.get("description") or "").strip()
+    regenerer_lettre = bool(data.get("regenerer_lettre"))
 
     if not cv:
         return jsonify({"error": "Clé 'cv' manquante"}), 400
@@ -330,7 +640,7 @@ def api_export_dossier_zip():
     try:
         from export_package import export_dossier_as_zip
         zip_bytes, folder_name, files_created = export_dossier_as_zip(
-            cv, titre, entreprise, description
+            cv, titre, entreprise, description, regenerer_lettre=regenerer_lettre
         )
         from io import BytesIO
         return send_file(
@@ -343,6 +653,31 @@ def api_export_dossier_zip():
         return jsonify({"error": str(e)}), 500
 
 
+def precharger() -> None:
+    """
+    Charge avant le fork des workers (gunicorn preload_app) ce qui est coûteux et partageable :
+    WeasyPrint, templates Jinja compilés, automate des mots-clés, cv_base.json et ses dérivés.
+    N'ouvre aucune connexion SQLite (elles sont créées par thread, après le fork).
+    """
+    try:
+        import weasyprint  # noqa: F401
+    except (ImportError, OSError):
+        pass
+    from generator import environnement_templates
+    env = environnement_templates()
+    for nom in ("template.html", "letter_template.html", "fiche_poste_template.html"):
+        env.get_template(nom)
+    import mots_cles
+    mots_cles.offre_from_description("préchargement")
+    try:
+        from cv_base_cache import charger
+        instantane = charger(CV_BASE_PATH)
+        instantane.index
+        instantane.fragment_prompt
+    except (FileNotFoundError, ValueError):
+        pass
+
+
 if __name__ == "__main__":
     # use_reloader=False : évite que le serveur redémarre pendant un appel long (ex. /api/adapt + Gemini)
     # sinon watchdog peut détecter des changements (ex. dans site-packages) et couper la requête → ERR_CONNECTION_RESET
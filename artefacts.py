@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Magasin d'artefacts adressé par contenu : PDF générés (CV, lettre, fiche de poste), textes d'annonces et sorties Gemini.
+Chaque contenu est stocké une seule fois sous son empreinte sha256 dans adaptations/artefacts/<2 car.>/<empreinte>,
+compressé (zlib) quand c'est rentable ; les PDF déjà compressés par WeasyPrint restent bruts et peuvent être liés
+(lien physique) dans les dossiers d'export au lieu d'être recopiés.
+Références (propriétaire, nom) → empreinte dans adaptations/artefacts/index.db ; gc() supprime les contenus
+qui ne sont plus référencés. Tout artefact passé reste servable sans nouveau rendu (lire / GET /api/artefacts/<empreinte>).
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+ARTEFACTS_DIR = BASE_DIR / "adaptations" / "artefacts"
+
+# Compression gardée seulement si elle fait gagner au moins 10 % (sinon contenu brut, liable tel quel)
+GAIN_MIN_COMPRESSION = 0.9
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    empreinte TEXT PRIMARY KEY,
+    media_type TEXT NOT NULL DEFAULT 'application/octet-stream',
+    taille INTEGER NOT NULL,
+    taille_disque INTEGER NOT NULL,
+    compresse INTEGER NOT NULL,
+    cree_le TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS refs (
+    proprietaire TEXT NOT NULL,
+    nom TEXT NOT NULL,
+    empreinte TEXT NOT NULL,
+    PRIMARY KEY (proprietaire, nom)
+);
+CREATE INDEX IF NOT EXISTS idx_refs_empreinte ON refs(empreinte);
+"""
+
+_local = threading.local()
+
+
+def _connexion(dossier: Path | None = None) -> sqlite3.Connection:
+    """Connexion SQLite par thread (mode WAL), schéma créé au premier accès."""
+    dossier = Path(dossier or ARTEFACTS_DIR)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(str(dossier))
+    if conn is None:
+        dossier.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(dossier / "index.db"), timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        conns[str(dossier)] = conn
+    return conn
+
+
+def empreinte(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _chemin(h: str, compresse: bool, dossier: Path | None = None) -> Path:
+    return Path(dossier or ARTEFACTS_DIR) / h[:2] / (f"{h}.z" if compresse else h)
+
+
+def stocker(
+    data: bytes | str,
+    media_type: str = "application/octet-stream",
+    dossier: Path | None = None,
+    proprietaire: str | None = None,
+    nom: str | None = None,
+) -> str:
+    """
+    Stocke un contenu (une seule fois par empreinte) et retourne son empreinte. Les str sont encodées en UTF-8.
+    proprietaire + nom : référence créée dans la même transaction (un gc concurrent ne peut pas supprimer le
+    contenu entre le stockage et la référence).
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    h = empreinte(data)
+    conn = _connexion(dossier)
+    with conn:
+        # Verrou d'écriture pris d'emblée : gc supprime ligne et fichier sous ce même verrou
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT compresse FROM blobs WHERE empreinte = ?", (h,)).fetchone()
+        if row is None or not _chemin(h, bool(row["compresse"]), dossier).exists():
+            compresse_data = zlib.compress(data, 6)
+            compresse = len(compresse_data) < len(data) * GAIN_MIN_COMPRESSION
+            contenu = compresse_data if compresse else data
+            path = _chemin(h, compresse, dossier)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if not path.exists():
+                tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp.write_bytes(contenu)
+                os.replace(tmp, path)
+            conn.execute(
+                "INSERT OR REPLACE INTO blobs (empreinte, media_type, taille, taille_disque, compresse, cree_le) VALUES (?, ?, ?, ?, ?, ?)",
+                (h, media_type, len(data), len(contenu), int(compresse), datetime.utcnow().isoformat(timespec="seconds")),
+            )
+        if proprietaire is not None and nom is not None:
+            conn.execute("INSERT OR REPLACE INTO refs (proprietaire, nom, empreinte) VALUES (?, ?, ?)", (proprietaire, nom, h))
+    return h
+
+
+def _blob(h: str, dossier: Path | None = None) -> sqlite3.Row | None:
+    return _connexion(dossier).execute("SELECT * FROM blobs WHERE empreinte = ?", (h,)).fetchone()
+
+
+def media_type(h: str, dossier: Path | None = None) -> str | None:
+    row = _blob(h, dossier)
+    return row["media_type"] if row else None
+
+
+def lire(h: str, dossier: Path | None = None) -> bytes | None:
+    """Contenu d'origine (décompressé) ou None si l'empreinte est inconnue."""
+    row = _blob(h, dossier)
+    if row is None:
+        return None
+    try:
+        contenu = _chemin(h, bool(row["compresse"]), dossier).read_bytes()
+    except OSError:
+        return None
+    return zlib.decompress(contenu) if row["compresse"] else contenu
+
+
+def lire_texte(h: str, dossier: Path | None = None) -> str | None:
+    data = lire(h, dossier)
+    return data.decode("utf-8") if data is not None else None
+
+
+def referencer(proprietaire: str, nom: str, h: str, dossier: Path | None = None) -> None:
+    """Associe (proprietaire, nom) à une empreinte ; remplace la référence précédente du même nom."""
+    conn = _connexion(dossier)
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO refs (proprietaire, nom, empreinte) VALUES (?, ?, ?)", (proprietaire, nom, h))
+
+
+def dereferencer(proprietaire: str, dossier: Path | None = None) -> int:
+    """Retire toutes les références d'un propriétaire (les contenus deviennent collectables par gc)."""
+    conn = _connexion(dossier)
+    with conn:
+        return conn.execute("DELETE FROM refs WHERE proprietaire = ?", (proprietaire,)).rowcount
+
+
+def references(proprietaire: str, dossier: Path | None = None) -> dict[str, str]:
+    """{ nom: empreinte } des artefacts d'un propriétaire."""
+    rows = _connexion(dossier).execute("SELECT nom, empreinte FROM refs WHERE proprietaire = ? ORDER BY nom", (proprietaire,))
+    return {r["nom"]: r["empreinte"] for r in rows}
+
+
+def nb_references(h: str, dossier: Path | None = None) -> int:
+    return _connexion(dossier).execute("SELECT COUNT(*) FROM refs WHERE empreinte = ?", (h,)).fetchone()[0]
+
+
+def materialiser(h: str, destination: Path, mode: str = "copie", dossier: Path | None = None) -> Path:
+    """
+    Écrit l'artefact à destination. mode "lien" : lien physique vers le contenu stocké quand il est brut
+    (repli en copie si le contenu est compressé ou si le système de fichiers ne le permet pas).
+    """
+    row = _blob(h, dossier)
+    if row is None:
+        raise KeyError(f"Artefact inconnu : {h}")
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    source = _chemin(h, bool(row["compresse"]), dossier)
+    if destination.exists() or destination.is_symlink():
+        destination.unlink()
+    if mode == "lien" and not row["compresse"]:
+        try:
+            os.link(source, destination)
+            return destination
+        except OSError:
+            pass
+    if row["compresse"]:
+        destination.write_bytes(zlib.decompress(source.read_bytes()))
+    else:
+        shutil.copyfile(source, destination)
+    return destination
+
+
+def gc(dossier: Path | None = None) -> tuple[int, int]:
+    """Supprime les contenus sans référence. Retourne (nombre supprimés, octets libérés sur disque)."""
+    conn = _connexion(dossier)
+    orphelins = conn.execute(
+        "SELECT empreinte, compresse, taille_disque FROM blobs WHERE empreinte NOT IN (SELECT empreinte FROM refs)"
+    ).fetchall()
+    n, octets = 0, 0
+    for row in orphelins:
+        with conn:
+            # Revérifié sous le verrou d'écriture : une référence a pu être ajoutée entre-temps ; le fichier est
+            # supprimé avant de rendre le verrou, pour qu'un stocker concurrent voie ligne et fichier disparus ensemble
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM refs WHERE empreinte = ?", (row["empreinte"],)).fetchone():
+                continue
+            conn.execute("DELETE FROM blobs WHERE empreinte = ?", (row["empreinte"],))
+            try:
+                _chemin(row["empreinte"], bool(row["compresse"]), dossier).unlink()
+            except FileNotFoundError:
+                pass
+        n += 1
+        octets += row["taille_disque"]
+    return n, octets
+
+
+def statistiques(dossier: Path | None = None) -> dict:
+    """Nombre d'artefacts, taille d'origine cumulée, taille sur disque, nombre de références."""
+    conn = _connexion(dossier)
+    n, taille, disque = conn.execute("SELECT COUNT(*), COALESCE(SUM(taille), 0), COALESCE(SUM(taille_disque), 0) FROM blobs").fetchone()
+    refs = conn.execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+    return {"artefacts": n, "taille": taille, "taille_disque": disque, "references": refs}
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks hors ligne des chemins chauds : extraction des mots-clés, règles ATS, diff de surlignage,
+rendu HTML de l'aperçu, PDF du CV, PDF de la lettre (LLM simulé) et export ZIP du dossier candidature.
+
+Fixtures synthétiques déterministes (graine fixe), de taille croissante, construites sur la forme de
+cv_base_vierge.json et le vocabulaire de preview_data.json. Aucun appel réseau ; l'index IDF et le magasin
+d'artefacts sont redirigés vers un dossier temporaire (rien n'est écrit dans adaptations/).
+
+  python benchmark.py lancer [-o benchmarks/resultat.json] [--tailles petit,moyen,grand] [--repetitions 7] [--filtre diff]
+  python benchmark.py comparer reference.json candidat.json [--seuil 10]
+
+comparer sort avec le code 1 si un cas est plus lent que la référence au-delà du seuil (médianes, en %).
+Les cas PDF sont ignorés (et signalés) si WeasyPrint n'est pas installé.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+RESULTATS_DIR = BASE_DIR / "benchmarks"
+GRAINE = 42
+
+# Facteur d'échelle par taille : expériences du CV (×2), longueur de l'annonce (×150 mots)
+TAILLES = {"petit": 1, "moyen": 4, "grand": 16}
+REPETITIONS = 7
+SEUIL_POURCENT = 10.0
+# En dessous de cet écart absolu (ms), une variation est considérée comme du bruit de mesure
+PLANCHER_MS = 0.05
+ECHANTILLON_MIN_S = 0.02
+
+CORPS_LETTRE_SIMULE = (
+    "Actuellement en formation, je souhaite rejoindre votre équipe pour ce poste en alternance.\n\n"
+    "Mes expériences en analyse de données et en reporting m'ont permis de développer rigueur et autonomie, "
+    "des qualités que je mettrai au service de vos projets.\n\n"
+    "Je serais ravi d'échanger avec vous lors d'un entretien."
+)
+
+
+# --- Fixtures -----------------------------------------------------------------------------------------------
+
+def _vocabulaire() -> list[str]:
+    """Mots des bullets / résumé de preview_data.json et termes des dictionnaires (mots-clés reconnus)."""
+    from mots_cles import MOTS_CLES_FINANCE_TECH
+
+    with open(BASE_DIR / "preview_data.json", encoding="utf-8") as f:
+        demo = json.load(f)
+    mots = (demo.get("resume") or "").split()
+    for exp in demo.get("experiences") or []:
+        for b in exp.get("bullet_points") or []:
+            mots.extend(b.split())
+    return mots + list(MOTS_CLES_FINANCE_TECH)
+
+
+def _phrase(rng: random.Random, vocab: list[str], n_mots: int) -> str:
+    return " ".join(rng.choice(vocab) for _ in range(n_mots)).capitalize() + "."
+
+
+def cv_synthetique(facteur: int, graine: int = GRAINE) -> dict:
+    """CV de la forme de cv_base_vierge.json : 2×facteur expériences de 4 bullets, compétences à l'échelle."""
+    rng = random.Random(graine)
+    vocab = _vocabulaire()
+    with open(BASE_DIR / "cv_base_vierge.json", encoding="utf-8") as f:
+        cv = json.load(f)
+    modele_exp = cv["experiences"][0]
+    cv.update({
+        "prenom": "Camille",
+        "nom": "Martin",
+        "email": "camille.martin@example.com",
+        "telephone": "06 00 00 00 00",
+        "ville": "Paris",
+        "titre_professionnel": "Alternance Analyste Financier",
+        "resume": " ".join(_phrase(rng, vocab, 18) for _ in range(3)),
+        "photo_url": "",
+    })
+    cv["experiences"] = [
+        {
+            **modele_exp,
+            "id": f"exp_{i + 1}",
+            "poste": _phrase(rng, vocab, 3).rstrip("."),
+            "entreprise": f"Entreprise {i + 1}",
+            "date_debut": "Janv. 2024",
+            "date_fin": "Juin 2024",
+            "lieu": "Paris",
+            "bullet_points": [_phrase(rng, vocab, rng.randint(12, 22)) for _ in range(4)],
+            "mots_cles": rng.sample(vocab, 4),
+        }
+        for i in range(2 * facteur)
+    ]
+    cv["competences"] = {
+        "techniques": rng.sample(vocab, min(len(vocab), 4 * facteur)),
+        "logiciels": ["Excel", "Python", "SQL", "Power BI"],
+        "langues": [{"langue": "Anglais", "niveau": "C1"}],
+        "autres": rng.sample(vocab, min(len(vocab), 2 * facteur)),
+    }
+    return cv
+
+
+def annonce_synthetique(facteur: int, graine: int = GRAINE) -> str:
+    """Annonce d'environ 150×facteur mots, en paragraphes, riche en termes des dictionnaires."""
+    rng = random.Random(graine + 1)
+    vocab = _vocabulaire()
+    phrases = [_phrase(rng, vocab, rng.randint(10, 20)) for _ in range(10 * facteur)]
+    paragraphes = [" ".join(phrases[i:i + 5]) for i in range(0, len(phrases), 5)]
+    return "Alternance Analyste Financier – Missions\n\n" + "\n\n".join(paragraphes)
+
+
+def cv_modifie(cv: dict, graine: int = GRAINE) -> dict:
+    """Variante adaptée du CV (≈ un mot sur cinq remplacé dans le résumé et les bullets), pour le diff et le rendu surligné."""
+    rng = random.Random(graine + 2)
+    vocab = _vocabulaire()
+
+    def _muter(texte: str) -> str:
+        return " ".join(rng.choice(vocab) if rng.random() < 0.2 else m for m in texte.split())
+
+    return {
+        **cv,
+        "resume": _muter(cv["resume"]),
+        "experiences": [{**exp, "bullet_points": [_muter(b) for b in exp["bullet_points"]]} for exp in cv["experiences"]],
+    }
+
+
+# --- Environnement isolé --------------------------------------------------------------------------------------
+
+@contextmanager
+def _environnement_isole():
+    """
+    Index IDF, magasin d'artefacts et rédaction de la lettre (Gemini) remplacés le temps des mesures ;
+    spans de mesures.py coupés (ils ne doivent ni coûter ni s'accumuler dans les histogrammes).
+    """
+    import artefacts
+    import idf
+    import letter_generator
+    import mesures
+
+    sauvegarde = (idf.IDF_PATH, artefacts.ARTEFACTS_DIR, letter_generator.generer_corps_lettre, mesures.ACTIF)
+    with tempfile.TemporaryDirectory(prefix="cv-bot-bench-") as tmp:
+        idf.IDF_PATH = Path(tmp) / "idf_index.json.gz"
+        artefacts.ARTEFACTS_DIR = Path(tmp) / "artefacts"
+        letter_generator.generer_corps_lettre = lambda cv, fiche_poste, poste, entreprise, regenerer=False: CORPS_LETTRE_SIMULE
+        mesures.ACTIF = False
+        try:
+            yield
+        finally:
+            idf.IDF_PATH, artefacts.ARTEFACTS_DIR, letter_generator.generer_corps_lettre, mesures.ACTIF = sauvegarde
+
+
+def _weasyprint_disponible() -> bool:
+    try:
+        import weasyprint  # noqa: F401
+    except (ImportError, OSError):
+        return False
+    return True
+
+
+# --- Cas mesurés --------------------------------------------------------------------------------------------
+
+def _cas(taille: str, facteur: int) -> list[tuple[str, object, object, bool]]:
+    """[(nom, fonction mesurée, préparation hors chrono ou None, nécessite WeasyPrint)] pour une taille."""
+    import diff_mots
+    from app import _diff_highlight_html, _render_cv_html
+    from export_package import export_dossier_as_zip
+    from generator import generer_pdf_bytes
+    from letter_generator import generer_lettre_pdf_bytes
+    from mots_cles import extraire_mots_cles, offre_from_description
+    from rules import appliquer_regles
+
+    cv = cv_synthetique(facteur)
+    adapte = cv_modifie(cv)
+    annonce = annonce_synthetique(facteur)
+    offre = offre_from_description(annonce, titre="Alternance Analyste Financier", entreprise="Banque Exemple")
+    base_diff = " ".join(b for exp in cv["experiences"] for b in exp["bullet_points"])
+    courant_diff = " ".join(b for exp in adapte["experiences"] for b in exp["bullet_points"])
+    vider_diff = diff_mots._cache.clear  # diff mémoïsé : chaque répétition mesure un calcul réel
+
+    def _nom(fonction: str) -> str:
+        return f"{fonction}[{taille}]"
+
+    return [
+        (_nom("extraire_mots_cles"), lambda: extraire_mots_cles(annonce), None, False),
+        (_nom("appliquer_regles"), lambda: appliquer_regles(cv, offre), None, False),
+        (_nom("diff_highlight_html"), lambda: _diff_highlight_html(base_diff, courant_diff), vider_diff, False),
+        (_nom("render_cv_html"), lambda: _render_cv_html(adapte, base_cv=cv, highlight_changes=True, for_preview=True), vider_diff, False),
+        (_nom("generer_pdf_bytes"), lambda: generer_pdf_bytes(adapte, offre), None, True),
+        (_nom("generer_lettre_pdf_bytes"), lambda: generer_lettre_pdf_bytes(adapte, annonce, offre["titre"], offre["entreprise"]), None, True),
+        (_nom("export_dossier_as_zip"), lambda: export_dossier_as_zip(adapte, offre["titre"], offre["entreprise"], annonce), None, True),
+    ]
+
+
+def _mesurer(fonction, preparation, repetitions: int) -> dict:
+    """
+    Un appel d'échauffement puis `repetitions` échantillons chronométrés (préparation exclue du chrono).
+    Sans préparation, chaque échantillon enchaîne assez d'appels pour durer ≥ ECHANTILLON_MIN_S (comme timeit) :
+    les cas sub-milliseconde ne sont pas noyés dans la résolution de l'horloge.
+    """
+    if preparation:
+        preparation()
+    fonction()
+    appels = 1
+    if not preparation:
+        while appels < 10_000:
+            t0 = time.perf_counter()
+            for _ in range(appels):
+                fonction()
+            if time.perf_counter() - t0 >= ECHANTILLON_MIN_S:
+                break
+            appels *= 2
+    durees = []
+    for _ in range(repetitions):
+        if preparation:
+            preparation()
+        t0 = time.perf_counter()
+        for _ in range(appels):
+            fonction()
+        durees.append((time.perf_counter() - t0) * 1000 / appels)
+    return {
+        "median_ms": round(statistics.median(durees), 4),
+        "min_ms": round(min(durees), 4),
+        "moyenne_ms": round(statistics.fmean(durees), 4),
+        "ecart_type_ms": round(statistics.stdev(durees), 4) if len(durees) > 1 else 0.0,
+        "repetitions": repetitions,
+        "appels_par_repetition": appels,
+    }
+
+
+def _commit() -> str | None:
+    import subprocess
+    try:
+        r = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return r.stdout.strip() or None
+
+
+def lancer(tailles: list[str], repetitions: int = REPETITIONS, filtre: str = "") -> dict:
+    """Exécute les cas (filtrés par sous-chaîne du nom) pour chaque taille. Retourne le document de résultats."""
+    import os
+    import platform
+
+    pdf_ok = _weasyprint_disponible()
+    resultats, ignores = {}, {}
+    with _environnement_isole():
+        for taille in tailles:
+            for nom, fonction, preparation, pdf in _cas(taille, TAILLES[taille]):
+                if filtre and filtre not in nom:
+                    continue
+                if pdf and not pdf_ok:
+                    ignores[nom] = "WeasyPrint non installé"
+                    print(f"  {nom:<40} ignoré (WeasyPrint non installé)")
+                    continue
+                resultats[nom] = _mesurer(fonction, preparation, repetitions)
+                r = resultats[nom]
+                print(f"  {nom:<40} {r['median_ms']:>10.3f} ms  (min {r['min_ms']:.3f}, σ {r['ecart_type_ms']:.3f})")
+    return {
+        "format": 1,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "machine": {
+            "python": platform.python_version(),
+            "plateforme": platform.platform(),
+            "processeur": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "graine": GRAINE,
+        "repetitions": repetitions,
+        "resultats": resultats,
+        "ignores": ignores,
+    }
+
+
+def comparer(reference: dict, candidat: dict, seuil: float = SEUIL_POURCENT, plancher_ms: float = PLANCHER_MS) -> list[dict]:
+    """
+    Compare les médianes des cas communs. Retourne [{ nom, reference_ms, candidat_ms, ecart_pct, statut }]
+    avec statut "regression" / "amelioration" au-delà de ±seuil % (et de plancher_ms en absolu), "stable" sinon.
+    """
+    lignes = []
+    ref, cand = reference.get("resultats", {}), candidat.get("resultats", {})
+    for nom in sorted(set(ref) & set(cand)):
+        a, b = ref[nom]["median_ms"], cand[nom]["median_ms"]
+        ecart = (b - a) / a * 100 if a else 0.0
+        statut = "stable"
+        if abs(b - a) > plancher_ms:
+            if ecart > seuil:
+                statut = "regression"
+            elif ecart < -seuil:
+                statut = "amelioration"
+        lignes.append({"nom": nom, "reference_ms": a, "candidat_ms": b, "ecart_pct": round(ecart, 1), "statut": statut})
+    return lignes
+
+
+def _charger_resultats(chemin: str) -> dict:
+    path = Path(chemin)
+    if not path.is_file():
+        print(f"Fichier introuvable : {path}")
+        sys.exit(2)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks hors ligne des chemins chauds (extraction, règles, diff, rendu, PDF).")
+    sous = parser.add_subparsers(dest="commande", required=True)
+
+    p_lancer = sous.add_parser("lancer", help="Mesurer et enregistrer les résultats en JSON")
+    p_lancer.add_argument("-o", "--output", type=str, metavar="FICHIER", help="Fichier de résultats (défaut: benchmarks/AAAAMMJJ-HHMMSS_<commit>.json)")
+    p_lancer.add_argument("--tailles", type=str, default=",".join(TAILLES), help=f"Tailles de fixtures (défaut: {','.join(TAILLES)})")
+    p_lancer.add_argument("--repetitions", type=int, default=REPETITIONS, metavar="N", help=f"Répétitions chronométrées par cas (défaut: {REPETITIONS})")
+    p_lancer.add_argument("--filtre", type=str, default="", metavar="TEXTE", help="Ne lancer que les cas dont le nom contient TEXTE")
+
+    p_comparer = sous.add_parser("comparer", help="Comparer deux fichiers de résultats et signaler les régressions")
+    p_comparer.add_argument("reference", type=str)
+    p_comparer.add_argument("candidat", type=str)
+    p_comparer.add_argument("--seuil", type=float, default=SEUIL_POURCENT, metavar="PCT", help=f"Régression si la médiane augmente de plus de PCT %% (défaut: {SEUIL_POURCENT:g})")
+    p_comparer.add_argument("--plancher-ms", type=float, default=PLANCHER_MS, metavar="MS", help=f"Écart absolu minimal pris en compte (défaut: {PLANCHER_MS:g} ms)")
+    args = parser.parse_args()
+
+    if args.commande == "lancer":
+        tailles = [t.strip() for t in args.tailles.split(",") if t.strip()]
+        inconnues = [t for t in tailles if t not in TAILLES]
+        if inconnues:
+            print(f"Taille(s) inconnue(s) : {', '.join(inconnues)} (choix : {', '.join(TAILLES)})")
+            sys.exit(2)
+        print(f"Benchmarks : tailles {', '.join(tailles)}, {args.repetitions} répétition(s) par cas")
+        doc = lancer(tailles, max(1, args.repetitions), args.filtre)
+        if args.output:
+            path = Path(args.output)
+        else:
+            path = RESULTATS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}_{doc['commit'] or 'local'}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(doc, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"✓ {len(doc['resultats'])} cas mesuré(s) → {path}")
+        return
+
+    reference, candidat = _charger_resultats(args.reference), _charger_resultats(args.candidat)
+    lignes = comparer(reference, candidat, args.seuil, args.plancher_ms)
+    symboles = {"regression": "✗", "amelioration": "✓", "stable": " "}
+    print(f"Référence : {reference.get('commit') or '?'} ({reference.get('date', '?')})  →  candidat : {candidat.get('commit') or '?'} ({candidat.get('date', '?')})")
+    print("─" * 84)
+    for c in lignes:
+        print(f"{symboles[c['statut']]} {c['nom']:<40} {c['reference_ms']:>10.3f} → {c['candidat_ms']:>10.3f} ms  {c['ecart_pct']:>+7.1f} %")
+    print("─" * 84)
+    absents = sorted(set(reference.get("resultats", {})) ^ set(candidat.get("resultats", {})))
+    if absents:
+        print(f"Cas présents d'un seul côté (non comparés) : {', '.join(absents)}")
+    regressions = [c for c in lignes if c["statut"] == "regression"]
+    if regressions:
+        print(f"✗ {len(regressions)} régression(s) au-delà de {args.seuil:g} %")
+        sys.exit(1)
+    print(f"✓ Aucune régression au-delà de {args.seuil:g} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Cache des corps de lettre de motivation rédigés par Gemini : un export répété (dossier puis ZIP, nouvel export
+après une retouche de la photo…) ne refait pas l'appel et garde la même lettre.
+Clé : empreinte de (version du prompt, modèle, consignes système, résumé du CV pour le prompt, annonce, poste, entreprise) ;
+toute modification de l'un d'eux (ou du prompt) donne une nouvelle lettre.
+Base SQLite adaptations/lettres.db (WAL, partagée entre workers et CLI). Éviction : entrées non utilisées depuis
+LETTRES_TTL_JOURS jours, puis les moins récemment utilisées au-delà de LETTRES_MAX.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+DB_PATH = BASE_DIR / "adaptations" / "lettres.db"
+
+LETTRES_MAX = int(os.environ.get("CV_BOT_LETTRES_MAX", "500") or 500)
+LETTRES_TTL_JOURS = float(os.environ.get("CV_BOT_LETTRES_TTL_JOURS", "90") or 90)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lettres (
+    cle TEXT PRIMARY KEY,
+    corps TEXT NOT NULL,
+    cree_le TEXT NOT NULL,
+    utilise_le TEXT NOT NULL,
+    utilisations INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_lettres_utilise_le ON lettres(utilise_le);
+"""
+
+_local = threading.local()
+
+
+def _connexion(path: Path | None = None) -> sqlite3.Connection:
+    """Connexion SQLite par thread (mode WAL), schéma créé au premier accès."""
+    path = Path(path or DB_PATH)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(str(path))
+    if conn is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        conns[str(path)] = conn
+    return conn
+
+
+def cle(*parties: str) -> str:
+    """Empreinte des éléments qui déterminent la lettre (séparateur impossible dans un texte saisi)."""
+    return hashlib.sha256("\x1f".join(p or "" for p in parties).encode("utf-8")).hexdigest()
+
+
+def _maintenant() -> str:
+    return datetime.utcnow().isoformat(timespec="seconds")
+
+
+def obtenir(c: str, path: Path | None = None) -> str | None:
+    """Corps de lettre en cache (et date d'utilisation rafraîchie), ou None."""
+    conn = _connexion(path)
+    with conn:
+        row = conn.execute("SELECT corps FROM lettres WHERE cle = ?", (c,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE lettres SET utilise_le = ?, utilisations = utilisations + 1 WHERE cle = ?", (_maintenant(), c))
+    return row["corps"]
+
+
+def enregistrer(c: str, corps: str, path: Path | None = None) -> None:
+    """Mémorise un corps de lettre (remplace l'entrée existante, ex. après « régénérer ») puis applique l'éviction."""
+    maintenant = _maintenant()
+    conn = _connexion(path)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO lettres (cle, corps, cree_le, utilise_le, utilisations) VALUES (?, ?, ?, ?, 0)",
+            (c, corps, maintenant, maintenant),
+        )
+    evincer(path=path)
+
+
+def evincer(max_entrees: int | None = None, ttl_jours: float | None = None, path: Path | None = None) -> int:
+    """Supprime les entrées expirées puis les moins récemment utilisées au-delà de max_entrees. Retourne le nombre supprimé."""
+    max_entrees = LETTRES_MAX if max_entrees is None else max_entrees
+    ttl_jours = LETTRES_TTL_JOURS if ttl_jours is None else ttl_jours
+    limite = (datetime.utcnow() - timedelta(days=ttl_jours)).isoformat(timespec="seconds")
+    conn = _connexion(path)
+    with conn:
+        n = conn.execute("DELETE FROM lettres WHERE utilise_le < ?", (limite,)).rowcount
+        n += conn.execute(
+            "DELETE FROM lettres WHERE cle NOT IN (SELECT cle FROM lettres ORDER BY utilise_le DESC LIMIT ?)",
+            (max(0, max_entrees),),
+        ).rowcount
+    return n
+
+
+def vider(path: Path | None = None) -> int:
+    """Vide le cache. Retourne le nombre d'entrées supprimées."""
+    conn = _connexion(path)
+    with conn:
+        return conn.execute("DELETE FROM lettres").rowcount
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Test de charge hors ligne de l'API Flask, pour dimensionner workers / threads avant les pics de candidatures.
+Démarre l'app en local (gunicorn si disponible, sinon serveur Flask multi-thread) avec Gemini remplacé par
+llm_factice (latence configurable) et des données isolées dans un dossier temporaire, puis envoie pendant --duree
+secondes un mélange de requêtes /api/adapt, /api/render-html, /api/pdf et /api/export-dossier-zip avec --concurrence
+clients en parallèle (connexions persistantes).
+Rapport : débit, latence p50/p95/p99 et taux d'erreur par route, pic de RSS du serveur (processus + workers).
+
+  python charge.py --duree 60 --concurrence 16 --latence-llm 1500 --workers 4 --threads 8 -o charge.json
+  python charge.py --melange adapt=1,render=0,pdf=0,zip=0          # adaptations seules
+  python charge.py --url http://127.0.0.1:5000                      # serveur déjà lancé via « charge:application() »
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# Poids par défaut : chaque adaptation est suivie de plusieurs rafraîchissements d'aperçu, d'un téléchargement
+# de PDF de temps en temps et plus rarement d'un export complet (CV + lettre + fiche)
+MELANGE = {"adapt": 3, "render": 4, "pdf": 2, "zip": 1}
+ROUTES = {
+    "adapt": "/api/adapt",
+    "render": "/api/render-html",
+    "pdf": "/api/pdf",
+    "zip": "/api/export-dossier-zip",
+}
+LATENCE_LLM_MS = 1500
+ANNONCES_DISTINCTES = 50
+
+
+# --- Côté serveur -------------------------------------------------------------------------------------------
+
+def _isoler(dossier: Path) -> None:
+    """
+    Base d'adaptations, artefacts, cache des lettres, index IDF, boîte d'offres et journal LLM redirigés vers dossier.
+    CV de base : CV synthétique des benchmarks écrit dans dossier/cv_base.json (le vrai cv_base.json n'est ni lu ni
+    requis) ; photo : images de assets/ copiées dans dossier/assets, où est aussi écrit photo_cv.jpg.
+    """
+    import adaptations_db
+    import app
+    import artefacts
+    import cache_lettres
+    import cv_base_cache
+    import idf
+    import inbox
+    import photo_assets
+    import telemetrie_llm
+    from benchmark import cv_synthetique
+
+    dossier.mkdir(parents=True, exist_ok=True)
+    cv_base = dossier / "cv_base.json"
+    if not cv_base.exists():
+        cv_base.write_text(json.dumps(cv_synthetique(1), ensure_ascii=False, indent=2), encoding="utf-8")
+    app.CV_BASE_PATH = cv_base_cache.CV_BASE_PATH = cv_base
+    assets = BASE_DIR / photo_assets.ASSETS_DIR
+    if assets.is_dir():
+        shutil.copytree(
+            assets, dossier / photo_assets.ASSETS_DIR, dirs_exist_ok=True,
+            ignore=shutil.ignore_patterns(photo_assets.PHOTO_CV_NAME, "*.md", "*.tmp"),
+        )
+    photo_assets.ASSETS_RACINE = dossier
+    adaptations_db.DB_PATH = dossier / "adaptations.db"
+    artefacts.ARTEFACTS_DIR = dossier / "artefacts"
+    cache_lettres.DB_PATH = dossier / "lettres.db"
+    idf.IDF_PATH = dossier / "idf_index.json.gz"
+    inbox.INBOX_PATH = dossier / "inbox.json"
+    telemetrie_llm.JOURNAL_PATH = dossier / "llm_journal.jsonl"
+
+
+def _simuler_llm(latence: float) -> None:
+    """Remplace les clients Gemini de l'adaptation et de la lettre par llm_factice (dans ce processus seulement)."""
+    import adapter
+    import letter_generator
+    from llm_factice import ClientFactice
+
+    adapter._client_gemini = lambda timeout_s=None: (ClientFactice("adaptation", latence, timeout_s), None)
+    letter_generator._client_lettre = lambda: (ClientFactice("lettre", latence), None)
+
+
+def application():
+    """
+    Fabrique WSGI du test de charge (gunicorn « charge:application() ») : app de production préchargée, Gemini
+    remplacé par llm_factice, données isolées dans CV_BOT_CHARGE_DIR. Refuse de démarrer sans CV_BOT_LLM_FACTICE
+    (latence du faux LLM en ms) : pas de quota Gemini consommé.
+    """
+    from llm_factice import latence_ms
+    latence = latence_ms()
+    if latence is None:
+        raise RuntimeError("CV_BOT_LLM_FACTICE doit être défini (latence du faux LLM en ms) pour un test de charge")
+    dossier = os.environ.get("CV_BOT_CHARGE_DIR")
+    if not dossier:
+        # Lancé à la main (gunicorn « charge:application() ») : dossier temporaire supprimé à l'arrêt du processus
+        # qui l'a créé (pas par les workers forkés, qui héritent des handlers atexit)
+        import atexit
+        dossier, createur = tempfile.mkdtemp(prefix="cv-bot-charge-"), os.getpid()
+        atexit.register(lambda: os.getpid() == createur and shutil.rmtree(dossier, ignore_errors=True))
+    _isoler(Path(dossier))
+    _simuler_llm(latence)
+    from app import app, precharger
+    precharger()
+    return app
+
+
+def _serveur_interne(port: int, threads: int) -> None:
+    """Serveur sans gunicorn : waitress si installé, sinon serveur Werkzeug multi-thread."""
+    app = application()
+    try:
+        from waitress import serve
+    except ImportError:
+        from werkzeug.serving import run_simple
+        run_simple("127.0.0.1", port, app, threaded=True)
+        return
+    serve(app, listen=f"127.0.0.1:{port}", threads=threads)
+
+
+def _port_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def demarrer_serveur(serveur: str, workers: int, threads: int, latence_llm: float, dossier: Path) -> tuple[subprocess.Popen, str, str]:
+    """Lance le serveur dans un sous-processus (journal dans dossier/serveur.log). Retourne (processus, url, type de serveur)."""
+    port = _port_libre()
+    env = {
+        **os.environ,
+        "CV_BOT_LLM_FACTICE": f"{latence_llm:g}",
+        "CV_BOT_CHARGE_DIR": str(dossier / "donnees"),
+        "CV_BOT_BIND": f"127.0.0.1:{port}",
+        "CV_BOT_WORKERS": str(workers),
+        "CV_BOT_THREADS": str(threads),
+        "CV_BOT_LOG_LEVEL": "warning",
+        "PYTHONUNBUFFERED": "1",
+    }
+    if serveur == "auto":
+        serveur = "gunicorn" if shutil.which("gunicorn") or _module_present("gunicorn") else "interne"
+    if serveur == "gunicorn":
+        commande = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "", "charge:application()"]
+    else:
+        commande = [sys.executable, __file__, "--serveur-interne", str(port), "--threads", str(threads)]
+    journal = open(dossier / "serveur.log", "wb")
+    processus = subprocess.Popen(commande, cwd=BASE_DIR, env=env, stdout=journal, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        if processus.poll() is not None:
+            raise RuntimeError(f"Le serveur s'est arrêté au démarrage (voir {dossier / 'serveur.log'})")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return processus, url, serveur
+        except OSError:
+            time.sleep(0.2)
+    processus.terminate()
+    raise RuntimeError(f"Le serveur ne répond pas après 60 s (voir {dossier / 'serveur.log'})")
+
+
+def _module_present(nom: str) -> bool:
+    import importlib.util
+    return importlib.util.find_spec(nom) is not None
+
+
+# --- Mémoire du serveur -------------------------------------------------------------------------------------
+
+def _rss_ko(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for ligne in f:
+                if ligne.startswith("VmRSS:"):
+                    return int(ligne.split()[1])
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def _descendants(pid: int) -> list[int]:
+    """pid et ses descendants (workers gunicorn), d'après le ppid de /proc/*/stat."""
+    enfants: dict[int, list[int]] = {}
+    for entree in os.listdir("/proc"):
+        if not entree.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entree}/stat", encoding="ascii", errors="replace") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        enfants.setdefault(ppid, []).append(int(entree))
+    resultat, a_voir = [], [pid]
+    while a_voir:
+        p = a_voir.pop()
+        resultat.append(p)
+        a_voir.extend(enfants.get(p, []))
+    return resultat
+
+
+class SuiviMemoire(threading.Thread):
+    """Relève toutes les 0,25 s le RSS du serveur : pic du total (maître + workers) et pic du plus gros processus."""
+
+    def __init__(self, pid: int):
+        super().__init__(name="cv-bot-charge-rss", daemon=True)
+        self.pid = pid
+        self.pic_total_ko = 0
+        self.pic_processus_ko = 0
+        self.disponible = os.path.isdir("/proc")
+        self._fin = threading.Event()
+
+    def run(self):
+        while self.disponible and not self._fin.wait(0.25):
+            rss = [_rss_ko(p) for p in _descendants(self.pid)]
+            self.pic_total_ko = max(self.pic_total_ko, sum(rss))
+            self.pic_processus_ko = max(self.pic_processus_ko, max(rss, default=0))
+
+    def arreter(self):
+        self._fin.set()
+        self.join()
+
+
+# --- Côté client ---------------------------------------------------------------------------------------------
+
+def _corps(graine: int) -> dict:
+    """Corps JSON par route, construits sur les fixtures de benchmark.py (annonces variées pour /api/adapt)."""
+    from benchmark import annonce_synthetique, cv_modifie, cv_synthetique
+
+    cv = cv_synthetique(1, graine)
+    adapte = cv_modifie(cv, graine)
+    annonces = [annonce_synthetique(1, graine + k) for k in range(ANNONCES_DISTINCTES)]
+    titre, entreprise = "Alternance Analyste Financier", "Banque Exemple"
+    return {
+        "adapt": lambda rng: {"description": rng.choice(annonces), "titre": titre, "entreprise": entreprise},
+        "render": lambda rng: {"cv": adapte, "base_cv": cv, "highlight_changes": True},
+        "pdf": lambda rng: {"cv": adapte, "titre": titre, "entreprise": entreprise},
+        "zip": lambda rng: {"cv": adapte, "titre": titre, "entreprise": entreprise, "description": annonces[0]},
+    }
+
+
+def _client(url: str, melange: dict, corps: dict, fin: float, graine: int, resultats: dict, lock: threading.Lock) -> None:
+    """Un utilisateur simulé : requêtes enchaînées sur une connexion persistante jusqu'à l'échéance."""
+    import http.client
+    from urllib.parse import urlsplit
+
+    hote = urlsplit(url)
+    rng = random.Random(graine)
+    routes, poids = list(melange), list(melange.values())
+    connexion = None
+    locales: dict[str, list] = {r: [] for r in routes}
+    while time.monotonic() < fin:
+        route = rng.choices(routes, poids)[0]
+        donnees = json.dumps(corps[route](rng)).encode("utf-8")
+        t0 = time.perf_counter()
+        try:
+            if connexion is None:
+                connexion = http.client.HTTPConnection(hote.hostname, hote.port, timeout=300)
+            connexion.request("POST", ROUTES[route], body=donnees, headers={"Content-Type": "application/json"})
+            reponse = connexion.getresponse()
+            reponse.read()
+            ok = reponse.status < 400
+            if reponse.getheader("Connection", "").lower() == "close":
+                connexion.close()
+                connexion = None
+        except (OSError, http.client.HTTPException):
+            ok = False
+            if connexion is not None:
+                connexion.close()
+            connexion = None
+        locales[route].append((time.perf_counter() - t0, ok))
+    if connexion is not None:
+        connexion.close()
+    with lock:
+        for route, mesures in locales.items():
+            resultats.setdefault(route, []).extend(mesures)
+
+
+def _percentile(valeurs: list[float], p: float) -> float | None:
+    if not valeurs:
+        return None
+    rang = max(1, -(-len(valeurs) * p // 100))
+    return valeurs[int(rang) - 1]
+
+
+def _stats(mesures: list, duree: float) -> dict:
+    latences = sorted(d * 1000 for d, _ in mesures)
+    erreurs = sum(1 for _, ok in mesures if not ok)
+    return {
+        "requetes": len(mesures),
+        "erreurs": erreurs,
+        "taux_erreur": round(erreurs / len(mesures), 4) if mesures else 0.0,
+        "debit_rps": round(len(mesures) / duree, 2),
+        "p50_ms": _percentile(latences, 50),
+        "p95_ms": _percentile(latences, 95),
+        "p99_ms": _percentile(latences, 99),
+    }
+
+
+def lancer_charge(url: str, melange: dict, concurrence: int, duree: float, graine: int = 42) -> dict:
+    """Envoie la charge pendant duree secondes. Retourne { route: stats, "total": stats }."""
+    corps = _corps(graine)
+    resultats: dict[str, list] = {}
+    lock = threading.Lock()
+    fin = time.monotonic() + duree
+    debut = time.perf_counter()
+    clients = [
+        threading.Thread(target=_client, args=(url, melange, corps, fin, graine + i, resultats, lock), daemon=True)
+        for i in range(concurrence)
+    ]
+    for c in clients:
+        c.start()
+    for c in clients:
+        c.join()
+    ecoule = time.perf_counter() - debut
+    rapport = {route: _stats(mesures, ecoule) for route, mesures in sorted(resultats.items())}
+    rapport["total"] = _stats([m for mesures in resultats.values() for m in mesures], ecoule)
+    return rapport
+
+
+def _melange(texte: str) -> dict:
+    melange = dict(MELANGE)
+    for partie in filter(None, (p.strip() for p in texte.split(","))):
+        route, _, poids = partie.partition("=")
+        if route not in ROUTES:
+            raise ValueError(f"Route inconnue : {route} (choix : {', '.join(ROUTES)})")
+        melange[route] = float(poids)
+    melange = {r: p for r, p in melange.items() if p > 0}
+    if not melange:
+        raise ValueError("Mélange vide")
+    return melange
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Test de charge hors ligne de l'API (LLM simulé, données isolées).")
+    parser.add_argument("--duree", type=float, default=30, metavar="S", help="Durée de la charge en secondes (défaut: 30)")
+    parser.add_argument("--concurrence", type=int, default=8, metavar="N", help="Clients simultanés (défaut: 8)")
+    parser.add_argument("--melange", type=str, default="", metavar="ROUTE=POIDS,…", help=f"Poids des routes (défaut: {','.join(f'{r}={p}' for r, p in MELANGE.items())})")
+    parser.add_argument("--latence-llm", type=float, default=LATENCE_LLM_MS, metavar="MS", help=f"Latence du faux Gemini en ms (défaut: {LATENCE_LLM_MS})")
+    parser.add_argument("--serveur", choices=("auto", "gunicorn", "interne"), default="auto", help="gunicorn (gunicorn.conf.py) ou serveur interne (waitress / Werkzeug) ; auto : gunicorn si installé")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("CV_BOT_WORKERS", "2")), metavar="N", help="Workers gunicorn (défaut: 2)")
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("CV_BOT_THREADS", "8")), metavar="N", help="Threads par worker (défaut: 8)")
+    parser.add_argument("--url", type=str, metavar="URL", help="Serveur déjà démarré (pas de suivi mémoire) au lieu d'en lancer un")
+    parser.add_argument("-o", "--output", type=str, metavar="FICHIER", help="Rapport JSON")
+    parser.add_argument("--garder", action="store_true", help="Garder le dossier temporaire (journal du serveur, bases, PDF rendus) ; gardé d'office en cas d'erreur")
+    parser.add_argument("--serveur-interne", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serveur_interne:
+        _serveur_interne(args.serveur_interne, args.threads)
+        return
+
+    try:
+        melange = _melange(args.melange)
+    except ValueError as e:
+        print(e)
+        sys.exit(2)
+
+    dossier = None if args.url else Path(tempfile.mkdtemp(prefix="cv-bot-charge-"))
+    garder = args.garder
+    try:
+        garder = _executer(args, melange, dossier) or garder
+    except BaseException:
+        garder = True
+        raise
+    finally:
+        if dossier is not None:
+            if garder:
+                print(f"Dossier du test conservé : {dossier}")
+            else:
+                shutil.rmtree(dossier, ignore_errors=True)
+
+
+def _executer(args, melange: dict, dossier: Path | None) -> bool:
+    """Démarre le serveur (sauf --url), envoie la charge et affiche le rapport. Retourne True s'il y a eu des erreurs."""
+    processus, suivi, serveur = None, None, "externe"
+    url = args.url
+    if not url:
+        print(f"Démarrage du serveur (LLM simulé : {args.latence_llm:g} ms)…")
+        try:
+            processus, url, serveur = demarrer_serveur(args.serveur, args.workers, args.threads, args.latence_llm, dossier)
+        except RuntimeError as e:
+            print(e)
+            sys.exit(1)
+        suivi = SuiviMemoire(processus.pid)
+        suivi.start()
+
+    description = f"{serveur}" + (f", {args.workers} worker(s) × {args.threads} thread(s)" if serveur == "gunicorn" else f", {args.threads} thread(s)" if serveur == "interne" else "")
+    print(f"Charge : {url} ({description}), {args.concurrence} client(s), {args.duree:g} s, mélange {melange}")
+    try:
+        rapport = lancer_charge(url, melange, args.concurrence, args.duree)
+    finally:
+        if suivi is not None:
+            suivi.arreter()
+        if processus is not None:
+            processus.terminate()
+            try:
+                processus.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                processus.kill()
+
+    def _ms(v):
+        return f"{v:.0f}" if v is not None else "–"
+
+    print("\n" + "─" * 84)
+    print(f"{'route':<28} {'requêtes':>8} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'erreurs':>9}")
+    for route, s in rapport.items():
+        nom = ROUTES.get(route, "total")
+        print(f"{nom:<28} {s['requetes']:>8} {s['debit_rps']:>7.2f} {_ms(s['p50_ms']):>8} {_ms(s['p95_ms']):>8} {_ms(s['p99_ms']):>8} {s['taux_erreur']:>8.1%}")
+    print("─" * 84)
+    memoire = None
+    if suivi is not None and suivi.disponible:
+        memoire = {"pic_total_mo": round(suivi.pic_total_ko / 1024, 1), "pic_processus_mo": round(suivi.pic_processus_ko / 1024, 1)}
+        print(f"Pic RSS serveur : {memoire['pic_total_mo']} Mo au total, {memoire['pic_processus_mo']} Mo pour le plus gros processus")
+    elif suivi is not None:
+        print("Pic RSS serveur : indisponible (/proc absent)")
+    erreurs = any(s["erreurs"] for s in rapport.values())
+    if erreurs and processus is not None:
+        print(f"Journal du serveur : {dossier / 'serveur.log'}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({
+            "url": url,
+            "serveur": serveur,
+            "workers": args.workers if serveur == "gunicorn" else None,
+            "threads": args.threads,
+            "concurrence": args.concurrence,
+            "duree_s": args.duree,
+            "latence_llm_ms": args.latence_llm if processus is not None else None,
+            "melange": melange,
+            "routes": rapport,
+            "memoire": memoire,
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"✓ Rapport : {args.output}")
+    return erreurs
+
+
+if __name__ == "__main__":
+    main()
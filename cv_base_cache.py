@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Cache versionné de cv_base.json : relu seulement quand (mtime, taille) change, schéma validé une fois par version.
+L'instantané porte les dérivés du CV (fragment de prompt Gemini, index des règles ATS, ids, contexte de rendu),
+calculés au premier usage et invalidés ensemble au rechargement.
+Le dict renvoyé est partagé entre requêtes : il ne doit jamais être modifié (copier avant toute écriture).
+"""
+
+import json
+import threading
+from functools import cached_property
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+CV_BASE_PATH = BASE_DIR / "cv_base.json"
+
+_courant = None
+_lock = threading.Lock()
+
+
+def valider(cv) -> None:
+    """Vérifie la structure attendue par l'adaptation et le rendu. Lève ValueError avec un message lisible."""
+    if not isinstance(cv, dict):
+        raise ValueError("cv_base.json invalide : l'objet racine doit être un dictionnaire")
+    for cle in ("prenom", "nom", "titre_professionnel", "resume"):
+        if not isinstance(cv.get(cle, ""), str):
+            raise ValueError(f"cv_base.json invalide : '{cle}' doit être une chaîne")
+    experiences = cv.get("experiences", [])
+    if not isinstance(experiences, list):
+        raise ValueError("cv_base.json invalide : 'experiences' doit être une liste")
+    ids = set()
+    for i, exp in enumerate(experiences):
+        if not isinstance(exp, dict):
+            raise ValueError(f"cv_base.json invalide : experiences[{i}] doit être un dictionnaire")
+        exp_id = exp.get("id")
+        if exp_id:
+            if exp_id in ids:
+                raise ValueError(f"cv_base.json invalide : id d'expérience en double '{exp_id}'")
+            ids.add(exp_id)
+        bullets = exp.get("bullet_points", [])
+        if not isinstance(bullets, list) or not all(isinstance(b, str) for b in bullets):
+            raise ValueError(f"cv_base.json invalide : experiences[{i}].bullet_points doit être une liste de chaînes")
+
+
+class InstantaneCV:
+    """cv_base.json à une version donnée et ses dérivés."""
+
+    def __init__(self, cv: dict, version: tuple):
+        self.cv = cv
+        self.version = version
+        self._derives: dict = {}
+        self._lock = threading.Lock()
+
+    @cached_property
+    def ids(self) -> list:
+        """Ids des expériences, dans l'ordre du CV."""
+        return [exp.get("id") for exp in self.cv.get("experiences", [])]
+
+    @cached_property
+    def fragment_prompt(self) -> str:
+        """Blocs <cv_source_resume> / <cv_source_experiences> du prompt d'adaptation complet."""
+        from adapter import _fragment_cv
+        return _fragment_cv(self.cv)
+
+    @cached_property
+    def index(self):
+        """rules.IndexCV : n-grammes normalisés du CV pour les règles ATS et la boîte d'offres."""
+        from rules import index_cv
+        return index_cv(self.cv, version=self.version)
+
+    def derive(self, cle, fabrique):
+        """Dérivé arbitraire (ex. HTML d'aperçu) calculé une fois pour cette version du CV."""
+        with self._lock:
+            if cle in self._derives:
+                return self._derives[cle]
+        valeur = fabrique()
+        with self._lock:
+            return self._derives.setdefault(cle, valeur)
+
+
+def charger(path: Path | None = None) -> InstantaneCV:
+    """Instantané courant de cv_base.json ; relit et valide le fichier seulement si sa version a changé."""
+    global _courant
+    path = path or CV_BASE_PATH
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError("cv_base.json introuvable. Lance d'abord : python main.py --setup") from None
+    version = (str(path), st.st_mtime_ns, st.st_size)
+    courant = _courant
+    if courant is not None and courant.version == version:
+        return courant
+    with _lock:
+        if _courant is not None and _courant.version == version:
+            return _courant
+        with open(path, encoding="utf-8") as f:
+            cv = json.load(f)
+        valider(cv)
+        _courant = InstantaneCV(cv, version)
+        return _courant
+
+
+def courant() -> InstantaneCV | None:
+    """Dernier instantané chargé (sans relire le fichier ni vérifier sa version) ; None avant le premier chargement."""
+    return _courant
+
+
+def instantane_de(cv: dict) -> InstantaneCV | None:
+    """Instantané dont cv est le contenu (même objet), pour réutiliser ses dérivés ; None sinon."""
+    courant = _courant
+    return courant if courant is not None and courant.cv is cv else None
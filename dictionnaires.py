@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Dictionnaires de mots-clés par domaine (domaines/*.txt) compilés en un trie sur les tokens.
+Un seul passage sur le texte tokenisé trouve tous les termes (mots simples ou expressions),
+avec des frontières de mots : « ia » ne matche pas dans « social ».
+La compilation est faite une fois et mise en cache (invalidée si un pack change sur disque).
+"""
+
+import os
+from functools import lru_cache
+from pathlib import Path
+
+DOMAINES_DIR = Path(__file__).resolve().parent / "domaines"
+
+# Clé réservée du trie marquant la fin d'un terme (valeur = forme canonique du terme)
+_FIN = "\0"
+
+
+def _lire_pack(path: Path) -> list[str]:
+    """Un terme par ligne ; lignes vides et commentaires (#) ignorés."""
+    termes = []
+    for ligne in path.read_text(encoding="utf-8").splitlines():
+        ligne = ligne.strip()
+        if ligne and not ligne.startswith("#"):
+            termes.append(ligne.lower())
+    return termes
+
+
+def chemins_packs(noms: tuple[str, ...] | None = None) -> list[Path]:
+    """Packs à charger : noms donnés, sinon CV_BOT_DOMAINES (ex. "finance,tech"), sinon tous les domaines/*.txt."""
+    if noms is None:
+        env = os.environ.get("CV_BOT_DOMAINES", "").strip()
+        noms = tuple(n.strip() for n in env.split(",") if n.strip()) or None
+    if noms is None:
+        return sorted(DOMAINES_DIR.glob("*.txt")) if DOMAINES_DIR.is_dir() else []
+    return [DOMAINES_DIR / f"{n}.txt" for n in noms if (DOMAINES_DIR / f"{n}.txt").is_file()]
+
+
+def compiler(termes, tokeniser) -> dict:
+    """Construit le trie : chaque terme est découpé avec le même tokeniser que le texte à analyser."""
+    racine: dict = {}
+    for terme in termes:
+        tokens = tokeniser(terme)
+        if not tokens:
+            continue
+        noeud = racine
+        for t in tokens:
+            noeud = noeud.setdefault(t, {})
+        noeud.setdefault(_FIN, terme)
+    return racine
+
+
+def trouver(trie: dict, tokens: list[str]) -> dict[str, int]:
+    """Tous les termes du trie présents dans la suite de tokens (chevauchements inclus) → nombre d'occurrences."""
+    trouves: dict[str, int] = {}
+    n = len(tokens)
+    for i in range(n):
+        noeud = trie.get(tokens[i])
+        j = i + 1
+        while noeud is not None:
+            terme = noeud.get(_FIN)
+            if terme is not None:
+                trouves[terme] = trouves.get(terme, 0) + 1
+            if j >= n:
+                break
+            noeud = noeud.get(tokens[j])
+            j += 1
+    return trouves
+
+
+@lru_cache(maxsize=8)
+def _automate_cache(signature: tuple, termes_de_base: tuple[str, ...], tokeniser) -> dict:
+    termes = list(termes_de_base)
+    for chemin, _mtime in signature:
+        termes.extend(_lire_pack(Path(chemin)))
+    return compiler(termes, tokeniser)
+
+
+def automate(termes_de_base: tuple[str, ...], tokeniser, noms: tuple[str, ...] | None = None) -> dict:
+    """Trie compilé (mis en cache) des termes de base + packs de domaine ; recompilé si un pack est modifié."""
+    signature = tuple((str(p), p.stat().st_mtime_ns) for p in chemins_packs(noms))
+    return _automate_cache(signature, termes_de_base, tokeniser)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Diff par mot pour le surlignage des modifications dans l'aperçu (<span class="cv-changed">).
+Calcul par difflib.SequenceMatcher (même découpage en blocs que l'ancien _diff_highlight_html, sortie identique),
+mémoïsé par empreinte (base, current) dans un LRU borné : un rafraîchissement de l'aperçu ne recalcule que les
+textes réellement modifiés. diff_highlight_lot traite toutes les paires d'un rendu d'un coup (cache consulté en une
+prise de verrou, paires identiques calculées une fois, chaque texte distinct découpé en mots une seule fois).
+
+Micro-benchmark : python diff_mots.py
+"""
+
+import hashlib
+import html
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+
+CACHE_MAX = 4096
+
+_cache: OrderedDict = OrderedDict()
+_lock = threading.Lock()
+
+
+def _calculer(base: str, current: str, base_words: list[str] | None = None, current_words: list[str] | None = None) -> str:
+    if base == current:
+        return html.escape(current)
+    base_words = base.split() if base_words is None else base_words
+    current_words = current.split() if current_words is None else current_words
+    if not current_words:
+        return ""
+    out = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, base_words, current_words).get_opcodes():
+        segment = current_words[j1:j2]
+        if not segment:
+            continue
+        escaped = html.escape(" ".join(segment))
+        out.append(escaped if tag == "equal" else f'<span class="cv-changed">{escaped}</span>')
+    return " ".join(out)
+
+
+def _cle(base: str, current: str) -> bytes:
+    return hashlib.blake2b(f"{base}\0{current}".encode("utf-8"), digest_size=16).digest()
+
+
+def _memoriser(nouveaux: dict) -> None:
+    with _lock:
+        for cle, res in nouveaux.items():
+            _cache[cle] = res
+            _cache.move_to_end(cle)
+        while len(_cache) > CACHE_MAX:
+            _cache.popitem(last=False)
+
+
+def diff_highlight_html(base: str, current: str) -> str:
+    """Texte 'current' en HTML : seules les parties différentes de 'base' sont dans <span class="cv-changed">."""
+    base = (base or "").strip()
+    current = (current or "").strip()
+    cle = _cle(base, current)
+    with _lock:
+        res = _cache.get(cle)
+        if res is not None:
+            _cache.move_to_end(cle)
+            return res
+    res = _calculer(base, current)
+    _memoriser({cle: res})
+    return res
+
+
+def diff_highlight_lot(paires: list[tuple[str, str]]) -> list[str]:
+    """
+    Toutes les paires (base, current) d'un rendu en un appel, même résultat que diff_highlight_html sur chacune.
+    Le cache est lu puis complété en une prise de verrou chacun ; parmi les paires absentes, les paires identiques
+    ne sont calculées qu'une fois et chaque texte (un original partagé par plusieurs bullets, un texte inchangé
+    d'une paire à l'autre) n'est découpé en mots qu'une fois.
+    """
+    nettoyees = [((b or "").strip(), (c or "").strip()) for b, c in paires]
+    cles = [_cle(b, c) for b, c in nettoyees]
+    resultats: dict[bytes, str] = {}
+    with _lock:
+        for cle in cles:
+            if cle not in resultats:
+                res = _cache.get(cle)
+                if res is not None:
+                    _cache.move_to_end(cle)
+                    resultats[cle] = res
+    mots: dict[str, list[str]] = {}
+    nouveaux: dict[bytes, str] = {}
+    for cle, (b, c) in zip(cles, nettoyees):
+        if cle in resultats:
+            continue
+        if b != c:
+            for t in (b, c):
+                if t not in mots:
+                    mots[t] = t.split()
+        resultats[cle] = nouveaux[cle] = _calculer(b, c, mots.get(b), mots.get(c))
+    if nouveaux:
+        _memoriser(nouveaux)
+    return [resultats[cle] for cle in cles]
+
+
+def _benchmark() -> None:
+    import random
+    import time
+
+    random.seed(0)
+    vocab = "analyse risque données reporting client projet pilotage conseil équipe marché suivi outil".split()
+    for n, taux in ((60, 0.1), (60, 0.5), (300, 0.05), (1000, 0.02), (2000, 0.02)):
+        base = [random.choice(vocab) + str(random.randint(0, 50)) for _ in range(n)]
+        current = [w if random.random() > taux else random.choice(vocab) for w in base]
+        b, c = " ".join(base), " ".join(current)
+        _cache.clear()
+        t0 = time.perf_counter()
+        diff_highlight_html(b, c)
+        t_calcul = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        diff_highlight_html(b, c)
+        t_cache = time.perf_counter() - t0
+        print(f"{n:>5} mots, {taux:>4.0%} modifiés : SequenceMatcher {t_calcul * 1e3:8.2f} ms | cache {t_cache * 1e6:6.1f} µs")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -7,6 +7,8 @@ CV.pdf, Lettre de motivation.pdf, Fiche de poste.pdf
 import re
 from pathlib import Path
 
+from mesures import etape
+
 # Chemin de base pour les dossiers (configurable par .env)
 def get_export_base_path() -> Path:
     import os
@@ -32,65 +34,185 @@ def get_export_folder_name(entreprise: str, poste: str) -> str:
     return f"{ent} - {pos}"
 
 
+def get_export_mode() -> str:
+    """Mode d'écriture des PDF dans les dossiers d'export : "copie" (défaut) ou "lien" (lien physique vers le magasin d'artefacts)."""
+    import os
+    mode = os.environ.get("CV_BOT_EXPORT_MODE", "copie").strip().lower()
+    return mode if mode in ("copie", "lien") else "copie"
+
+
+def _rendre_cv_et_fiche(cv: dict, poste: str, entreprise: str, description_fiche: str) -> list[tuple[str, bytes]]:
+    """Rend le CV et la fiche de poste en mémoire : [(nom_fichier, bytes)]."""
+    from io import BytesIO
+
+    offre = {"titre": poste, "entreprise": entreprise}
+    pdfs = []
+
+    # 1) CV
+    from generator import generer_pdf_bytes
+    cv_bytes, cv_filename = generer_pdf_bytes(cv, offre)
+    pdfs.append((cv_filename, cv_bytes))
+
+    # 2) Fiche de poste
+    from generator import environnement_templates, feuille_css
+    from weasyprint import HTML
+
+    base_dir = Path(__file__).resolve().parent
+    with etape("jinja"):
+        fiche_html = environnement_templates().get_template("fiche_poste_template.html").render(
+            contenu=description_fiche or "",
+            entreprise=entreprise or "",
+            poste=poste or "",
+        )
+    poste_safe = _sanitize_folder_name(poste or "")
+    nom_fiche = f"Fiche de poste - {poste_safe}.pdf" if poste_safe else "Fiche de poste.pdf"
+    fiche_buffer = BytesIO()
+    with etape("weasyprint.mise_en_page"):
+        document = HTML(string=fiche_html, base_url=str(base_dir)).render(
+            stylesheets=[feuille_css("fiche_poste_template.css")],
+        )
+    with etape("pdf.ecriture"):
+        document.write_pdf(fiche_buffer)
+    pdfs.append((nom_fiche, fiche_buffer.getvalue()))
+    return pdfs
+
+
+def _rendre_lettre(
+    cv: dict, poste: str, entreprise: str, description_fiche: str, corps_brut: str | None = None, regenerer_lettre: bool = False
+) -> tuple[str, bytes]:
+    """3) Lettre de motivation : (nom_fichier, bytes). corps_brut None : lettre en cache ou rédigée par Gemini (appel bloquant)."""
+    from letter_generator import generer_lettre_pdf_bytes
+    lettre_bytes, nom_lettre = generer_lettre_pdf_bytes(
+        cv, description_fiche or "", poste or "", entreprise or "", corps_brut=corps_brut, regenerer=regenerer_lettre
+    )
+    return nom_lettre, lettre_bytes
+
+
+def _rendre_pdfs(
+    cv: dict, poste: str, entreprise: str, description_fiche: str, regenerer_lettre: bool = False
+) -> list[tuple[str, bytes]]:
+    """Rend les 3 PDFs en mémoire : [(nom_fichier, bytes)] pour le CV, la fiche de poste et la lettre."""
+    return _rendre_cv_et_fiche(cv, poste, entreprise, description_fiche) + [
+        _rendre_lettre(cv, poste, entreprise, description_fiche, regenerer_lettre=regenerer_lettre)
+    ]
+
+
+async def _rendre_pdfs_async(
+    cv: dict, poste: str, entreprise: str, description_fiche: str, regenerer_lettre: bool = False
+) -> list[tuple[str, bytes]]:
+    """
+    Comme _rendre_pdfs, mais la rédaction de la lettre (Gemini, client asynchrone) se fait pendant le rendu
+    du CV et de la fiche (WeasyPrint, dans un thread) : la latence totale ≈ max(LLM, rendus) au lieu de leur somme.
+    Lettre déjà en cache (export répété) : plus d'appel, uniquement des rendus.
+    """
+    import asyncio
+
+    from letter_generator import generer_corps_lettre_async
+
+    lettre = asyncio.ensure_future(generer_corps_lettre_async(
+        cv, description_fiche or "", poste or "", entreprise or "", regenerer=regenerer_lettre
+    ))
+    try:
+        pdfs = await asyncio.to_thread(_rendre_cv_et_fiche, cv, poste, entreprise, description_fiche)
+    except BaseException:
+        lettre.cancel()
+        raise
+    corps_brut = await lettre
+    pdfs.append(await asyncio.to_thread(_rendre_lettre, cv, poste, entreprise, description_fiche, corps_brut))
+    return pdfs
+
+
+def _stocker_pdfs(proprietaire: str, pdfs: list[tuple[str, bytes]], description_fiche: str) -> dict[str, str]:
+    """
+    Range les PDFs (et le texte de la fiche) dans le magasin d'artefacts, référencés par proprietaire :
+    "export:<chemin absolu du dossier>" ou "zip:<nom du dossier>" (un export ZIP ne déréférence pas le dossier écrit).
+    Les artefacts d'un export précédent du même propriétaire sont déréférencés (collectables par gc).
+    Retourne { nom_fichier: empreinte }.
+    """
+    import artefacts
+
+    artefacts.dereferencer(proprietaire)
+    hashes = {}
+    for nom, data in pdfs:
+        hashes[nom] = artefacts.stocker(data, "application/pdf", proprietaire=proprietaire, nom=nom)
+    if description_fiche:
+        artefacts.stocker(description_fiche, "text/plain; charset=utf-8", proprietaire=proprietaire, nom="annonce.txt")
+    return hashes
+
+
+def _dossier_export(entreprise: str, poste: str, output_base: str | None, nom_dossier: str | None = None) -> tuple[str, Path]:
+    base = Path(output_base).resolve() if output_base and output_base.strip() else get_export_base_path()
+    folder_name = _sanitize_folder_name(nom_dossier or "", 100) or get_export_folder_name(entreprise, poste)
+    return folder_name, base / folder_name
+
+
+def _ecrire_dossier(folder_name: str, folder_path: Path, pdfs: list[tuple[str, bytes]], description_fiche: str, mode: str | None) -> dict:
+    import artefacts
+
+    folder_path.mkdir(parents=True, exist_ok=True)
+    mode = mode or get_export_mode()
+    with etape("artefacts"):
+        hashes = _stocker_pdfs(f"export:{folder_path}", pdfs, description_fiche)
+        for nom, _ in pdfs:
+            artefacts.materialiser(hashes[nom], folder_path / nom, mode=mode)
+    return {"folder": str(folder_path), "files": [nom for nom, _ in pdfs], "artefacts": hashes}
+
+
+def _zip_dossier(folder_name: str, pdfs: list[tuple[str, bytes]], description_fiche: str) -> tuple[bytes, str, list[str]]:
+    import zipfile
+    from io import BytesIO
+
+    with etape("artefacts"):
+        _stocker_pdfs(f"zip:{folder_name}", pdfs, description_fiche)
+    # ZIP : sous-dossier "Entreprise - Poste" contenant les 3 fichiers
+    zip_buffer = BytesIO()
+    with etape("zip"), zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for nom, data in pdfs:
+            zf.writestr(f"{folder_name}/{nom}", data)
+    return zip_buffer.getvalue(), folder_name, [nom for nom, _ in pdfs]
+
+
 def export_dossier(
     cv: dict,
     poste: str,
     entreprise: str,
     description_fiche: str,
     output_base: str | None = None,
+    mode: str | None = None,
+    regenerer_lettre: bool = False,
+    nom_dossier: str | None = None,
 ) -> dict:
     """
     Crée le dossier 'Entreprise - Poste' dans output_base (ou CV_BOT_EXPORT_BASE si non fourni), y place :
     - CV : {Prenom} {Nom} - {Poste}.pdf
     - Lettre de motivation, Fiche de poste (noms avec poste).
-    Retourne { "folder": chemin_absolu, "files": [ noms des fichiers ] }
+    Les PDFs passent par le magasin d'artefacts (un contenu identique n'est stocké qu'une fois) ; mode "lien"
+    (ou CV_BOT_EXPORT_MODE=lien) : liens physiques au lieu de copies.
+    La lettre déjà rédigée pour ce CV et cette annonce est réutilisée (cache_lettres) ; regenerer_lettre=True : nouvelle lettre.
+    nom_dossier : nom du sous-dossier à la place de 'Entreprise - Poste' (ex. nom du fichier de l'annonce).
+    Retourne { "folder": chemin_absolu, "files": [ noms des fichiers ], "artefacts": { nom: empreinte } }
     """
-    base = Path(output_base).resolve() if output_base and output_base.strip() else get_export_base_path()
-    folder_name = get_export_folder_name(entreprise, poste)
-    folder_path = base / folder_name
-    folder_path.mkdir(parents=True, exist_ok=True)
+    folder_name, folder_path = _dossier_export(entreprise, poste, output_base, nom_dossier)
+    pdfs = _rendre_pdfs(cv, poste, entreprise, description_fiche, regenerer_lettre)
+    return _ecrire_dossier(folder_name, folder_path, pdfs, description_fiche, mode)
 
-    offre = {"titre": poste, "entreprise": entreprise}
-    files_created = []
 
-    # 1) CV
-    from generator import generer_pdf
-    cv_path = generer_pdf(cv, offre, output_dir=str(folder_path))
-    files_created.append(Path(cv_path).name)
-
-    # 2) Fiche de poste
-    from jinja2 import Environment, FileSystemLoader, select_autoescape
-    from weasyprint import HTML, CSS
-
-    base_dir = Path(__file__).resolve().parent
-    env = Environment(
-        loader=FileSystemLoader(str(base_dir)),
-        autoescape=select_autoescape(("html", "xml")),
-    )
-    fiche_html = env.get_template("fiche_poste_template.html").render(
-        contenu=description_fiche or "",
-        entreprise=entreprise or "",
-        poste=poste or "",
-    )
-    poste_safe = _sanitize_folder_name(poste or "")
-    nom_fiche = f"Fiche de poste - {poste_safe}.pdf" if poste_safe else "Fiche de poste.pdf"
-    fiche_path = folder_path / nom_fiche
-    HTML(string=fiche_html, base_url=str(base_dir)).write_pdf(
-        fiche_path,
-        stylesheets=[CSS(filename=base_dir / "fiche_poste_template.css")],
-    )
-    files_created.append(fiche_path.name)
-
-    # 3) Lettre de motivation
-    from letter_generator import generer_lettre_pdf
-    prenom = (cv.get("prenom") or "").strip()
-    nom = (cv.get("nom") or "").strip()
-    nom_lettre = f"Motivation {prenom} {nom} - {poste_safe}.pdf" if poste_safe else f"Motivation {prenom} {nom}.pdf"
-    lettre_path = folder_path / nom_lettre
-    generer_lettre_pdf(cv, description_fiche or "", poste or "", entreprise or "", lettre_path)
-    files_created.append(lettre_path.name)
+async def export_dossier_async(
+    cv: dict,
+    poste: str,
+    entreprise: str,
+    description_fiche: str,
+    output_base: str | None = None,
+    mode: str | None = None,
+    regenerer_lettre: bool = False,
+    nom_dossier: str | None = None,
+) -> dict:
+    """Version asyncio de export_dossier (lettre rédigée pendant les rendus PDF)."""
+    import asyncio
 
-    return {"folder": str(folder_path), "files": files_created}
+    folder_name, folder_path = _dossier_export(entreprise, poste, output_base, nom_dossier)
+    pdfs = await _rendre_pdfs_async(cv, poste, entreprise, description_fiche, regenerer_lettre)
+    return await asyncio.to_thread(_ecrire_dossier, folder_name, folder_path, pdfs, description_fiche, mode)
 
 
 def export_dossier_as_zip(
@@ -98,60 +220,28 @@ def export_dossier_as_zip(
     poste: str,
     entreprise: str,
     description_fiche: str,
+    regenerer_lettre: bool = False,
 ) -> tuple[bytes, str, list[str]]:
     """
-    Génère les 3 PDFs en mémoire et les renvoie dans un ZIP.
+    Génère les 3 PDFs en mémoire et les renvoie dans un ZIP (ils sont aussi rangés dans le magasin d'artefacts).
     Retourne (zip_bytes, nom_dossier, liste_noms_fichiers).
-    Utilisé pour l'export via "Parcourir" (File System Access) côté client.
+    Utilisé pour l'export via "Parcourir" (File System Access) côté client. regenerer_lettre : comme export_dossier.
     """
-    import zipfile
-    from io import BytesIO
-
     folder_name = get_export_folder_name(entreprise, poste)
-    offre = {"titre": poste, "entreprise": entreprise}
-    files_created = []
+    pdfs = _rendre_pdfs(cv, poste, entreprise, description_fiche, regenerer_lettre)
+    return _zip_dossier(folder_name, pdfs, description_fiche)
 
-    # 1) CV
-    from generator import generer_pdf_bytes
-    cv_bytes, cv_filename = generer_pdf_bytes(cv, offre)
-    files_created.append(cv_filename)
-
-    # 2) Fiche de poste
-    from jinja2 import Environment, FileSystemLoader, select_autoescape
-    from weasyprint import HTML, CSS
-
-    base_dir = Path(__file__).resolve().parent
-    env = Environment(
-        loader=FileSystemLoader(str(base_dir)),
-        autoescape=select_autoescape(("html", "xml")),
-    )
-    fiche_html = env.get_template("fiche_poste_template.html").render(
-        contenu=description_fiche or "",
-        entreprise=entreprise or "",
-        poste=poste or "",
-    )
-    poste_safe = _sanitize_folder_name(poste or "")
-    nom_fiche = f"Fiche de poste - {poste_safe}.pdf" if poste_safe else "Fiche de poste.pdf"
-    fiche_buffer = BytesIO()
-    HTML(string=fiche_html, base_url=str(base_dir)).write_pdf(
-        fiche_buffer,
-        stylesheets=[CSS(filename=base_dir / "fiche_poste_template.css")],
-    )
-    fiche_bytes = fiche_buffer.getvalue()
-    files_created.append(nom_fiche)
 
-    # 3) Lettre de motivation
-    from letter_generator import generer_lettre_pdf_bytes
-    lettre_bytes, nom_lettre = generer_lettre_pdf_bytes(
-        cv, description_fiche or "", poste or "", entreprise or ""
-    )
-    files_created.append(nom_lettre)
-
-    # ZIP : sous-dossier "Entreprise - Poste" contenant les 3 fichiers
-    zip_buffer = BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr(f"{folder_name}/{cv_filename}", cv_bytes)
-        zf.writestr(f"{folder_name}/{nom_fiche}", fiche_bytes)
-        zf.writestr(f"{folder_name}/{nom_lettre}", lettre_bytes)
+async def export_dossier_as_zip_async(
+    cv: dict,
+    poste: str,
+    entreprise: str,
+    description_fiche: str,
+    regenerer_lettre: bool = False,
+) -> tuple[bytes, str, list[str]]:
+    """Version asyncio de export_dossier_as_zip (lettre rédigée pendant les rendus PDF)."""
+    import asyncio
 
-    return zip_buffer.getvalue(), folder_name, files_created
+    folder_name = get_export_folder_name(entreprise, poste)
+    pdfs = await _rendre_pdfs_async(cv, poste, entreprise, description_fiche, regenerer_lettre)
+    return await asyncio.to_thread(_zip_dossier, folder_name, pdfs, description_fiche)
@@ -20,11 +20,36 @@ if os.name == "nt":
                 except OSError:
                     pass
 
+from functools import lru_cache
+
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 
+from mesures import etape
+from pertinence import choisir_affichage
 from photo_assets import ensure_compressed_photo, get_photo_url_for_cv
 
 
+@lru_cache(maxsize=1)
+def environnement_templates() -> Environment:
+    """Environnement Jinja partagé : templates compilés une fois par processus (rechargés s'ils sont modifiés)."""
+    return Environment(
+        loader=FileSystemLoader(str(Path(__file__).resolve().parent)),
+        autoescape=select_autoescape(("html", "xml")),
+    )
+
+
+def feuille_css(nom: str):
+    """Feuille de style WeasyPrint du dossier du projet, parsée une fois par processus (reparsée si le .css est modifié)."""
+    chemin = Path(__file__).resolve().parent / nom
+    return _feuille_css(str(chemin), os.stat(chemin).st_mtime_ns)
+
+
+@lru_cache(maxsize=8)
+def _feuille_css(chemin: str, mtime_ns: int):
+    from weasyprint import CSS
+    return CSS(filename=chemin)
+
+
 def _sanitize_filename(s: str, max_len: int = 80) -> str:
     """Retire les caractères interdits dans un nom de fichier."""
     s = re.sub(r'[<>:"/\\|?*]', "", s)
@@ -71,7 +96,7 @@ def generer_pdf(cv_adapte: dict, offre: dict, output_dir: str = ".") -> str:
     Retourne le chemin absolu du fichier PDF généré.
     """
     try:
-        from weasyprint import HTML, CSS
+        from weasyprint import HTML
     except ImportError:
         raise ImportError(
             "WeasyPrint est requis pour générer le PDF.\n"
@@ -86,8 +111,9 @@ def generer_pdf(cv_adapte: dict, offre: dict, output_dir: str = ".") -> str:
     out.mkdir(parents=True, exist_ok=True)
 
     cv_adapte = dict(cv_adapte)
-    ensure_compressed_photo(base_dir, cv_adapte.get("photo_url"), cv_adapte.get("prenom"), cv_adapte.get("nom"))
-    photo_url = get_photo_url_for_cv(base_dir, cv_adapte.get("photo_url"), cv_adapte.get("prenom"), cv_adapte.get("nom"))
+    with etape("photo"):
+        ensure_compressed_photo(base_dir, cv_adapte.get("photo_url"), cv_adapte.get("prenom"), cv_adapte.get("nom"))
+        photo_url = get_photo_url_for_cv(base_dir, cv_adapte.get("photo_url"), cv_adapte.get("prenom"), cv_adapte.get("nom"))
     if photo_url:
         cv_adapte["photo_url"] = photo_url
 
@@ -96,27 +122,27 @@ def generer_pdf(cv_adapte: dict, offre: dict, output_dir: str = ".") -> str:
     cv_adapte["resume_display"] = html_module.escape(cv_adapte.get("resume") or "")
     cv_adapte["for_preview"] = False
     experiences_for_display = []
-    for exp in (cv_adapte.get("experiences") or [])[:6]:
-        bullets = (exp.get("bullet_points") or [])[:2]
+    for exp, indices in choisir_affichage(cv_adapte):
+        bullets = [exp["bullet_points"][j] for j in indices]
         experiences_for_display.append({**exp, "bullet_points": [{"text": b, "html": html_module.escape(b)} for b in bullets]})
     cv_adapte["experiences_for_display"] = experiences_for_display
 
-    env = Environment(
-        loader=FileSystemLoader(str(base_dir)),
-        autoescape=select_autoescape(("html", "xml")),
-    )
-    template = env.get_template("template.html")
-    html_str = template.render(**cv_adapte)
+    with etape("jinja"):
+        template = environnement_templates().get_template("template.html")
+        html_str = template.render(**cv_adapte)
 
     # Fichier HTML temporaire pour WeasyPrint (pour résoudre template.css)
     html_path = base_dir / "template.html"
     # WeasyPrint peut prendre une string HTML ; il faut alors une base_url pour les CSS
     html_doc = HTML(string=html_str, base_url=str(base_dir))
-    css = CSS(filename=base_dir / "template.css")
+    css = feuille_css("template.css")
 
     nom_pdf = _nom_fichier_pdf(cv_adapte, offre)
     path_pdf = out / nom_pdf
-    html_doc.write_pdf(path_pdf, stylesheets=[css])
+    with etape("weasyprint.mise_en_page"):
+        document = html_doc.render(stylesheets=[css])
+    with etape("pdf.ecriture"):
+        document.write_pdf(path_pdf)
 
     return str(path_pdf)
 
@@ -127,7 +153,7 @@ def generer_pdf_bytes(cv_adapte: dict, offre: dict) -> tuple[bytes, str]:
     Utile pour renvoyer le PDF dans une réponse HTTP sans écrire sur disque.
     """
     try:
-        from weasyprint import HTML, CSS
+        from weasyprint import HTML
     except ImportError:
         raise ImportError(
             "WeasyPrint est requis pour générer le PDF.\n"
@@ -136,8 +162,9 @@ def generer_pdf_bytes(cv_adapte: dict, offre: dict) -> tuple[bytes, str]:
 
     base_dir = Path(__file__).resolve().parent
     cv_adapte = dict(cv_adapte)
-    ensure_compressed_photo(base_dir, cv_adapte.get("photo_url"), cv_adapte.get("prenom"), cv_adapte.get("nom"))
-    photo_url = get_photo_url_for_cv(base_dir, cv_adapte.get("photo_url"), cv_adapte.get("prenom"), cv_adapte.get("nom"))
+    with etape("photo"):
+        ensure_compressed_photo(base_dir, cv_adapte.get("photo_url"), cv_adapte.get("prenom"), cv_adapte.get("nom"))
+        photo_url = get_photo_url_for_cv(base_dir, cv_adapte.get("photo_url"), cv_adapte.get("prenom"), cv_adapte.get("nom"))
     if photo_url:
         cv_adapte["photo_url"] = photo_url
 
@@ -146,22 +173,22 @@ def generer_pdf_bytes(cv_adapte: dict, offre: dict) -> tuple[bytes, str]:
     cv_adapte["resume_display"] = html_module.escape(cv_adapte.get("resume") or "")
     cv_adapte["for_preview"] = False
     experiences_for_display = []
-    for exp in (cv_adapte.get("experiences") or [])[:6]:
-        bullets = (exp.get("bullet_points") or [])[:2]
+    for exp, indices in choisir_affichage(cv_adapte):
+        bullets = [exp["bullet_points"][j] for j in indices]
         experiences_for_display.append({**exp, "bullet_points": [{"text": b, "html": html_module.escape(b)} for b in bullets]})
     cv_adapte["experiences_for_display"] = experiences_for_display
 
-    env = Environment(
-        loader=FileSystemLoader(str(base_dir)),
-        autoescape=select_autoescape(("html", "xml")),
-    )
-    template = env.get_template("template.html")
-    html_str = template.render(**cv_adapte)
+    with etape("jinja"):
+        template = environnement_templates().get_template("template.html")
+        html_str = template.render(**cv_adapte)
     html_doc = HTML(string=html_str, base_url=str(base_dir))
-    css = CSS(filename=base_dir / "template.css")
+    css = feuille_css("template.css")
 
     nom_pdf = _nom_fichier_pdf(cv_adapte, offre)
     from io import BytesIO
     buffer = BytesIO()
-    html_doc.write_pdf(buffer, stylesheets=[css])
+    with etape("weasyprint.mise_en_page"):
+        document = html_doc.render(stylesheets=[css])
+    with etape("pdf.ecriture"):
+        document.write_pdf(buffer)
     return buffer.getvalue(), nom_pdf
@@ -0,0 +1,34 @@
+"""
+Configuration gunicorn : gunicorn -c gunicorn.conf.py wsgi:app
+Charge de travail mixte : attente des appels Gemini (I/O, des secondes) + rendu PDF WeasyPrint (CPU, ~1 s).
+- workers (processus) ≈ nombre de cœurs : parallélisme des rendus PDF ;
+- threads par worker : les requêtes qui attendent Gemini n'occupent qu'un thread ;
+- preload_app : WeasyPrint, templates, automate des mots-clés et cv_base chargés une fois avant le fork ;
+- timeout large : une adaptation peut attendre Gemini (429 → pause de 15 s puis nouvel essai).
+L'état partagé sur disque est sûr en multi-workers : SQLite en WAL (adaptations, artefacts), verrous de fichier
+(inbox.json, index IDF), écritures atomiques (photo_cv.jpg).
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get("CV_BOT_BIND", "127.0.0.1:5000")
+workers = int(os.environ.get("CV_BOT_WORKERS", str(min(multiprocessing.cpu_count(), 4))))
+worker_class = "gthread"
+threads = int(os.environ.get("CV_BOT_THREADS", "8"))
+preload_app = True
+
+timeout = int(os.environ.get("CV_BOT_TIMEOUT", "180"))
+graceful_timeout = 60
+keepalive = 5
+
+# Recyclage périodique des workers (la mémoire de WeasyPrint / Pango ne redescend pas)
+max_requests = 500
+max_requests_jitter = 50
+
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("CV_BOT_LOG_LEVEL", "info")
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Modèle IDF (fréquence documentaire inverse) appris sur les fiches de poste déjà traitées.
+Sert à pondérer les mots-clés de mots_cles.extraire_mots_cles : un terme présent dans presque
+toutes les annonces (« poste », « équipe ») pèse moins qu'un terme spécifique (« bâle », « alm »).
+Index sur disque en deux parties :
+- instantané JSON gzip (nombre de documents, df par terme, empreintes des annonces vues) ;
+- journal d'ajouts (une ligne JSON par nouvelle annonce : empreinte + termes), seul fichier écrit à chaque adaptation.
+Le journal est rejoué de façon incrémentale (à partir du dernier octet lu) ; au-delà de IDF_COMPACTION_DOCS entrées,
+il est fusionné dans un nouvel instantané, élagué (bigrammes vus une seule fois, empreintes les plus anciennes
+au-delà de IDF_VUS_MAX). Le scoring reste une simple lecture de dict en mémoire.
+"""
+
+import gzip
+import hashlib
+import json
+import math
+import os
+import threading
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+IDF_PATH = BASE_DIR / "adaptations" / "idf_index.json.gz"
+
+# En dessous de ce nombre d'annonces, l'IDF n'est pas significatif : poids neutre (1.0)
+IDF_MIN_DOCUMENTS = 5
+# Entrées du journal au-delà desquelles il est fusionné dans l'instantané
+IDF_COMPACTION_DOCS = int(os.environ.get("CV_BOT_IDF_COMPACTION_DOCS", "200") or 200)
+# Empreintes d'annonces conservées (anti double comptage) ; les plus anciennes sont oubliées à la compaction
+IDF_VUS_MAX = int(os.environ.get("CV_BOT_IDF_VUS_MAX", "20000") or 20000)
+
+_lock = threading.RLock()
+# Index en mémoire : signature de l'instantané, génération, position lue dans le journal, entrées du journal,
+# signature du journal au dernier rejeu (inchangée avec l'instantané : index servi sans relire aucun fichier)
+_cache: dict = {"path": None, "signature": None, "generation": 0, "position": 0, "entrees": 0, "index": None, "journal": None}
+
+
+def empreinte(texte: str) -> str:
+    """Empreinte courte d'une annonce (évite de compter deux fois la même fiche)."""
+    return hashlib.sha256((texte or "").strip().encode("utf-8")).hexdigest()[:16]
+
+
+class IndexIDF:
+    """Fréquences documentaires par terme (mot ou bigramme) + empreintes des annonces déjà comptées (ordre d'ajout)."""
+
+    def __init__(self, n_docs: int = 0, df: dict | None = None, vus=None):
+        self.n_docs = n_docs
+        self.df: dict[str, int] = df or {}
+        self.vus: dict[str, None] = dict.fromkeys(vus or ())
+
+    def ajouter(self, termes: set, cle: str) -> bool:
+        """Compte une annonce (ensemble de termes distincts). Retourne False si elle était déjà connue."""
+        if cle in self.vus:
+            return False
+        self.vus[cle] = None
+        self.n_docs += 1
+        df = self.df
+        for t in termes:
+            df[t] = df.get(t, 0) + 1
+        return True
+
+    def poids(self, terme: str) -> float:
+        """IDF lissé ; 1.0 tant que le corpus est trop petit."""
+        if self.n_docs < IDF_MIN_DOCUMENTS:
+            return 1.0
+        return math.log((1 + self.n_docs) / (1 + self.df.get(terme, 0))) + 1.0
+
+    def elaguer(self, vus_max: int | None = None) -> None:
+        """
+        Retire les bigrammes vus dans une seule annonce (la grande majorité des termes, poids maximal de toute façon)
+        et les empreintes les plus anciennes au-delà de vus_max. Les mots simples sont tous conservés.
+        """
+        vus_max = IDF_VUS_MAX if vus_max is None else vus_max
+        self.df = {t: n for t, n in self.df.items() if n > 1 or " " not in t}
+        if len(self.vus) > vus_max:
+            self.vus = dict.fromkeys(list(self.vus)[len(self.vus) - vus_max:])
+
+    def vers_dict(self) -> dict:
+        return {"n_docs": self.n_docs, "df": self.df, "vus": list(self.vus)}
+
+    @classmethod
+    def depuis_dict(cls, data: dict) -> "IndexIDF":
+        return cls(int(data.get("n_docs", 0)), dict(data.get("df") or {}), data.get("vus") or [])
+
+
+def _chemin_journal(path: Path) -> Path:
+    return path.with_name(f"{path.name.split('.')[0]}.journal.jsonl")
+
+
+def _signature(path: Path) -> tuple:
+    try:
+        st = path.stat()
+        return (str(path), st.st_mtime_ns, st.st_size)
+    except OSError:
+        return (str(path), None, None)
+
+
+def _lire_instantane(path: Path) -> tuple[IndexIDF, int]:
+    """(index, génération) de l'instantané ; index vide si absent ou illisible."""
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        return IndexIDF.depuis_dict(data), int(data.get("generation", 0))
+    except (OSError, ValueError):
+        return IndexIDF(), 0
+
+
+def _rejouer_journal(path: Path) -> None:
+    """Applique à l'index en cache les entrées du journal écrites depuis la dernière lecture (lignes complètes)."""
+    journal = _chemin_journal(path)
+    try:
+        with open(journal, "rb") as f:
+            if _cache["position"] == 0:
+                entete = f.readline()
+                try:
+                    generation = json.loads(entete).get("generation")
+                except (ValueError, AttributeError):
+                    generation = None
+                if not entete.endswith(b"\n") or generation != _cache["generation"]:
+                    return  # journal d'une autre génération (compaction en cours) ou en cours de création
+                _cache["position"] = f.tell()
+            f.seek(_cache["position"])
+            index = _cache["index"]
+            for ligne in f:
+                if not ligne.endswith(b"\n"):
+                    break  # ligne en cours d'écriture par un autre processus
+                _cache["position"] += len(ligne)
+                try:
+                    entree = json.loads(ligne)
+                    index.ajouter(set(entree["termes"]), entree["cle"])
+                    _cache["entrees"] += 1
+                except (ValueError, KeyError, TypeError):
+                    continue
+    except OSError:
+        return
+
+
+def charger(path: Path | None = None) -> IndexIDF:
+    """
+    Index IDF en mémoire : instantané relu seulement s'il change (mtime/taille), puis entrées du journal
+    ajoutées depuis la dernière lecture (par ce processus ou un autre). Si ni l'instantané ni le journal n'ont
+    changé depuis l'appel précédent, l'index en cache est retourné tel quel (deux stat, aucune lecture).
+    """
+    path = path or IDF_PATH
+    with _lock:
+        return _charger(path)
+
+
+def _charger(path: Path) -> IndexIDF:
+    signature = _signature(path)
+    if _cache["path"] != str(path) or _cache["signature"] != signature or _cache["index"] is None:
+        index, generation = _lire_instantane(path) if signature[1] is not None else (IndexIDF(), 0)
+        _cache.update(path=str(path), signature=signature, generation=generation, position=0, entrees=0, index=index, journal=None)
+    journal = _signature(_chemin_journal(path))
+    if journal != _cache["journal"]:
+        _rejouer_journal(path)
+        _cache["journal"] = journal
+    return _cache["index"]
+
+
+def sauvegarder(index: IndexIDF, path: Path | None = None) -> Path:
+    """
+    Nouvel instantané (écriture atomique, JSON compact gzip) contenant tout l'index, puis journal vide de la
+    génération suivante. L'index passé reste l'index en mémoire (pas de relecture).
+    """
+    path = path or IDF_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    generation = (_cache["generation"] if _cache["path"] == str(path) else 0) + 1
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump({"generation": generation, **index.vers_dict()}, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+    # Un lecteur qui voit le nouvel instantané ignore l'ancien journal (génération différente), et inversement
+    journal = _chemin_journal(path)
+    tmp = journal.with_name(f"{journal.name}.{os.getpid()}.tmp")
+    entete = (json.dumps({"generation": generation}) + "\n").encode("utf-8")
+    tmp.write_bytes(entete)
+    os.replace(tmp, journal)
+    _cache.update(
+        path=str(path), signature=_signature(path), generation=generation, position=len(entete), entrees=0, index=index,
+        journal=_signature(journal),
+    )
+    return path
+
+
+def ajouter_documents(documents: list[tuple[set, str]], path: Path | None = None) -> int:
+    """
+    Ajoute des annonces (termes, empreinte) à l'index persistant : seules les nouvelles annonces sont écrites,
+    en fin de journal. Compaction (nouvel instantané élagué) au-delà de IDF_COMPACTION_DOCS entrées.
+    Retourne le nombre de nouvelles annonces.
+    """
+    from verrous import verrou_fichier
+
+    path = path or IDF_PATH
+    # Verrou inter-processus : plusieurs workers / le CLI peuvent compléter l'index en même temps
+    with _lock, verrou_fichier(path):
+        index = charger(path)
+        lignes = [
+            json.dumps({"cle": cle, "termes": sorted(termes)}, ensure_ascii=False, separators=(",", ":"))
+            for termes, cle in documents
+            if index.ajouter(termes, cle)
+        ]
+        if not lignes:
+            return 0
+        if _signature(path)[1] is None or _cache["position"] == 0:
+            # Pas encore d'instantané (ou journal d'une autre génération) : on repart d'un instantané complet
+            sauvegarder(index, path)
+            return len(lignes)
+        with open(_chemin_journal(path), "ab") as f:
+            f.write("".join(l + "\n" for l in lignes).encode("utf-8"))
+            _cache["position"] = f.tell()
+        _cache["journal"] = _signature(_chemin_journal(path))
+        _cache["entrees"] += len(lignes)
+        if _cache["entrees"] >= IDF_COMPACTION_DOCS:
+            index.elaguer()
+            sauvegarder(index, path)
+        return len(lignes)
+
+
+def descriptions_historique() -> list[str]:
+    """Textes d'annonces de l'historique des adaptations (base SQLite, cf. adaptations_db)."""
+    from adaptations_db import descriptions
+    return descriptions()
+
+
+def descriptions_fichiers(chemins: list[str]) -> list[str]:
+    """Annonces d'entrée batch : .jsonl (une annonce par ligne, clé "description"), sinon fichier texte entier."""
+    textes = []
+    for chemin in chemins:
+        p = Path(chemin)
+        if not p.is_file():
+            continue
+        if p.suffix.lower() == ".jsonl":
+            for ligne in p.read_text(encoding="utf-8").splitlines():
+                try:
+                    d = json.loads(ligne)
+                except ValueError:
+                    continue
+                if isinstance(d, dict) and str(d.get("description") or "").strip():
+                    textes.append(d["description"])
+        else:
+            textes.append(p.read_text(encoding="utf-8"))
+    return textes
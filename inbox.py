@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Boîte d'offres : classe des milliers de fiches de poste par pertinence pour cv_base.json.
+Index inversé forme normalisée → offres qui la contiennent parmi leurs mots-clés ; le classement parcourt
+les n-grammes de chaque expérience du CV (rules.IndexCV) et cumule les correspondances par offre.
+Même sémantique que rules._score_experience / score_global : pour chaque offre, moyenne sur les expériences
+de min(10, mots-clés présents / nombre de mots-clés × 10).
+Persistée dans adaptations/inbox.json (offres déjà extraites) ; l'index inversé est reconstruit au chargement.
+"""
+
+import heapq
+import json
+import os
+import threading
+from pathlib import Path
+
+from rules import NGRAM_MAX, IndexCV, _formes_normalisees, _mots_offre
+
+BASE_DIR = Path(__file__).resolve().parent
+INBOX_PATH = BASE_DIR / "adaptations" / "inbox.json"
+
+EXTENSIONS_OFFRES = (".txt", ".md", ".html")
+
+
+class BoiteOffres:
+    """Offres indexées (ajout / retrait incrémental) et classement top-K contre un IndexCV."""
+
+    def __init__(self):
+        self.offres: dict[str, dict] = {}
+        self._formes: dict[str, tuple] = {}
+        self._n_mots: dict[str, int] = {}
+        self._inverse: dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.offres)
+
+    def ajouter(self, offre_id: str, offre: dict) -> bool:
+        """Indexe une offre (dict de mots_cles.offre_from_description). Retourne False si l'id existe déjà."""
+        with self._lock:
+            if offre_id in self.offres:
+                return False
+            mots = _mots_offre(offre)
+            formes = tuple(_formes_normalisees(mots))
+            self.offres[offre_id] = offre
+            self._formes[offre_id] = formes
+            self._n_mots[offre_id] = len(mots)
+            for f in formes:
+                self._inverse.setdefault(f, set()).add(offre_id)
+            return True
+
+    def retirer(self, offre_id: str) -> bool:
+        """Retire une offre de l'index. Retourne False si elle n'y était pas."""
+        with self._lock:
+            if offre_id not in self.offres:
+                return False
+            for f in self._formes.pop(offre_id):
+                ids = self._inverse.get(f)
+                if ids is not None:
+                    ids.discard(offre_id)
+                    if not ids:
+                        del self._inverse[f]
+            del self.offres[offre_id]
+            del self._n_mots[offre_id]
+            return True
+
+    def classer(self, index: IndexCV, k: int = 10) -> list[dict]:
+        """Top-K des offres par score_global décroissant (score par expérience inclus, dans l'ordre du CV)."""
+        n_exp = len(index.experiences)
+        with self._lock:
+            # matches[offre_id][i] = nombre de mots-clés de l'offre présents dans l'expérience i
+            matches: dict[str, list] = {}
+            longues = [f for f in self._inverse if f.count(" ") >= NGRAM_MAX]
+            for i, texte in enumerate(index.experiences):
+                for ngramme in texte.ngrammes:
+                    for oid in self._inverse.get(ngramme, ()):
+                        matches.setdefault(oid, [0] * n_exp)[i] += 1
+                # Expressions plus longues que les n-grammes indexés : recherche en sous-chaîne
+                for f in longues:
+                    if f not in texte.ngrammes and texte.contient(f):
+                        for oid in self._inverse[f]:
+                            matches.setdefault(oid, [0] * n_exp)[i] += 1
+
+            def _scores(oid: str) -> list[float]:
+                n_mots = self._n_mots[oid]
+                if not n_mots:
+                    return [5.0] * n_exp
+                m = matches.get(oid) or [0] * n_exp
+                return [min(10.0, max(0.0, (c / n_mots) * 10.0)) for c in m]
+
+            resultats = []
+            for oid in self.offres:
+                scores = _scores(oid)
+                score_global = round((sum(scores) / len(scores)) if scores else 0, 1)
+                resultats.append((score_global, oid, scores))
+            top = heapq.nlargest(k, resultats, key=lambda r: r[0])
+            return [
+                {
+                    "id": oid,
+                    "score_global": score_global,
+                    "scores_experiences": [round(s, 2) for s in scores],
+                    "titre": self.offres[oid].get("titre", ""),
+                    "entreprise": self.offres[oid].get("entreprise", ""),
+                    "description": self.offres[oid].get("description_brute", ""),
+                    "mots_cles_extraits": self.offres[oid].get("mots_cles_extraits", []),
+                }
+                for score_global, oid, scores in top
+            ]
+
+    def sauvegarder(self, path: Path | None = None) -> Path:
+        """Écriture atomique des offres indexées (JSON compact)."""
+        path = path or INBOX_PATH
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with self._lock:
+            data = {"offres": self.offres}
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def charger(cls, path: Path | None = None) -> "BoiteOffres":
+        path = path or INBOX_PATH
+        boite = cls()
+        if path.is_file():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = {}
+            for oid, offre in (data.get("offres") or {}).items():
+                boite.ajouter(oid, offre)
+        return boite
+
+
+def lire_offres(chemins: list[str]) -> list[dict]:
+    """
+    Offres brutes { description, titre, entreprise } depuis des fichiers ou dossiers :
+    .jsonl (une offre par ligne), .json (liste d'offres), sinon un fichier texte = une offre.
+    """
+    items = []
+    for chemin in chemins:
+        p = Path(chemin)
+        fichiers = sorted(f for f in p.iterdir() if f.suffix.lower() in EXTENSIONS_OFFRES + (".json", ".jsonl")) if p.is_dir() else [p]
+        for f in fichiers:
+            if not f.is_file():
+                continue
+            suffixe = f.suffix.lower()
+            if suffixe in (".jsonl", ".json"):
+                texte = f.read_text(encoding="utf-8")
+                try:
+                    lignes = [json.loads(l) for l in texte.splitlines() if l.strip()] if suffixe == ".jsonl" else json.loads(texte)
+                except ValueError:
+                    continue
+                for d in lignes if isinstance(lignes, list) else [lignes]:
+                    if isinstance(d, dict) and str(d.get("description") or "").strip():
+                        items.append({"description": d["description"], "titre": d.get("titre") or "", "entreprise": d.get("entreprise") or ""})
+            else:
+                items.append({"description": f.read_text(encoding="utf-8"), "titre": "", "entreprise": ""})
+    return items
+
+
+def ajouter_offres(boite: BoiteOffres, items: list[dict]) -> list[str]:
+    """Extraction batch des mots-clés puis indexation. Retourne les ids (empreinte du texte) des offres ajoutées."""
+    from idf import empreinte
+    from mots_cles import offres_from_descriptions
+
+    ajoutees = []
+    items = [it for it in items if str(it.get("description") or "").strip()]
+    for offre in offres_from_descriptions(items):
+        oid = empreinte(offre["description_brute"])
+        if boite.ajouter(oid, offre):
+            ajoutees.append(oid)
+    return ajoutees
@@ -5,9 +5,14 @@ Génération du contenu de la lettre de motivation via Gemini, puis rendu PDF.
 
 import os
 import re
+import time
 from pathlib import Path
 from datetime import datetime
 
+import cache_lettres
+from mesures import etape
+from telemetrie_llm import appel as appel_llm, reponse_en_cache
+
 try:
     from dotenv import load_dotenv
     load_dotenv(Path(__file__).resolve().parent / ".env")
@@ -15,6 +20,10 @@ except ImportError:
     pass
 
 
+# À incrémenter quand _prompt_lettre ou le modèle change de façon significative : invalide le cache des lettres
+LETTRE_PROMPT_VERSION = "1"
+MODELE_LETTRE = "gemini-2.5-flash"
+
 LETTER_SYSTEM_PROMPT = """Tu es un expert en rédaction de lettres de motivation.
 Tu rédiges des lettres professionnelles, percutantes et personnalisées.
 
@@ -44,10 +53,8 @@ def _cv_resume_for_prompt(cv: dict) -> str:
     return "\n".join(parts)
 
 
-def generer_corps_lettre(cv: dict, fiche_poste: str, poste: str, entreprise: str) -> str:
-    """
-    Appelle Gemini pour générer le corps de la lettre (texte brut, paragraphes séparés par \n\n).
-    """
+def _client_lettre():
+    """(client, config) Gemini pour la lettre."""
     api_key = os.environ.get("GEMINI_API_KEY")
     if not api_key:
         raise RuntimeError("GEMINI_API_KEY manquante pour générer la lettre.")
@@ -60,17 +67,21 @@ def generer_corps_lettre(cv: dict, fiche_poste: str, poste: str, entreprise: str
         system_instruction=LETTER_SYSTEM_PROMPT,
         temperature=0.4,
     )
+    return client, config
+
 
+def _prompt_lettre(cv: dict, fiche_poste: str, poste: str, entreprise: str) -> str:
     cv_resume = _cv_resume_for_prompt(cv)
     fiche_short = (fiche_poste or "")[:3500].strip()
+    # Entreprise inconnue (ex. annonce déposée sans en-tête) : pas de ligne vide, Gemini la cherche dans la fiche
+    ligne_entreprise = f"\nEntreprise : {entreprise}" if (entreprise or "").strip() else ""
 
-    user = f"""<cv>
+    return f"""<cv>
 {cv_resume}
 </cv>
 
 <fiche_poste>
-Poste visé : {poste}
-Entreprise : {entreprise}
+Poste visé : {poste}{ligne_entreprise}
 
 {fiche_short}
 </fiche_poste>
@@ -79,16 +90,70 @@ Rédige le corps de la lettre de motivation (3 paragraphes max). Retourne unique
 
 Ton : direct et naturel. À proscrire : "suscite mon plus vif intérêt", "je me permets de", formules trop guindées ou pompeuses. Préférer des phrases simples et concrètes."""
 
-    r = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=user,
-        config=config,
-    )
+
+def _texte_lettre(r) -> str:
     if not r or not getattr(r, "text", None):
         raise ValueError("Réponse Gemini vide pour la lettre.")
     return r.text.strip()
 
 
+def _cle_lettre(cv: dict, fiche_poste: str, poste: str, entreprise: str) -> str:
+    """Clé du cache : version, modèle, consignes système et prompt complet (résumé du CV, annonce, poste, entreprise)."""
+    return cache_lettres.cle(
+        LETTRE_PROMPT_VERSION, MODELE_LETTRE, LETTER_SYSTEM_PROMPT, _prompt_lettre(cv, fiche_poste, poste, entreprise)
+    )
+
+
+def generer_corps_lettre(cv: dict, fiche_poste: str, poste: str, entreprise: str, regenerer: bool = False) -> str:
+    """
+    Appelle Gemini pour générer le corps de la lettre (texte brut, paragraphes séparés par \n\n).
+    Le corps est mis en cache (cache_lettres) : mêmes CV, annonce, poste et entreprise → même lettre, sans appel.
+    regenerer=True : ignore le cache et remplace la lettre mémorisée.
+    """
+    cle = _cle_lettre(cv, fiche_poste, poste, entreprise)
+    if not regenerer:
+        debut = time.perf_counter()
+        with etape("lettre.cache"):
+            corps = cache_lettres.obtenir(cle)
+        if corps is not None:
+            reponse_en_cache("lettre", MODELE_LETTRE, fiche_poste, time.perf_counter() - debut)
+            return corps
+    client, config = _client_lettre()
+    with etape("gemini.lettre"), appel_llm("lettre", MODELE_LETTRE, fiche_poste) as a:
+        a.reponse = client.models.generate_content(
+            model=MODELE_LETTRE,
+            contents=_prompt_lettre(cv, fiche_poste, poste, entreprise),
+            config=config,
+        )
+        corps = _texte_lettre(a.reponse)
+    cache_lettres.enregistrer(cle, corps)
+    return corps
+
+
+async def generer_corps_lettre_async(cv: dict, fiche_poste: str, poste: str, entreprise: str, regenerer: bool = False) -> str:
+    """Version asyncio de generer_corps_lettre (client Gemini asynchrone) : même prompt, même cache, même résultat."""
+    import asyncio
+
+    cle = _cle_lettre(cv, fiche_poste, poste, entreprise)
+    if not regenerer:
+        debut = time.perf_counter()
+        with etape("lettre.cache"):
+            corps = await asyncio.to_thread(cache_lettres.obtenir, cle)
+        if corps is not None:
+            await asyncio.to_thread(reponse_en_cache, "lettre", MODELE_LETTRE, fiche_poste, time.perf_counter() - debut)
+            return corps
+    client, config = _client_lettre()
+    with etape("gemini.lettre"), appel_llm("lettre", MODELE_LETTRE, fiche_poste) as a:
+        a.reponse = await client.aio.models.generate_content(
+            model=MODELE_LETTRE,
+            contents=_prompt_lettre(cv, fiche_poste, poste, entreprise),
+            config=config,
+        )
+        corps = _texte_lettre(a.reponse)
+    await asyncio.to_thread(cache_lettres.enregistrer, cle, corps)
+    return corps
+
+
 def _texte_to_html_paragraphes(texte: str) -> str:
     """Convertit un texte avec paragraphes (séparés par \n\n) en HTML <p>."""
     if not texte:
@@ -103,35 +168,36 @@ def generer_lettre_pdf(
     poste: str,
     entreprise: str,
     output_path: Path,
+    regenerer: bool = False,
 ) -> None:
-    """Génère le PDF de la lettre de motivation et l'enregistre à output_path."""
+    """Génère le PDF de la lettre de motivation et l'enregistre à output_path (regenerer : ignorer la lettre en cache)."""
     base_dir = Path(__file__).resolve().parent
-    corps_brut = generer_corps_lettre(cv, fiche_poste, poste, entreprise)
+    corps_brut = generer_corps_lettre(cv, fiche_poste, poste, entreprise, regenerer=regenerer)
     corps_html = _texte_to_html_paragraphes(corps_brut)
 
-    from jinja2 import Environment, FileSystemLoader, select_autoescape
-    from weasyprint import HTML, CSS
-
-    env = Environment(
-        loader=FileSystemLoader(str(base_dir)),
-        autoescape=select_autoescape(("html", "xml")),
-    )
-    template = env.get_template("letter_template.html")
-    html_str = template.render(
-        prenom=cv.get("prenom", ""),
-        nom=cv.get("nom", ""),
-        email=cv.get("email", ""),
-        telephone=cv.get("telephone", ""),
-        ville=cv.get("ville", ""),
-        date_envoi=datetime.now().strftime("%d/%m/%Y"),
-        entreprise=entreprise,
-        poste=poste,
-        corps_lettre=corps_html,
-    )
+    from generator import environnement_templates, feuille_css
+    from weasyprint import HTML
+
+    with etape("jinja"):
+        template = environnement_templates().get_template("letter_template.html")
+        html_str = template.render(
+            prenom=cv.get("prenom", ""),
+            nom=cv.get("nom", ""),
+            email=cv.get("email", ""),
+            telephone=cv.get("telephone", ""),
+            ville=cv.get("ville", ""),
+            date_envoi=datetime.now().strftime("%d/%m/%Y"),
+            entreprise=entreprise,
+            poste=poste,
+            corps_lettre=corps_html,
+        )
     doc = HTML(string=html_str, base_url=str(base_dir))
-    css = CSS(filename=base_dir / "letter_template.css")
+    css = feuille_css("letter_template.css")
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    doc.write_pdf(output_path, stylesheets=[css])
+    with etape("weasyprint.mise_en_page"):
+        document = doc.render(stylesheets=[css])
+    with etape("pdf.ecriture"):
+        document.write_pdf(output_path)
 
 
 def generer_lettre_pdf_bytes(
@@ -139,37 +205,42 @@ def generer_lettre_pdf_bytes(
     fiche_poste: str,
     poste: str,
     entreprise: str,
+    corps_brut: str | None = None,
+    regenerer: bool = False,
 ) -> tuple[bytes, str]:
-    """Génère le PDF de la lettre en mémoire. Retourne (bytes_du_pdf, nom_fichier)."""
+    """Génère le PDF de la lettre en mémoire. Retourne (bytes_du_pdf, nom_fichier).
+    corps_brut : corps déjà rédigé (ex. par generer_corps_lettre_async) ; sinon lettre en cache ou appel Gemini
+    (regenerer : ignorer le cache)."""
     from io import BytesIO
 
     base_dir = Path(__file__).resolve().parent
-    corps_brut = generer_corps_lettre(cv, fiche_poste, poste, entreprise)
+    if corps_brut is None:
+        corps_brut = generer_corps_lettre(cv, fiche_poste, poste, entreprise, regenerer=regenerer)
     corps_html = _texte_to_html_paragraphes(corps_brut)
 
-    from jinja2 import Environment, FileSystemLoader, select_autoescape
-    from weasyprint import HTML, CSS
-
-    env = Environment(
-        loader=FileSystemLoader(str(base_dir)),
-        autoescape=select_autoescape(("html", "xml")),
-    )
-    template = env.get_template("letter_template.html")
-    html_str = template.render(
-        prenom=cv.get("prenom", ""),
-        nom=cv.get("nom", ""),
-        email=cv.get("email", ""),
-        telephone=cv.get("telephone", ""),
-        ville=cv.get("ville", ""),
-        date_envoi=datetime.now().strftime("%d/%m/%Y"),
-        entreprise=entreprise,
-        poste=poste,
-        corps_lettre=corps_html,
-    )
+    from generator import environnement_templates, feuille_css
+    from weasyprint import HTML
+
+    with etape("jinja"):
+        template = environnement_templates().get_template("letter_template.html")
+        html_str = template.render(
+            prenom=cv.get("prenom", ""),
+            nom=cv.get("nom", ""),
+            email=cv.get("email", ""),
+            telephone=cv.get("telephone", ""),
+            ville=cv.get("ville", ""),
+            date_envoi=datetime.now().strftime("%d/%m/%Y"),
+            entreprise=entreprise,
+            poste=poste,
+            corps_lettre=corps_html,
+        )
     doc = HTML(string=html_str, base_url=str(base_dir))
-    css = CSS(filename=base_dir / "letter_template.css")
+    css = feuille_css("letter_template.css")
     buffer = BytesIO()
-    doc.write_pdf(buffer, stylesheets=[css])
+    with etape("weasyprint.mise_en_page"):
+        document = doc.render(stylesheets=[css])
+    with etape("pdf.ecriture"):
+        document.write_pdf(buffer)
 
     prenom = (cv.get("prenom") or "").strip()
     nom = (cv.get("nom") or "").strip()
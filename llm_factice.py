@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Faux client Gemini hors ligne (même interface que google-genai pour ce que le projet utilise) :
+client.models.generate_content(...) et client.aio.models.generate_content(...), réponse avec .text et .usage_metadata.
+Injecté par le test de charge uniquement : charge.application() remplace adapter._client_gemini et
+letter_generator._client_lettre par ce client, avec la latence CV_BOT_LLM_FACTICE=<ms> (ex. 1500). Le code de
+production ne lit jamais cette variable.
+Latence : valeur ± 25 % ; tokens estimés à ~4 caractères par token.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from types import SimpleNamespace
+
+ECART = 0.25
+
+
+def latence_ms() -> float | None:
+    """Latence configurée (CV_BOT_LLM_FACTICE), ou None si le faux client n'est pas activé."""
+    valeur = os.environ.get("CV_BOT_LLM_FACTICE", "").strip()
+    if not valeur:
+        return None
+    try:
+        return max(0.0, float(valeur))
+    except ValueError:
+        return None
+
+
+# Tweaks minimaux au format attendu : les expériences absentes gardent leurs bullets d'origine (_normaliser_tweaks)
+_ADAPTATION = json.dumps({
+    "resume": "Profil adapté à l'offre (réponse simulée hors ligne).",
+    "experiences": [],
+    "mots_cles_cache": "analyse financière reporting Excel Python",
+    "poste_offre": "",
+}, ensure_ascii=False)
+
+
+_LETTRE = (
+    "Votre offre correspond précisément au projet que je construis depuis le début de ma formation.\n\n"
+    "Mes expériences m'ont appris à analyser des données, à produire des reportings fiables et à travailler en équipe.\n\n"
+    "Je serais heureux d'en discuter avec vous lors d'un entretien."
+)
+
+
+class _Modeles:
+    def __init__(self, role: str, latence: float, timeout_s: float | None = None):
+        self.role = role
+        self.latence = latence
+        self.timeout_s = timeout_s
+
+    def _reponse(self, contents) -> SimpleNamespace:
+        prompt = contents if isinstance(contents, str) else str(contents)
+        texte = _LETTRE if self.role == "lettre" else _ADAPTATION
+        usage = SimpleNamespace(
+            prompt_token_count=len(prompt) // 4,
+            candidates_token_count=len(texte) // 4,
+            cached_content_token_count=0,
+            thoughts_token_count=0,
+        )
+        return SimpleNamespace(text=texte, usage_metadata=usage)
+
+    def _attente_s(self) -> float:
+        return self.latence * random.uniform(1 - ECART, 1 + ECART) / 1000
+
+    def generate_content(self, model: str, contents, config=None):
+        attente = self._attente_s()
+        if self.timeout_s is not None and attente > self.timeout_s:
+            # Comme le timeout HTTP du vrai client : requête coupée au bout du délai
+            time.sleep(self.timeout_s)
+            raise TimeoutError(f"Délai de {self.timeout_s:g} s dépassé (réponse simulée)")
+        time.sleep(attente)
+        return self._reponse(contents)
+
+
+class _ModelesAsync(_Modeles):
+    async def generate_content(self, model: str, contents, config=None):
+        attente = self._attente_s()
+        if self.timeout_s is not None and attente > self.timeout_s:
+            await asyncio.sleep(self.timeout_s)
+            raise TimeoutError(f"Délai de {self.timeout_s:g} s dépassé (réponse simulée)")
+        await asyncio.sleep(attente)
+        return self._reponse(contents)
+
+
+class ClientFactice:
+    """Remplace genai.Client : role "adaptation" (JSON de tweaks) ou "lettre" (corps de lettre)."""
+
+    def __init__(self, role: str = "adaptation", latence: float | None = None, timeout_s: float | None = None):
+        latence = latence_ms() if latence is None else latence
+        self.models = _Modeles(role, latence or 0.0, timeout_s)
+        self.aio = SimpleNamespace(models=_ModelesAsync(role, latence or 0.0, timeout_s))
@@ -26,9 +26,11 @@ if os.name == "nt":
                 os.environ["PATH"] = dir_path + path_sep + os.environ.get("PATH", "")
 
 import argparse
-import json
 import time
 
+import mesures
+from mesures import etape
+
 BASE_DIR = Path(__file__).resolve().parent
 CV_BASE_PATH = BASE_DIR / "cv_base.json"
 
@@ -45,6 +47,27 @@ def _spinner(secs: float, message: str = "Attente") -> None:
     print("\r  " + " " * (len(message) + 2) + "\r", end="", flush=True)
 
 
+def _charger_cv_base() -> dict:
+    """cv_base.json via le cache versionné (schéma validé) ; quitte avec un message s'il manque ou est invalide."""
+    from cv_base_cache import charger
+    try:
+        return charger(CV_BASE_PATH).cv
+    except FileNotFoundError:
+        print("Lance d'abord : python main.py --setup")
+        sys.exit(1)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+
+def _avec_mesures(commande, *args, **kwargs) -> None:
+    """Exécute une commande en collectant ses étapes mesurées, puis affiche le temps passé par étape."""
+    with mesures.collecte() as etapes:
+        commande(*args, **kwargs)
+    if etapes:
+        print(mesures.texte_cli(etapes))
+
+
 def cmd_setup() -> None:
     from setup import lancer_setup
     lancer_setup()
@@ -52,12 +75,7 @@ def cmd_setup() -> None:
 
 def cmd_export_pdf(output_dir: str) -> None:
     """Exporte le CV en PDF sans adapter (pour tester le rendu)."""
-    if not CV_BASE_PATH.exists():
-        print("Lance d'abord : python main.py --setup")
-        sys.exit(1)
-
-    with open(CV_BASE_PATH, encoding="utf-8") as f:
-        cv_base = json.load(f)
+    cv_base = _charger_cv_base()
 
     from generator import generer_pdf
     offre = {"titre": "", "entreprise": ""}
@@ -72,20 +90,21 @@ def cmd_export_pdf(output_dir: str) -> None:
         sys.exit(1)
 
 
-def cmd_adapt(description: str, output_dir: str, titre: str = "", entreprise: str = "") -> None:
-    """Adapte le CV à la fiche de poste (texte) et génère le PDF. Pas de scraping."""
-    if not CV_BASE_PATH.exists():
-        print("Lance d'abord : python main.py --setup")
-        sys.exit(1)
-
-    with open(CV_BASE_PATH, encoding="utf-8") as f:
-        cv_base = json.load(f)
+def cmd_adapt(description: str, output_dir: str, titre: str = "", entreprise: str = "", fan_out: bool | None = None, brouillon: bool = False) -> None:
+    """Adapte le CV à la fiche de poste (texte) et génère le PDF. Pas de scraping.
+    brouillon=True : tweaks locaux (règles) sans appel Gemini ; sert aussi de repli si Gemini échoue."""
+    cv_base = _charger_cv_base()
 
     from mots_cles import offre_from_description
-    offre = offre_from_description(description, titre=titre, entreprise=entreprise)
+    with etape("extraction"):
+        offre = offre_from_description(description, titre=titre, entreprise=entreprise)
+    from mots_cles import apprendre_offres
+    with etape("idf"):
+        apprendre_offres([description])
 
     from rules import appliquer_regles
-    cv_enrichi = appliquer_regles(cv_base, offre)
+    with etape("regles"):
+        cv_enrichi = appliquer_regles(cv_base, offre)
     rapport = cv_enrichi.get("rapport", {})
 
     print("\n" + "─" * 60)
@@ -102,29 +121,39 @@ def cmd_adapt(description: str, output_dir: str, titre: str = "", entreprise: st
         sys.exit(0)
 
     from adapter import adapter_cv, apply_tweaks_to_cv
-    try:
-        tweaks = adapter_cv(cv_base, offre, rapport=rapport)
-    except Exception as e:
-        err = str(e).lower()
-        if "rate" in err or "429" in err or "resource_exhausted" in err:
-            print("Limite d'appels API atteinte. Attente 15 s puis nouvel essai...")
-            _spinner(15, "Attente")
-            try:
-                tweaks = adapter_cv(cv_base, offre, rapport=rapport, retry_invalide=False)
-            except Exception as e2:
-                print(f"Échec après retry : {e2}")
-                sys.exit(1)
-        elif "json" in err or "invalide" in err:
-            try:
-                tweaks = adapter_cv(cv_base, offre, rapport=rapport, retry_invalide=True)
-            except Exception as e2:
-                print(f"Échec adaptation : {e2}")
-                sys.exit(1)
-        else:
-            print(f"Erreur : {e}")
-            sys.exit(1)
+    from adapter_local import adapter_cv_local
+    if brouillon:
+        tweaks = adapter_cv_local(cv_base, offre, rapport=rapport)
+        print("Brouillon local (règles, sans Gemini).")
+    else:
+        try:
+            tweaks = adapter_cv(cv_base, offre, rapport=rapport, fan_out=fan_out)
+        except Exception as e:
+            err = str(e).lower()
+            if "rate" in err or "429" in err or "resource_exhausted" in err:
+                print("Limite d'appels API atteinte. Attente 15 s puis nouvel essai...")
+                _spinner(15, "Attente")
+                from telemetrie_llm import reessai
+                try:
+                    with reessai():
+                        tweaks = adapter_cv(cv_base, offre, rapport=rapport, retry_invalide=False, fan_out=fan_out)
+                except Exception as e2:
+                    print(f"Échec après retry : {e2} — repli sur le brouillon local (règles).")
+                    tweaks = adapter_cv_local(cv_base, offre, rapport=rapport)
+            elif "json" in err or "invalide" in err:
+                from telemetrie_llm import reessai
+                try:
+                    with reessai():
+                        tweaks = adapter_cv(cv_base, offre, rapport=rapport, retry_invalide=True, fan_out=fan_out)
+                except Exception as e2:
+                    print(f"Échec adaptation : {e2} — repli sur le brouillon local (règles).")
+                    tweaks = adapter_cv_local(cv_base, offre, rapport=rapport)
+            else:
+                print(f"Erreur : {e} — repli sur le brouillon local (règles).")
+                tweaks = adapter_cv_local(cv_base, offre, rapport=rapport)
 
-    cv_adapte = apply_tweaks_to_cv(cv_base, tweaks)
+    with etape("fusion"):
+        cv_adapte = apply_tweaks_to_cv(cv_base, tweaks)
 
     from generator import generer_pdf
     try:
@@ -138,7 +167,208 @@ def cmd_adapt(description: str, output_dir: str, titre: str = "", entreprise: st
         sys.exit(1)
 
 
-def main() -> None:
+# Nombre max d'adaptations Gemini simultanées pour --lot
+LOT_CONCURRENCE = int(os.environ.get("CV_BOT_LOT_CONCURRENCE", "16") or 16)
+
+
+async def _adapter_lot(cv_base: dict, offres: list[dict], output_dir: str, concurrence: int, fan_out: bool | None, brouillon: bool) -> list[dict]:
+    """
+    Adapte toutes les offres sur une seule boucle asyncio : jusqu'à `concurrence` appels Gemini en vol,
+    sans un thread par appel. Les PDF (WeasyPrint, CPU) sont rendus un par un dans un thread au fil des réponses,
+    chacun dans son sous-dossier « Entreprise - Poste [id de l'adaptation] » (pas d'écrasement entre annonces
+    sans titre ou de même intitulé).
+    """
+    import asyncio
+
+    from adapter import apply_tweaks_to_cv
+    from adapter_local import _poste_offre, adapter_avec_repli_async, adapter_cv_local
+    from adaptations_db import enregistrer, nouvel_id
+    from export_package import get_export_folder_name
+    from generator import generer_pdf
+    from rules import appliquer_regles
+    from telemetrie_llm import collecte
+
+    semaphore = asyncio.Semaphore(max(1, concurrence))
+    rendu = asyncio.Lock()
+
+    async def _une(offre: dict) -> dict:
+        with etape("regles"):
+            rapport = appliquer_regles(cv_base, offre).get("rapport", {})
+        appels_llm = []
+        if brouillon:
+            tweaks, source, erreur = adapter_cv_local(cv_base, offre, rapport), "regles", None
+        else:
+            async with semaphore:
+                with collecte() as appels_llm:
+                    tweaks, source, erreur = await adapter_avec_repli_async(cv_base, offre, rapport=rapport, fan_out=fan_out)
+        description = offre["description_brute"]
+        adaptation_id = nouvel_id(description)
+        titre = offre.get("titre") or tweaks.get("poste_offre") or _poste_offre(offre)
+        await asyncio.to_thread(enregistrer, adaptation_id, {
+            "resume": tweaks.get("resume"),
+            "experiences": tweaks.get("experiences", []),
+            "mots_cles_cache": tweaks.get("mots_cles_cache", ""),
+            "rapport": rapport,
+            "source": source,
+            "titre": titre,
+            "entreprise": offre.get("entreprise") or "",
+            "description": description,
+            "description_preview": description[:200] + "..." if len(description) > 200 else description,
+            "llm": appels_llm,
+        })
+        resultat = {"id": adaptation_id, "offre": offre, "rapport": rapport, "source": source, "erreur": erreur, "pdf": None}
+        async with rendu:
+            try:
+                cv_adapte = apply_tweaks_to_cv(cv_base, tweaks)
+                sous_dossier = Path(output_dir) / f"{get_export_folder_name(offre.get('entreprise') or '', titre)} [{adaptation_id}]"
+                resultat["pdf"] = await asyncio.to_thread(generer_pdf, cv_adapte, {**offre, "titre": titre}, str(sous_dossier))
+            except Exception as e:
+                resultat["erreur"] = resultat["erreur"] or f"PDF : {str(e).splitlines()[0]}"
+        return resultat
+
+    return await asyncio.gather(*(_une(o) for o in offres))
+
+
+def cmd_lot(fichiers: list[str], output_dir: str, concurrence: int, fan_out: bool | None = None, brouillon: bool = False) -> None:
+    """Adapte le CV à un lot d'annonces (fichiers/dossiers .txt/.md/.html, .json, .jsonl) et génère un PDF par annonce."""
+    import asyncio
+
+    from inbox import lire_offres
+    from mots_cles import apprendre_offres, offres_from_descriptions
+
+    cv_base = _charger_cv_base()
+    items = [it for it in lire_offres(fichiers) if str(it.get("description") or "").strip()]
+    if not items:
+        print("Aucune annonce trouvée.")
+        sys.exit(1)
+    apprendre_offres([it["description"] for it in items])
+    offres = offres_from_descriptions(items)
+    print(f"{len(offres)} annonce(s), jusqu'à {concurrence} adaptation(s) Gemini simultanée(s)...")
+    t0 = time.perf_counter()
+    resultats = asyncio.run(_adapter_lot(cv_base, offres, output_dir, concurrence, fan_out, brouillon))
+    print("\n" + "─" * 60)
+    for r in resultats:
+        offre = r["offre"]
+        intitule = " – ".join(x for x in (offre.get("titre"), offre.get("entreprise")) if x) or offre["description_brute"][:50].replace("\n", " ")
+        etat = f"✓ {r['pdf']}" if r["pdf"] else f"✗ pas de PDF ({r['erreur']})"
+        repli = f" (règles : {r['erreur']})" if r["pdf"] and r["source"] == "regles" and r["erreur"] else ""
+        print(f"[{r['id']}] {r['rapport'].get('score_global', 0)}/10  {intitule}\n    {etat}{repli}")
+    print("─" * 60)
+    print(f"{len(resultats)} adaptation(s) en {time.perf_counter() - t0:.1f} s")
+
+
+def cmd_surveiller(dossier: str, sortie: str, concurrence: int, fan_out: bool | None = None, brouillon: bool = False) -> None:
+    """Démon : adapte automatiquement chaque annonce déposée dans `dossier` (Ctrl+C pour arrêter)."""
+    import asyncio
+
+    from surveillance import Surveillant, Traitees, traiter_annonce
+
+    path = Path(dossier)
+    if not path.is_dir():
+        print(f"Dossier introuvable : {path}")
+        sys.exit(1)
+    _charger_cv_base()
+    traitees = Traitees()
+
+    async def _traiter(fichier: Path, texte: str) -> dict:
+        return await traiter_annonce(fichier, texte, sortie=sortie, brouillon=brouillon, fan_out=fan_out)
+
+    surveillant = Surveillant(path, _traiter, traitees=traitees, concurrence=concurrence)
+    if sortie == "a-cote":
+        destination = "à côté des annonces"
+    else:
+        from export_package import get_export_base_path
+        destination = str(get_export_base_path())
+    detection = "événements (watchdog)" if surveillant.evenements else f"scrutation toutes les {surveillant.intervalle_s:g} s"
+    print(f"Surveillance de {surveillant.dossier} ({detection}), {concurrence} annonce(s) à la fois, dossiers {destination}")
+    print(f"{len(traitees)} annonce(s) déjà traitée(s) ({traitees.path}). Ctrl+C pour arrêter.")
+    try:
+        asyncio.run(surveillant.executer())
+    except KeyboardInterrupt:
+        print("\nArrêt de la surveillance.")
+
+
+def cmd_idf_construire(fichiers: list[str]) -> None:
+    """(Re)complète l'index IDF à partir de l'historique adaptations/ et de fichiers d'annonces (.txt, .md, .jsonl)."""
+    import idf
+    from mots_cles import apprendre_offres
+    textes = idf.descriptions_historique() + idf.descriptions_fichiers(fichiers)
+    n = apprendre_offres(textes)
+    index = idf.charger()
+    print(f"✓ Index IDF : {n} nouvelle(s) annonce(s), {index.n_docs} au total, {len(index.df)} termes ({idf.IDF_PATH})")
+
+
+def cmd_importer_adaptations() -> None:
+    """Import unique des anciens adaptations/<AAAAMMJJHHMM>_<hash>.json dans la base SQLite (rejouable sans doublons)."""
+    from adaptations_db import DB_PATH, importer_json
+    n = importer_json()
+    print(f"✓ {n} adaptation(s) importée(s) dans {DB_PATH}")
+
+
+def cmd_artefacts_gc() -> None:
+    """Supprime du magasin d'artefacts les contenus qui ne sont plus référencés (adaptation ou dossier d'export)."""
+    import artefacts
+    n, octets = artefacts.gc()
+    stats = artefacts.statistiques()
+    print(f"✓ {n} artefact(s) supprimé(s), {octets / 1024:.0f} Ko libérés")
+    print(f"  {stats['artefacts']} artefact(s) conservé(s), {stats['taille_disque'] / 1024:.0f} Ko sur disque ({stats['taille'] / 1024:.0f} Ko d'origine)")
+
+
+def cmd_llm_stats(jours: int | None) -> None:
+    """Synthèse du journal des appels Gemini : latence p50/p95, tokens par annonce, totaux par jour."""
+    from telemetrie_llm import JOURNAL_PATH, resume
+    s = resume(jours)
+    if not s["appels"] and not s["depuis_cache"]:
+        print(f"Aucun appel Gemini journalisé ({JOURNAL_PATH}).")
+        return
+
+    def _ms(v):
+        if v is None:
+            return "–"
+        return f"{v:.0f} ms" if v < 1000 else f"{v / 1000:.1f} s"
+
+    periode = f"{jours} dernier(s) jour(s)" if jours else "tout le journal"
+    print("\n" + "─" * 60)
+    print(f"Appels Gemini ({periode}) : {s['appels']}, {s['erreurs']} erreur(s), {s['nouvelles_tentatives']} nouvelle(s) tentative(s), {s['cache']} avec cache ; {s['depuis_cache']} réponse(s) servie(s) par le cache de lettres, sans appel")
+    print(f"Latence : p50 {_ms(s['latence_p50_ms'])}, p95 {_ms(s['latence_p95_ms'])}")
+    print(f"Tokens : {s['tokens_entree']} en entrée ({s['tokens_cache']} en cache), {s['tokens_sortie']} en sortie")
+    print(f"Par annonce : {s['tokens_par_offre_moyenne']} tokens en moyenne (p95 {s['tokens_par_offre_p95']}), {s['offres']} annonce(s)")
+    print("─" * 60)
+    for op, o in s["par_operation"].items():
+        print(f"  {op:<20} {o['appels']:>5} appel(s)  p50 {_ms(o['latence_p50_ms']):>7}  p95 {_ms(o['latence_p95_ms']):>7}  {o['tokens_entree'] + o['tokens_sortie']:>9} tokens")
+    print("─" * 60)
+    for j in s["par_jour"]:
+        print(f"  {j['jour']}  {j['appels']:>5} appel(s)  {j['tokens_entree']:>9} entrée  {j['tokens_sortie']:>8} sortie  {j['erreurs']:>3} erreur(s)")
+
+
+def cmd_inbox(ajouter: list[str] | None, retirer: list[str] | None, classer: bool, top: int) -> None:
+    """Boîte d'offres : ajoute / retire des offres puis affiche le top des plus pertinentes pour cv_base.json."""
+    from inbox import INBOX_PATH, BoiteOffres, ajouter_offres, lire_offres
+    from verrous import verrou_fichier
+    # Verrou : le serveur (ou un autre CLI) peut modifier la boîte en même temps
+    with verrou_fichier(INBOX_PATH):
+        boite = BoiteOffres.charger()
+        if ajouter:
+            ids = ajouter_offres(boite, lire_offres(ajouter))
+            print(f"✓ {len(ids)} offre(s) ajoutée(s) ({len(boite)} au total)")
+        if retirer:
+            n = sum(1 for oid in retirer if boite.retirer(oid))
+            print(f"✓ {n} offre(s) retirée(s) ({len(boite)} au total)")
+        if ajouter or retirer:
+            boite.sauvegarder()
+    if not classer:
+        return
+    cv_base = _charger_cv_base()
+    from cv_base_cache import instantane_de
+    print("\n" + "─" * 60)
+    for rang, r in enumerate(boite.classer(instantane_de(cv_base).index, k=top), 1):
+        intitule = " – ".join(x for x in (r["titre"], r["entreprise"]) if x) or r["description"][:60].replace("\n", " ")
+        print(f"{rang:>3}. [{r['id']}] {r['score_global']}/10  {intitule}")
+    print("─" * 60)
+    print("Adapter une offre : python main.py --inbox-adapter ID")
+
+
+def _construire_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="CV personnalisés par fiche de poste : dépôt de la fiche → génération CV + lettre + fiche (pas de scraping)."
     )
@@ -148,15 +378,110 @@ def main() -> None:
     parser.add_argument("--titre", type=str, default="", help="Intitulé du poste (optionnel, pour le nom du PDF)")
     parser.add_argument("--entreprise", type=str, default="", help="Nom de l'entreprise (optionnel)")
     parser.add_argument("--output", "-o", type=str, default=".", metavar="DIR", help="Dossier de sortie pour le PDF (défaut: .)")
+    parser.add_argument("--fan-out", action="store_true", default=None, help="Adaptation en requêtes Gemini parallèles par section (plus rapide sur les longs CV)")
+    parser.add_argument("--brouillon", action="store_true", help="Adaptation instantanée par règles locales, sans appel Gemini")
+    parser.add_argument("--idf-construire", nargs="*", metavar="FICHIER", help="Construire/compléter l'index IDF des mots-clés (historique adaptations/ + fichiers d'annonces .txt/.md/.jsonl)")
+    parser.add_argument("--importer-adaptations", action="store_true", help="Importer les anciens adaptations/*.json dans la base SQLite adaptations/adaptations.db")
+    parser.add_argument("--artefacts-gc", action="store_true", help="Supprimer les artefacts (PDF, annonces, tweaks) qui ne sont plus référencés")
+    parser.add_argument("--inbox-ajouter", nargs="+", metavar="FICHIER", help="Ajouter des offres à la boîte (fichiers/dossiers .txt/.md/.html, .json, .jsonl)")
+    parser.add_argument("--inbox-retirer", nargs="+", metavar="ID", help="Retirer des offres de la boîte")
+    parser.add_argument("--inbox-classer", action="store_true", help="Classer les offres de la boîte par pertinence pour cv_base.json")
+    parser.add_argument("--inbox-adapter", type=str, metavar="ID", help="Adapter le CV à une offre de la boîte")
+    parser.add_argument("--lot", nargs="+", metavar="FICHIER", help="Adapter le CV à un lot d'annonces (fichiers/dossiers .txt/.md/.html, .json, .jsonl), appels Gemini concurrents")
+    parser.add_argument("--surveiller", type=str, metavar="DOSSIER", help="Surveiller un dossier : chaque annonce déposée (.txt/.md/.html) est adaptée et exportée en dossier candidature")
+    parser.add_argument("--sortie", choices=("a-cote", "export"), default="a-cote", help="Dossiers candidature de --surveiller : à côté des annonces (défaut) ou sous CV_BOT_EXPORT_BASE")
+    parser.add_argument("--concurrence", type=int, metavar="N", help=f"Appels Gemini simultanés pour --lot (défaut: {LOT_CONCURRENCE}, CV_BOT_LOT_CONCURRENCE) ; annonces traitées en même temps pour --surveiller (défaut: CV_BOT_SURVEILLANCE_CONCURRENCE ou 2)")
+    parser.add_argument("--llm-stats", action="store_true", help="Synthèse des appels Gemini journalisés (latence p50/p95, tokens par annonce, totaux par jour)")
+    parser.add_argument("--jours", type=int, metavar="N", help="Limiter --llm-stats aux N derniers jours")
+    parser.add_argument("--top", type=int, default=10, metavar="K", help="Nombre d'offres affichées par --inbox-classer (défaut: 10)")
     parser.add_argument("--pdf-only", action="store_true", help="Export PDF uniquement (pas d'adaptation, pour tester)")
+    parser.add_argument("--profile", nargs="?", const="deterministe", choices=("deterministe", "echantillons"), metavar="MODE", help="Profiler la commande (cProfile par défaut, ou « echantillons » pour des piles flamegraph) + allocations tracemalloc, fichiers dans profils/")
+    parser.add_argument("--direct", action="store_true", help="Exécuter dans ce processus, sans passer par le serveur CLI résident")
+    parser.add_argument("--serveur-cli-arreter", action="store_true", help="Arrêter le serveur CLI résident")
+    return parser
+
+
+def main() -> None:
+    parser = _construire_parser()
     args = parser.parse_args()
 
+    if args.serveur_cli_arreter:
+        import serveur_cli
+        arrete = serveur_cli.ACTIF and serveur_cli.arreter()
+        print("✓ Serveur CLI arrêté." if arrete else "Aucun serveur CLI en cours.")
+        return
+    # Client léger : la commande s'exécute dans le serveur résident (modules, templates et CV déjà chargés).
+    # Commandes interactives ou sans fin, et profilage, restent dans ce processus.
+    if len(sys.argv) > 1 and not (args.direct or args.setup or args.surveiller or args.profile):
+        import serveur_cli
+        if serveur_cli.ACTIF:
+            code = serveur_cli.transmettre(sys.argv[1:])
+            if code is not None:
+                sys.exit(code)
+
+    if args.profile:
+        import profilage
+        session = profilage.Session("cli", args.profile).demarrer()
+        try:
+            _executer(args, parser)
+        finally:
+            for fichier in session.arreter():
+                print(f"Profil : {fichier}")
+        return
+    _executer(args, parser)
+
+
+def _executer(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Exécute la commande demandée sur la ligne de commande."""
     if args.setup:
         cmd_setup()
         return
     if args.pdf_only:
         cmd_export_pdf(args.output)
         return
+    if args.idf_construire is not None:
+        cmd_idf_construire(args.idf_construire)
+        return
+
+    if args.importer_adaptations:
+        cmd_importer_adaptations()
+        return
+
+    if args.artefacts_gc:
+        cmd_artefacts_gc()
+        return
+
+    if args.llm_stats:
+        cmd_llm_stats(args.jours)
+        return
+
+    if args.inbox_ajouter or args.inbox_retirer or args.inbox_classer:
+        cmd_inbox(args.inbox_ajouter, args.inbox_retirer, args.inbox_classer, args.top)
+        return
+    if args.lot:
+        _avec_mesures(cmd_lot, args.lot, args.output, args.concurrence or LOT_CONCURRENCE, fan_out=args.fan_out, brouillon=args.brouillon)
+        return
+    if args.surveiller:
+        from surveillance import CONCURRENCE
+        cmd_surveiller(args.surveiller, args.sortie, args.concurrence or CONCURRENCE, fan_out=args.fan_out, brouillon=args.brouillon)
+        return
+
+    if args.inbox_adapter:
+        from inbox import BoiteOffres
+        offre = BoiteOffres.charger().offres.get(args.inbox_adapter)
+        if not offre:
+            print(f"Offre introuvable dans la boîte : {args.inbox_adapter}")
+            sys.exit(1)
+        _avec_mesures(
+            cmd_adapt,
+            offre.get("description_brute", ""),
+            args.output,
+            titre=args.titre or offre.get("titre", ""),
+            entreprise=args.entreprise or offre.get("entreprise", ""),
+            fan_out=args.fan_out,
+            brouillon=args.brouillon,
+        )
+        return
 
     description = ""
     if args.description:
@@ -168,7 +493,7 @@ def main() -> None:
             sys.exit(1)
         description = path.read_text(encoding="utf-8")
     if description.strip():
-        cmd_adapt(description.strip(), args.output, titre=args.titre or "", entreprise=args.entreprise or "")
+        _avec_mesures(cmd_adapt, description.strip(), args.output, titre=args.titre or "", entreprise=args.entreprise or "", fan_out=args.fan_out, brouillon=args.brouillon)
         return
 
     parser.print_help()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Mesure du temps passé par étape (extraction, règles, Gemini, fusion, Jinja, WeasyPrint, écriture PDF, photo, ZIP…).
+- etape("nom") : span chronométré ; ajouté aux étapes de la requête / commande en cours (collecte) et à
+  l'histogramme du processus.
+- collecte() : ouvre la liste des étapes d'une requête Flask (en-tête Server-Timing) ou d'une commande CLI.
+- prometheus() : histogrammes au format texte Prometheus (route /metrics).
+Désactivable avec CV_BOT_MESURES=0 : etape() renvoie alors un context manager vide partagé (coût ≈ un appel de fonction).
+La collecte suit les contextvars : elle traverse les tâches asyncio et asyncio.to_thread.
+"""
+
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+ACTIF = os.environ.get("CV_BOT_MESURES", "1").strip().lower() not in ("0", "false", "non", "off")
+
+# Bornes des histogrammes (secondes) : de la milliseconde (règles, diff) à la minute (Gemini avec retry)
+BORNES = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_NUL = nullcontext()
+_collecte: ContextVar[list | None] = ContextVar("cv_bot_etapes", default=None)
+_histogrammes: dict[str, list] = {}
+_lock = threading.Lock()
+
+
+class _Etape:
+    __slots__ = ("nom", "debut")
+
+    def __init__(self, nom: str):
+        self.nom = nom
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        enregistrer(self.nom, time.perf_counter() - self.debut)
+        return False
+
+
+def etape(nom: str):
+    """Context manager chronométrant une étape (no-op si les mesures sont désactivées)."""
+    return _Etape(nom) if ACTIF else _NUL
+
+
+def enregistrer(nom: str, duree_s: float) -> None:
+    """Ajoute une durée à l'histogramme de l'étape et à la collecte en cours."""
+    etapes = _collecte.get()
+    if etapes is not None:
+        etapes.append((nom, duree_s))
+    with _lock:
+        h = _histogrammes.get(nom)
+        if h is None:
+            # [compte par borne..., +Inf, somme]
+            h = _histogrammes[nom] = [0] * (len(BORNES) + 1) + [0.0]
+        for i, borne in enumerate(BORNES):
+            if duree_s <= borne:
+                h[i] += 1
+                break
+        else:
+            h[len(BORNES)] += 1
+        h[-1] += duree_s
+
+
+@contextmanager
+def collecte():
+    """Collecte les étapes exécutées dans ce contexte : with collecte() as etapes: … → [(nom, durée_s)]."""
+    etapes: list = []
+    jeton = _collecte.set(etapes)
+    try:
+        yield etapes
+    finally:
+        _collecte.reset(jeton)
+
+
+def demarrer_collecte():
+    """Variante sans bloc with (hooks Flask before/after_request) : retourne (jeton, etapes)."""
+    etapes: list = []
+    return _collecte.set(etapes), etapes
+
+
+def arreter_collecte(jeton) -> None:
+    _collecte.reset(jeton)
+
+
+def agreger(etapes: list) -> list[tuple[str, float, int]]:
+    """[(nom, durée totale_s, nombre)] dans l'ordre de première apparition."""
+    totaux: dict[str, list] = {}
+    for nom, d in etapes:
+        t = totaux.setdefault(nom, [0.0, 0])
+        t[0] += d
+        t[1] += 1
+    return [(nom, t[0], t[1]) for nom, t in totaux.items()]
+
+
+def server_timing(etapes: list) -> str:
+    """Valeur de l'en-tête Server-Timing : « gemini;dur=2310.4, weasyprint;dur=412.0;desc="x2" »."""
+    parties = []
+    for nom, total, n in agreger(etapes):
+        token = re.sub(r"[^A-Za-z0-9_.\-]", "_", nom)
+        parties.append(f'{token};dur={total * 1000:.1f}' + (f';desc="x{n}"' if n > 1 else ""))
+    return ", ".join(parties)
+
+
+def texte_cli(etapes: list) -> str:
+    """Résumé lisible pour la sortie des commandes CLI."""
+    lignes = [f"  {nom:<22} {total * 1000:>9.1f} ms" + (f"  (x{n})" if n > 1 else "") for nom, total, n in agreger(etapes)]
+    return "Temps par étape :\n" + "\n".join(lignes) if lignes else ""
+
+
+def prometheus() -> str:
+    """Histogrammes du processus au format d'exposition texte Prometheus."""
+    nom_metrique = "cv_bot_etape_duree_secondes"
+    lignes = [
+        f"# HELP {nom_metrique} Durée des étapes (extraction, règles, Gemini, rendu, PDF, …) en secondes.",
+        f"# TYPE {nom_metrique} histogram",
+    ]
+    with _lock:
+        instantane = {nom: list(h) for nom, h in _histogrammes.items()}
+    for nom in sorted(instantane):
+        h = instantane[nom]
+        label = nom.replace("\\", "\\\\").replace('"', '\\"')
+        cumul = 0
+        for borne, n in zip(BORNES, h):
+            cumul += n
+            lignes.append(f'{nom_metrique}_bucket{{etape="{label}",le="{borne:g}"}} {cumul}')
+        cumul += h[len(BORNES)]
+        lignes.append(f'{nom_metrique}_bucket{{etape="{label}",le="+Inf"}} {cumul}')
+        lignes.append(f'{nom_metrique}_sum{{etape="{label}"}} {h[-1]:.6f}')
+        lignes.append(f'{nom_metrique}_count{{etape="{label}"}} {cumul}')
+    return "\n".join(lignes) + "\n"
@@ -4,9 +4,21 @@ Extraction de mots-clés à partir d'une description de poste (fiche de poste).
 Utilisé pour l'adaptation du CV et les règles ATS, sans scraping ni navigateur.
 """
 
+import atexit
 import re
+import sys
+import threading
 
-# Mots-clés courants (finance, risk, tech) pour extraction sans IA
+from dictionnaires import automate, trouver
+from normalisation import normaliser_terme, normaliser_tokens
+import idf
+
+try:
+    import numpy as np
+except ImportError:  # extraction batch en pur Python si NumPy est absent
+    np = None
+
+# Mots-clés courants (finance, risk, tech) pour extraction sans IA ; complétés par les packs de domaines/*.txt
 MOTS_CLES_FINANCE_TECH = [
     "risk", "risque", "gestion des risques", "risk management", "contrôle interne",
     "conformité", "compliance", "audit", "kpi", "reporting", "pilotage",
@@ -19,6 +31,10 @@ MOTS_CLES_FINANCE_TECH = [
     "alternance", "stage", "cdi", "cdd", "finance d'entreprise",
     "valuation", "modélisation", "excel", "powerpoint", "word",
 ]
+_TERMES_DE_BASE = tuple(dict.fromkeys(MOTS_CLES_FINANCE_TECH))
+
+
+STOP = {"le", "la", "les", "de", "du", "des", "et", "en", "un", "une", "pour", "dans", "sur", "avec", "par", "aux", "ce", "cette", "son", "sa", "ses", "que", "qui", "qu", "au", "à", "est", "sont", "être", "avoir", "nous", "vous", "ils", "elle", "on"}
 
 
 def _tokeniser_et_nettoyer(texte: str) -> list[str]:
@@ -29,46 +45,188 @@ def _tokeniser_et_nettoyer(texte: str) -> list[str]:
     return texte.split()
 
 
-def extraire_mots_cles(description: str, top_n: int = 15) -> list[str]:
-    """Tokenise la description et matche contre MOTS_CLES_FINANCE_TECH + fréquence des n-grams."""
-    if not description:
-        return []
-    desc_lower = description.lower()
-    scores: dict[str, int] = {}
+def _tokens_dictionnaire(texte: str) -> list[str]:
+    """Tokeniseur du trie : mêmes tokens que la description, normalisés (accents, pluriels, racines)."""
+    return normaliser_tokens(_tokeniser_et_nettoyer(texte))
+
 
-    for kw in MOTS_CLES_FINANCE_TECH:
-        if kw in desc_lower:
-            scores[kw] = scores.get(kw, 0) + 3
+def _comptes(description: str, trie: dict) -> tuple[dict[str, int], dict[str, str]]:
+    """
+    Poids bruts d'une annonce par forme normalisée (+3 terme du dictionnaire, +2 bigramme, +1 mot), dans l'ordre
+    de première apparition, et forme affichée de chaque clé (terme du dictionnaire, sinon première occurrence).
+    """
+    bruts: dict[str, int] = {}
+    formes: dict[str, str] = {}
 
-    stop = {"le", "la", "les", "de", "du", "des", "et", "en", "un", "une", "pour", "dans", "sur", "avec", "par", "aux", "ce", "cette", "son", "sa", "ses", "que", "qui", "qu", "au", "à", "est", "sont", "être", "avoir", "nous", "vous", "ils", "elle", "on"}
     tokens = _tokeniser_et_nettoyer(description)
-    for t in tokens:
-        if len(t) >= 2 and t not in stop:
-            scores[t] = scores.get(t, 0) + 1
+    norms = normaliser_tokens(tokens)
+    for kw in trouver(trie, norms):
+        cle = normaliser_terme(kw)
+        formes.setdefault(cle, kw)
+        bruts[cle] = bruts.get(cle, 0) + 3
+
+    for t, n in zip(tokens, norms):
+        if len(t) >= 2 and t not in STOP:
+            formes.setdefault(n, t)
+            bruts[n] = bruts.get(n, 0) + 1
 
-    words = tokens
-    for i in range(len(words) - 1):
-        if len(words[i]) >= 2 and len(words[i + 1]) >= 2:
-            bigram = f"{words[i]} {words[i+1]}"
-            scores[bigram] = scores.get(bigram, 0) + 2
+    for i in range(len(tokens) - 1):
+        if len(tokens[i]) >= 2 and len(tokens[i + 1]) >= 2:
+            cle = f"{norms[i]} {norms[i+1]}"
+            formes.setdefault(cle, f"{tokens[i]} {tokens[i+1]}")
+            bruts[cle] = bruts.get(cle, 0) + 2
+    return bruts, formes
 
-    tri = sorted(scores.items(), key=lambda x: -x[1])
+
+def _selection(cles_triees, formes: dict, top_n: int) -> list[str]:
+    """Garde les top_n premières formes affichables parmi les top_n * 2 meilleures clés."""
     result = []
-    seen = set()
-    for k, _ in tri[: top_n * 2]:
-        k_lower = k.lower()
-        if k_lower not in seen and len(k) >= 2:
-            seen.add(k_lower)
+    for cle in cles_triees:
+        k = formes[cle]
+        if len(k) >= 2:
             result.append(k)
             if len(result) >= top_n:
                 break
-    return result[:top_n]
+    return result
 
 
-def offre_from_description(description: str, titre: str = "", entreprise: str = "") -> dict:
-    """Construit un dict offre à partir du texte de la fiche de poste (sans scraping)."""
-    description = (description or "").strip()
-    mots = extraire_mots_cles(description, 15)
+def extraire_mots_cles(description: str, top_n: int = 15) -> list[str]:
+    """Tokenise la description et matche contre les dictionnaires (trie compilé) + fréquence des n-grams.
+    Les variantes (« risques » / « risque », « contrôle » / « controle ») sont regroupées sous une même forme normalisée."""
+    if not description:
+        return []
+    bruts, formes = _comptes(description, automate(_TERMES_DE_BASE, _tokens_dictionnaire))
+    # Pondération IDF (annonces déjà traitées) : les termes génériques pèsent moins
+    poids = idf.charger().poids
+    tri = sorted(((cle, b * poids(cle)) for cle, b in bruts.items()), key=lambda x: -x[1])
+    return _selection((cle for cle, _ in tri[: top_n * 2]), formes, top_n)
+
+
+def extraire_mots_cles_lot(descriptions, top_n: int = 15) -> list[list[str]]:
+    """
+    Extraction sur un lot d'annonces (même résultat que extraire_mots_cles pour chacune).
+    Un seul passage construit une matrice creuse annonces × termes (format CSR : indptr / indices / data) sur un
+    vocabulaire commun ; l'IDF est lu une fois par terme du vocabulaire puis appliqué en vectoriel, et le top-N
+    de chaque ligne est obtenu par sélection partielle (argpartition) au lieu d'un tri complet.
+    Sans NumPy, même algorithme en Python (heapq).
+    """
+    trie = automate(_TERMES_DE_BASE, _tokens_dictionnaire)
+    vocab: dict[str, int] = {}
+    indptr, indices, data = [0], [], []
+    formes_lignes = []
+    for description in descriptions:
+        bruts, formes = _comptes(description, trie) if description else ({}, {})
+        for cle, b in bruts.items():
+            indices.append(vocab.setdefault(cle, len(vocab)))
+            data.append(b)
+        indptr.append(len(indices))
+        formes_lignes.append(formes)
+
+    poids = idf.charger().poids
+    termes = list(vocab)
+    k_max = top_n * 2
+    resultats = []
+    if np is not None:
+        idf_vocab = np.fromiter((poids(t) for t in termes), dtype=np.float64, count=len(termes))
+        indices_np = np.asarray(indices, dtype=np.int64)
+        scores = np.asarray(data, dtype=np.float64) * idf_vocab[indices_np]
+        for i, formes in enumerate(formes_lignes):
+            debut, fin = indptr[i], indptr[i + 1]
+            ligne = scores[debut:fin]
+            k = min(k_max, fin - debut)
+            if k == 0:
+                resultats.append([])
+                continue
+            if k < fin - debut:
+                # k-ième meilleur score par sélection partielle ; on garde tous les ex aequo du seuil
+                seuil = ligne[np.argpartition(-ligne, k - 1)[k - 1]]
+                top = np.flatnonzero(ligne >= seuil)
+            else:
+                top = np.arange(fin - debut)
+            # Score décroissant, puis ordre d'apparition (comme le tri stable de extraire_mots_cles)
+            top = top[np.lexsort((top, -ligne[top]))][:k]
+            resultats.append(_selection((termes[indices[debut + j]] for j in top), formes, top_n))
+        return resultats
+
+    import heapq
+    idf_vocab = [poids(t) for t in termes]
+    for i, formes in enumerate(formes_lignes):
+        debut, fin = indptr[i], indptr[i + 1]
+        ligne = [data[j] * idf_vocab[indices[j]] for j in range(debut, fin)]
+        top = heapq.nsmallest(k_max, range(fin - debut), key=lambda j: (-ligne[j], j))
+        resultats.append(_selection((termes[indices[debut + j]] for j in top), formes, top_n))
+    return resultats
+
+
+def termes_document(description: str) -> set[str]:
+    """Termes distincts (formes normalisées) d'une annonce pour l'index IDF : mots hors mots vides + bigrammes + termes du dictionnaire."""
+    tokens = _tokeniser_et_nettoyer(description)
+    norms = normaliser_tokens(tokens)
+    termes = {n for t, n in zip(tokens, norms) if len(t) >= 2 and t not in STOP}
+    termes.update(
+        f"{norms[i]} {norms[i+1]}" for i in range(len(tokens) - 1)
+        if len(tokens[i]) >= 2 and len(tokens[i + 1]) >= 2
+    )
+    termes.update(normaliser_terme(kw) for kw in trouver(automate(_TERMES_DE_BASE, _tokens_dictionnaire), norms))
+    return termes
+
+
+def apprendre_offres(descriptions: list[str]) -> int:
+    """Ajoute des annonces à l'index IDF persistant (idempotent par empreinte). Retourne le nombre de nouvelles."""
+    docs = [(termes_document(d), idf.empreinte(d)) for d in descriptions if (d or "").strip()]
+    return idf.ajouter_documents(docs)
+
+
+# Annonces en attente d'apprentissage (API web) : ajoutées à l'index par un thread de fond, par lots
+_a_apprendre: list[str] = []
+_apprentissage = threading.Condition()
+_apprenti: threading.Thread | None = None
+
+
+def apprendre_offres_en_fond(descriptions: list[str]) -> None:
+    """
+    Met des annonces en file pour l'index IDF et rend la main tout de suite : le verrou de fichier et l'écriture du
+    journal sont faits par un thread de fond, qui regroupe les annonces arrivées entre-temps en un seul ajout.
+    """
+    global _apprenti
+    with _apprentissage:
+        _a_apprendre.extend(d for d in descriptions if (d or "").strip())
+        if _apprenti is None or not _apprenti.is_alive():  # premier appel, ou processus issu d'un fork
+            _apprenti = threading.Thread(target=_apprendre_en_continu, name="idf-apprentissage", daemon=True)
+            _apprenti.start()
+        _apprentissage.notify()
+
+
+def _prendre_lot(attendre: bool) -> list[str]:
+    with _apprentissage:
+        while attendre and not _a_apprendre:
+            _apprentissage.wait()
+        lot = _a_apprendre[:]
+        _a_apprendre.clear()
+    return lot
+
+
+def _apprendre_lot(lot: list[str]) -> None:
+    if not lot:
+        return
+    try:
+        apprendre_offres(lot)
+    except Exception as e:  # l'IDF n'est qu'une pondération : une annonce non apprise ne doit rien casser
+        print(f"⚠ Index IDF non mis à jour ({len(lot)} annonce(s)) : {e}", file=sys.stderr)
+
+
+def _apprendre_en_continu() -> None:
+    while True:
+        _apprendre_lot(_prendre_lot(attendre=True))
+
+
+@atexit.register
+def _vider_file_apprentissage() -> None:
+    """À l'arrêt du processus, les annonces encore en file sont ajoutées (le thread de fond est daemon)."""
+    _apprendre_lot(_prendre_lot(attendre=False))
+
+
+def _offre(description: str, mots: list[str], titre: str = "", entreprise: str = "") -> dict:
     return {
         "titre": (titre or "").strip(),
         "entreprise": (entreprise or "").strip(),
@@ -80,3 +238,28 @@ def offre_from_description(description: str, titre: str = "", entreprise: str =
         "competences_requises": mots[:15],
         "soft_skills": [],
     }
+
+
+def offre_from_description(description: str, titre: str = "", entreprise: str = "") -> dict:
+    """Construit un dict offre à partir du texte de la fiche de poste (sans scraping)."""
+    description = (description or "").strip()
+    return _offre(description, extraire_mots_cles(description, 15), titre=titre, entreprise=entreprise)
+
+
+def offres_from_descriptions(descriptions, taille_lot: int = 512) -> list[dict]:
+    """
+    Version batch de offre_from_description pour une liste ou un flux d'annonces (traitées par lots de taille_lot).
+    Chaque élément est un texte, ou un dict { "description", "titre", "entreprise" }.
+    """
+    from itertools import islice
+
+    flux = iter(descriptions)
+    offres = []
+    while True:
+        lot = list(islice(flux, taille_lot))
+        if not lot:
+            return offres
+        items = [d if isinstance(d, dict) else {"description": d} for d in lot]
+        textes = [(it.get("description") or "").strip() for it in items]
+        for it, texte, mots in zip(items, textes, extraire_mots_cles_lot(textes, 15)):
+            offres.append(_offre(texte, mots, titre=it.get("titre") or "", entreprise=it.get("entreprise") or ""))
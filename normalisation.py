@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Normalisation partagée des mots pour le matching mots-clés / règles ATS :
+minuscules, repli des accents, pluriels et racinisation légère du français.
+« risques » ~ « risque », « contrôle » ~ « controle », « analyste » ~ « analyse ».
+Mémoïsation bornée par token : le même vocabulaire revient dans chaque annonce et chaque CV.
+
+Micro-benchmark : python normalisation.py
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+# Taille max du cache de tokens normalisés (vocabulaire courant d'annonces + CV : quelques milliers de mots)
+CACHE_TOKENS = 50_000
+
+# Suffixes retirés (un seul, le plus long d'abord), si la racine restante garde au moins 3 lettres
+_SUFFIXES = ("issements", "issement", "ements", "ement", "ations", "ation", "atrices", "atrice", "ateurs", "ateur", "euses", "euse", "eurs", "eur")
+
+_RE_MOTS = re.compile(r"\w+(?:-\w+)*")
+
+
+def replier_accents(texte: str) -> str:
+    """« Contrôle Général » → « controle general » (minuscules + suppression des diacritiques)."""
+    texte = unicodedata.normalize("NFD", texte.lower())
+    return "".join(c for c in texte if not unicodedata.combining(c))
+
+
+@lru_cache(maxsize=CACHE_TOKENS)
+def normaliser_token(token: str) -> str:
+    """Forme normalisée d'un mot : accents repliés, pluriel retiré, racinisation légère. Les mots courts (≤ 3) sont conservés."""
+    t = replier_accents(token)
+    if len(t) <= 3:
+        return t
+    # Pluriels : réseaux → réseau, commerciaux → commercial, risques → risque (mais pas « process »)
+    if t.endswith(("eaux", "eux")):
+        t = t[:-1]
+    elif t.endswith("aux") and len(t) > 4:
+        t = t[:-3] + "al"
+    elif t.endswith("s") and not t.endswith("ss"):
+        t = t[:-1]
+    for suffixe in _SUFFIXES:
+        if t.endswith(suffixe) and len(t) - len(suffixe) >= 3:
+            t = t[: -len(suffixe)]
+            break
+    # e / é finaux (données → donne, conformité → conformit, analyse → analys)
+    while t.endswith("e") and len(t) > 3:
+        t = t[:-1]
+    # analyste → analys (aligné sur analyse)
+    if t.endswith("st") and len(t) > 4:
+        t = t[:-1]
+    return t
+
+
+def normaliser_tokens(tokens) -> list[str]:
+    """Normalise une suite de tokens (les tokens vides sont ignorés)."""
+    return [normaliser_token(t) for t in tokens if t]
+
+
+def tokens_normalises(texte: str) -> list[str]:
+    """Découpe un texte en mots (tirets internes conservés) puis normalise chaque mot."""
+    return normaliser_tokens(_RE_MOTS.findall((texte or "").lower()))
+
+
+def normaliser_terme(terme: str) -> str:
+    """Forme normalisée d'un mot-clé, simple ou composé (« Gestion des Risques » → « gestion des risqu » : les mots de 3 lettres ou moins restent tels quels)."""
+    return " ".join(tokens_normalises(terme))
+
+
+def _benchmark(n_repetitions: int = 200) -> None:
+    import time
+
+    texte = (
+        "Alternance Risk Manager : suivi des risques opérationnels, contrôles permanents, reporting réglementaire, "
+        "analyse des données de marché, tableaux de bord Power BI, conformité Bâle III, gestion des expositions. "
+    ) * 20
+    mots = _RE_MOTS.findall(texte.lower())
+    normaliser_token.cache_clear()
+    t0 = time.perf_counter()
+    normaliser_tokens(mots)
+    froid = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for _ in range(n_repetitions):
+        normaliser_tokens(mots)
+    chaud = (time.perf_counter() - t0) / n_repetitions
+    print(f"{len(mots)} tokens ({len(set(mots))} distincts)")
+    print(f"  cache froid : {froid * 1e6 / len(mots):.2f} µs/token")
+    print(f"  cache chaud : {chaud * 1e6 / len(mots):.3f} µs/token")
+    print(f"  {normaliser_token.cache_info()}")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Choix des bullet points et des expériences affichés par le template (2 bullets par expérience, 6 expériences max)
+selon leur pertinence pour l'offre, au lieu de l'ordre de la liste.
+Matrice bullets × mots-clés de l'offre : vecteurs de termes hachés (mots + bigrammes normalisés), similarité
+cosinus en NumPy (repli en Python si absent). Résultat mis en cache par (version du CV, empreinte de l'offre) ;
+la version d'un CV issu de cv_base_cache (tel quel ou fusionné avec des tweaks) est celle de l'instantané.
+Les mots-clés de l'offre sont ceux de cv["mots_cles_cache"] (posés par l'adaptation) ; sans eux, ordre d'origine.
+"""
+
+import hashlib
+import json
+import math
+import zlib
+from collections import OrderedDict
+
+from cv_base_cache import courant
+from normalisation import tokens_normalises
+
+try:
+    import numpy as np
+except ImportError:  # similarité en pur Python si NumPy est absent
+    np = None
+
+# Dimension des vecteurs hachés (collisions négligeables pour quelques dizaines de bullets)
+DIMENSION = 1 << 12
+NB_BULLETS = 2
+NB_EXPERIENCES = 6
+
+_CACHE_MAX = 256
+_cache: OrderedDict = OrderedDict()
+
+
+def _termes(texte: str) -> list[str]:
+    tokens = tokens_normalises(texte)
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def _vecteur(texte: str) -> dict[int, float]:
+    """Vecteur creux haché (index → poids) normalisé L2."""
+    v: dict[int, float] = {}
+    for t in _termes(texte):
+        h = zlib.crc32(t.encode("utf-8")) % DIMENSION
+        v[h] = v.get(h, 0.0) + 1.0
+    norme = math.sqrt(sum(x * x for x in v.values()))
+    return {h: x / norme for h, x in v.items()} if norme else {}
+
+
+def _similarites(bullets: list[str], requete: str) -> list[float]:
+    """Cosinus entre chaque bullet et la requête (mots-clés de l'offre)."""
+    q = _vecteur(requete)
+    vecteurs = [_vecteur(b) for b in bullets]
+    if not q or not bullets:
+        return [0.0] * len(bullets)
+    if np is not None:
+        matrice = np.zeros((len(bullets), DIMENSION), dtype=np.float32)
+        for i, v in enumerate(vecteurs):
+            if v:
+                matrice[i, list(v)] = list(v.values())
+        qv = np.zeros(DIMENSION, dtype=np.float32)
+        qv[list(q)] = list(q.values())
+        return (matrice @ qv).tolist()
+    return [sum(x * q.get(h, 0.0) for h, x in v.items()) for v in vecteurs]
+
+
+def _choix_par_defaut(experiences: list, nb_experiences: int, nb_bullets: int) -> list:
+    return [list(range(min(nb_bullets, len(exp.get("bullet_points") or [])))) for exp in experiences[:nb_experiences]]
+
+
+def _empreinte(experiences: list) -> str:
+    return hashlib.sha1(json.dumps(experiences, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def _cle_cv(experiences: list) -> tuple:
+    """
+    Version des expériences : les expériences partagées avec l'instantané courant de cv_base.json (même objet, cf.
+    apply_tweaks_to_cv) sont repérées par leur position, sans sérialisation ; seules les autres sont hachées.
+    """
+    instantane = courant()
+    positions = {id(e): i for i, e in enumerate(instantane.cv.get("experiences") or [])} if instantane is not None else {}
+    propres = [e for e in experiences if id(e) not in positions]
+    return (
+        instantane.version if instantane is not None else None,
+        tuple(positions.get(id(e)) for e in experiences),
+        _empreinte(propres) if propres else None,
+    )
+
+
+def choisir_affichage(cv: dict, nb_experiences: int = NB_EXPERIENCES, nb_bullets: int = NB_BULLETS) -> list[tuple[dict, list[int]]]:
+    """
+    Expériences à afficher (dans l'ordre du CV) avec, pour chacune, les indices des bullets retenus
+    (les nb_bullets plus pertinents, dans leur ordre d'origine). Les nb_experiences expériences retenues sont
+    celles dont les meilleurs bullets sont les plus pertinents.
+    """
+    experiences = [e for e in (cv.get("experiences") or []) if isinstance(e, dict)]
+    requete = (cv.get("mots_cles_cache") or "").strip()
+    if not requete:
+        return list(zip(experiences, _choix_par_defaut(experiences, nb_experiences, nb_bullets)))
+
+    cle = (_cle_cv(experiences), hashlib.sha1(requete.encode("utf-8")).hexdigest(), nb_experiences, nb_bullets)
+    choix = _cache.get(cle)
+    if choix is not None:
+        _cache.move_to_end(cle)
+        return [(experiences[i], indices) for i, indices in choix]
+
+    # Une seule matrice pour tous les bullets du CV
+    positions, textes = [], []
+    for i, exp in enumerate(experiences):
+        for j, b in enumerate(exp.get("bullet_points") or []):
+            if isinstance(b, str) and b.strip():
+                positions.append((i, j))
+                textes.append(b)
+    sims = _similarites(textes, requete)
+    par_exp: dict[int, list] = {}
+    for (i, j), s in zip(positions, sims):
+        par_exp.setdefault(i, []).append((s, j))
+
+    retenus = {}
+    for i, exp in enumerate(experiences):
+        classes = sorted(par_exp.get(i, []), key=lambda x: (-x[0], x[1]))[:nb_bullets]
+        indices = sorted(j for _, j in classes)
+        if not indices:
+            indices = list(range(min(nb_bullets, len(exp.get("bullet_points") or []))))
+        score = sum(s for s, _ in classes) / max(len(classes), 1)
+        retenus[i] = (score, indices)
+    # Meilleures expériences (départage : position dans le CV), réaffichées dans l'ordre du CV
+    top = sorted(retenus, key=lambda i: (-retenus[i][0], i))[:nb_experiences]
+    choix = [(i, retenus[i][1]) for i in sorted(top)]
+
+    _cache[cle] = choix
+    if len(_cache) > _CACHE_MAX:
+        _cache.popitem(last=False)
+    return [(experiences[i], indices) for i, indices in choix]
@@ -4,13 +4,20 @@ Résolution et compression de la photo CV depuis le dossier assets/.
 Produit une version légère (photo_cv.jpg) pour le preview et le PDF.
 """
 
+import os
+import threading
 from pathlib import Path
 
+from mesures import etape
+
 ASSETS_DIR = "assets"
 PHOTO_CV_NAME = "photo_cv.jpg"
 PHOTO_NAMES = ("photo.jpg", "photo.jpeg", "photo.png", "photo.webp")
 MAX_SIZE = 200  # max width/height en px pour le CV (affichage ~80px, 200 suffit pour qualité)
 JPEG_QUALITY = 85
+# Dossier contenant assets/ à la place du base_dir des appelants (données isolées du test de charge, charge.py) ;
+# les chemins de photo renvoyés sont alors des URI file:// absolues
+ASSETS_RACINE: Path | None = None
 
 
 IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif")
@@ -53,20 +60,28 @@ def _compress_photo(source: Path, dest: Path) -> bool:
     except ImportError:
         return False
 
-    try:
-        img = Image.open(source).convert("RGB")
-    except Exception:
-        return False
-
-    w, h = img.size
-    if w > MAX_SIZE or h > MAX_SIZE:
-        ratio = min(MAX_SIZE / w, MAX_SIZE / h)
-        new_size = (int(w * ratio), int(h * ratio))
-        resample = getattr(Image, "Resampling", Image).LANCZOS
-        img = img.resize(new_size, resample)
-
-    dest.parent.mkdir(parents=True, exist_ok=True)
-    img.save(dest, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    with etape("photo.compression"):
+        try:
+            img = Image.open(source).convert("RGB")
+        except Exception:
+            return False
+
+        w, h = img.size
+        if w > MAX_SIZE or h > MAX_SIZE:
+            ratio = min(MAX_SIZE / w, MAX_SIZE / h)
+            new_size = (int(w * ratio), int(h * ratio))
+            resample = getattr(Image, "Resampling", Image).LANCZOS
+            img = img.resize(new_size, resample)
+
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        # Fichier temporaire puis remplacement atomique : un autre worker ne lit jamais une photo à moitié écrite
+        tmp = dest.with_name(f"{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            img.save(tmp, "JPEG", quality=JPEG_QUALITY, optimize=True)
+            os.replace(tmp, dest)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            return False
     return True
 
 
@@ -103,6 +118,7 @@ def get_photo_url_for_cv(
     ):
         return existing_photo_url
 
+    base_dir = ASSETS_RACINE or base_dir
     assets_dir = base_dir / ASSETS_DIR
     source: Path | None = None
 
@@ -119,8 +135,12 @@ def get_photo_url_for_cv(
 
     dest = assets_dir / PHOTO_CV_NAME
     if dest.is_file() and dest.stat().st_mtime >= source.stat().st_mtime:
-        return f"{ASSETS_DIR}/{PHOTO_CV_NAME}"
+        return _url(dest)
 
     if _compress_photo(source, dest):
-        return f"{ASSETS_DIR}/{PHOTO_CV_NAME}"
-    return f"{ASSETS_DIR}/{source.name}"
+        return _url(dest)
+    return _url(assets_dir / source.name)
+
+
+def _url(chemin: Path) -> str:
+    return f"{ASSETS_DIR}/{chemin.name}" if ASSETS_RACINE is None else chemin.as_uri()
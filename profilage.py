@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Profilage à la demande d'une requête Flask ou d'une commande CLI, pour analyser sur place un rendu ou une adaptation lente.
+- Session(nom, mode) : context manager ; mode "deterministe" (cProfile → .prof pour pstats / snakeviz + .txt top
+  cumulatif) ou "echantillons" (échantillonneur du thread profilé toutes les ECHANTILLON_S → .folded, piles
+  compatibles flamegraph.pl / speedscope). Dans les deux cas tracemalloc → .alloc.txt (top des allocations de la session).
+- Serveur : CV_BOT_PROFILAGE=demande active l'en-tête X-CV-Bot-Profil (ou ?profil=) : 1 / deterministe / echantillons ;
+  CV_BOT_PROFILAGE=toujours profile chaque requête. Désactivé par défaut : aucun hook Flask n'est alors installé.
+- CLI : python main.py --profile [deterministe|echantillons] …
+Seul le thread de la requête / commande est profilé (le travail délégué à asyncio.to_thread n'apparaît que comme attente).
+Fichiers écrits dans profils/ (CV_BOT_PROFILS_DIR).
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+PROFILS_DIR = Path(os.environ.get("CV_BOT_PROFILS_DIR", "").strip() or BASE_DIR / "profils")
+
+MODE_SERVEUR = os.environ.get("CV_BOT_PROFILAGE", "").strip().lower()
+if MODE_SERVEUR not in ("demande", "toujours"):
+    MODE_SERVEUR = ""
+
+MODES = ("deterministe", "echantillons")
+ECHANTILLON_S = 0.005
+TOP_LIGNES = 40
+TOP_ALLOCATIONS = 25
+
+# cProfile et tracemalloc sont globaux au processus : une seule session à la fois
+_occupe = threading.Lock()
+
+
+def mode_demande(valeur: str | None) -> str | None:
+    """Mode de profilage demandé par une valeur d'en-tête / de paramètre (None : pas de profilage)."""
+    if MODE_SERVEUR == "toujours" and not valeur:
+        return "deterministe"
+    if not MODE_SERVEUR or not valeur:
+        return None
+    valeur = valeur.strip().lower()
+    if valeur in MODES:
+        return valeur
+    return "deterministe" if valeur in ("1", "true", "oui", "on") else None
+
+
+def _fichier(base: Path, extension: str) -> Path:
+    # Pas de with_suffix : le nom de session contient des points (« http.api_pdf »)
+    return base.with_name(base.name + extension)
+
+
+def _module(fichier: str) -> str:
+    """« /chemin/generator.py » → « generator » ; les pseudo-fichiers (« <frozen …> ») restent tels quels."""
+    if fichier.startswith("<"):
+        return fichier
+    nom = os.path.basename(fichier)
+    return nom[:-3] if nom.endswith(".py") else nom
+
+
+class _Echantillonneur(threading.Thread):
+    """Relève périodiquement la pile d'un thread ; piles agrégées au format « folded » (racine;…;feuille nombre)."""
+
+    def __init__(self, cible: int, intervalle: float):
+        super().__init__(name="cv-bot-profil", daemon=True)
+        self.cible = cible
+        self.intervalle = intervalle
+        self.piles: Counter = Counter()
+        self._fin = threading.Event()
+
+    def run(self):
+        while not self._fin.wait(self.intervalle):
+            frame = sys._current_frames().get(self.cible)
+            pile = []
+            while frame is not None:
+                code = frame.f_code
+                pile.append(f"{_module(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if pile:
+                self.piles[";".join(reversed(pile))] += 1
+
+    def arreter(self):
+        self._fin.set()
+        self.join()
+
+
+class Session:
+    """Profil d'un bloc de code : with Session("http.api_pdf") as s: … → s.fichiers (chemins écrits)."""
+
+    def __init__(self, nom: str, mode: str = "deterministe", dossier: Path | None = None):
+        self.nom = nom
+        self.mode = mode if mode in MODES else "deterministe"
+        self.dossier = Path(dossier or PROFILS_DIR)
+        self.fichiers: list[Path] = []
+        self._profil = None
+        self._echantillonneur = None
+        self._tracemalloc_par_nous = False
+        self._instantane = None
+        self._debut = 0.0
+        self._actif = False
+
+    def demarrer(self) -> "Session":
+        """Démarre le profilage du thread courant. Lève RuntimeError si une autre session est en cours."""
+        if not _occupe.acquire(blocking=False):
+            raise RuntimeError("Un profilage est déjà en cours dans ce processus")
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self._tracemalloc_par_nous = True
+        tracemalloc.reset_peak()
+        self._instantane = tracemalloc.take_snapshot()
+        self._debut = time.perf_counter()
+        if self.mode == "echantillons":
+            self._echantillonneur = _Echantillonneur(threading.get_ident(), ECHANTILLON_S)
+            self._echantillonneur.start()
+        else:
+            self._profil = cProfile.Profile()
+            self._profil.enable()
+        self._actif = True
+        return self
+
+    def arreter(self) -> list[Path]:
+        """Arrête les profileurs et écrit les fichiers (idempotent). Retourne les chemins écrits."""
+        if not self._actif:
+            return self.fichiers
+        self._actif = False
+        if self._profil is not None:
+            self._profil.disable()
+        if self._echantillonneur is not None:
+            self._echantillonneur.arreter()
+        duree = time.perf_counter() - self._debut
+        fin = tracemalloc.take_snapshot()
+        _, pic = tracemalloc.get_traced_memory()
+        if self._tracemalloc_par_nous:
+            tracemalloc.stop()
+        _occupe.release()
+
+        self.dossier.mkdir(parents=True, exist_ok=True)
+        nom_sur = "".join(c if c.isalnum() or c in "._-" else "_" for c in self.nom)
+        maintenant = datetime.now()
+        base = self.dossier / f"{maintenant:%Y%m%d-%H%M%S}-{maintenant.microsecond // 1000:03d}_{os.getpid()}_{nom_sur}"
+        if self._profil is not None:
+            self.fichiers.append(self._ecrire_pstats(base, duree))
+        if self._echantillonneur is not None:
+            self.fichiers.append(self._ecrire_piles(base))
+        self.fichiers.append(self._ecrire_allocations(base, fin, pic, duree))
+        return self.fichiers
+
+    def _ecrire_pstats(self, base: Path, duree: float) -> Path:
+        chemin = _fichier(base, ".prof")
+        self._profil.dump_stats(chemin)
+        texte = io.StringIO()
+        texte.write(f"{self.nom} — {duree * 1000:.1f} ms (cProfile)\n")
+        pstats.Stats(self._profil, stream=texte).sort_stats("cumulative").print_stats(TOP_LIGNES)
+        _fichier(base, ".txt").write_text(texte.getvalue(), encoding="utf-8")
+        return chemin
+
+    def _ecrire_piles(self, base: Path) -> Path:
+        chemin = _fichier(base, ".folded")
+        with open(chemin, "w", encoding="utf-8") as f:
+            for pile, n in self._echantillonneur.piles.most_common():
+                f.write(f"{pile} {n}\n")
+        return chemin
+
+    def _ecrire_allocations(self, base: Path, fin, pic: int, duree: float) -> Path:
+        chemin = _fichier(base, ".alloc.txt")
+        # Allocations du profileur lui-même exclues
+        filtres = tuple(
+            tracemalloc.Filter(False, motif)
+            for motif in (tracemalloc.__file__, cProfile.__file__, __file__, "<frozen importlib._bootstrap*>")
+        )
+        debut, fin = self._instantane.filter_traces(filtres), fin.filter_traces(filtres)
+        lignes = [f"{self.nom} — {duree * 1000:.1f} ms, pic mémoire tracé {pic / 1024:.0f} Ko", ""]
+        for stat in fin.compare_to(debut, "lineno")[:TOP_ALLOCATIONS]:
+            lignes.append(f"{stat.size_diff / 1024:>+10.1f} Ko  {stat.count_diff:>+7} bloc(s)  {stat.traceback[0]}")
+        chemin.write_text("\n".join(lignes) + "\n", encoding="utf-8")
+        return chemin
+
+    def __enter__(self):
+        return self.demarrer()
+
+    def __exit__(self, *exc):
+        self.arreter()
+        return False
@@ -4,7 +4,8 @@ Règles ATS déterministes : scoring, marquage des zones à adapter, réordonnan
 """
 
 import re
-from copy import deepcopy
+
+from normalisation import normaliser_terme, tokens_normalises
 
 
 def _texte_plat(obj) -> str:
@@ -31,49 +32,144 @@ def _mots_offre(offre: dict) -> set:
     return mots
 
 
-def _score_experience(exp: dict, mots_offre: set) -> float:
-    """Score 0-10 : nombre de mots-clés de l'offre présents dans l'expérience."""
-    if not mots_offre:
-        return 5.0
-    texte = _texte_plat({
+def _formes_normalisees(mots: set) -> dict:
+    """Forme normalisée (accents, pluriels, racines) → mot-clé d'origine."""
+    formes = {}
+    for m in mots:
+        n = normaliser_terme(m)
+        if n:
+            formes.setdefault(n, m)
+    return formes
+
+
+def _texte_normalise(texte: str) -> tuple[set, str]:
+    """(ensemble des tokens normalisés, texte normalisé encadré d'espaces pour chercher les expressions)."""
+    tokens = tokens_normalises(texte)
+    return set(tokens), f" {' '.join(tokens)} "
+
+
+def _present(forme: str, tokens: set, texte: str) -> bool:
+    """Mot simple : appartenance au set de tokens ; expression : sous-chaîne alignée sur les mots."""
+    if " " in forme:
+        return f" {forme} " in texte
+    return forme in tokens
+
+
+# Longueur max des n-grammes indexés (au-delà, recherche en sous-chaîne alignée sur les mots)
+NGRAM_MAX = 4
+
+
+class TexteIndexe:
+    """Texte pré-tokenisé : ensemble des n-grammes normalisés (1 à NGRAM_MAX mots) + texte normalisé encadré d'espaces."""
+
+    __slots__ = ("ngrammes", "texte")
+
+    def __init__(self, texte: str):
+        tokens = tokens_normalises(texte)
+        ngrammes = set(tokens)
+        for n in range(2, NGRAM_MAX + 1):
+            ngrammes.update(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        self.ngrammes = frozenset(ngrammes)
+        self.texte = f" {' '.join(tokens)} "
+
+    def contient(self, forme: str) -> bool:
+        """Forme normalisée présente : lookup dans les n-grammes, sous-chaîne seulement pour les très longues expressions."""
+        if forme in self.ngrammes:
+            return True
+        return forme.count(" ") >= NGRAM_MAX and f" {forme} " in self.texte
+
+
+def _texte_experience(exp: dict) -> str:
+    return _texte_plat({
         "poste": exp.get("poste", ""),
         "entreprise": exp.get("entreprise", ""),
         "bullet_points": exp.get("bullet_points", []),
         "mots_cles": exp.get("mots_cles", []),
         "clients": exp.get("clients", ""),
     })
-    tokens_texte = set(re.findall(r"\w+", texte))
-    # Match exact de mots
-    matches = sum(1 for m in mots_offre if m in texte or m in tokens_texte)
+
+
+class IndexCV:
+    """
+    Index compilé d'un CV : n-grammes par expérience (dans l'ordre de cv["experiences"]), du CV entier,
+    du titre et du résumé. Construit une fois par version de cv_base ; le scoring d'une offre
+    ne fait ensuite que des lookups dans ces ensembles.
+    """
+
+    def __init__(self, cv: dict):
+        self.experiences = [TexteIndexe(_texte_experience(exp)) for exp in cv.get("experiences", [])]
+        self.cv = TexteIndexe(_texte_plat(cv))
+        self.titre = TexteIndexe(cv.get("titre_professionnel") or "")
+        self.resume = TexteIndexe(cv.get("resume") or "")
+
+
+_CACHE_INDEX: dict = {}
+_CACHE_INDEX_MAX = 8
+
+
+def index_cv(cv: dict, version=None) -> IndexCV:
+    """
+    IndexCV mis en cache par version (ex. (mtime_ns, taille) de cv_base.json) ; sans version,
+    par empreinte du contenu JSON du CV.
+    """
+    if version is None:
+        import hashlib
+        import json
+        version = hashlib.sha1(json.dumps(cv, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+    index = _CACHE_INDEX.get(version)
+    if index is None:
+        if len(_CACHE_INDEX) >= _CACHE_INDEX_MAX:
+            _CACHE_INDEX.pop(next(iter(_CACHE_INDEX)))
+        index = _CACHE_INDEX[version] = IndexCV(cv)
+    return index
+
+
+def _score_index(texte: TexteIndexe, formes_offre: dict, n_mots: int) -> float:
+    """Score 0-10 : formes normalisées des mots-clés de l'offre présentes dans le texte, sur n_mots mots-clés."""
+    if not n_mots:
+        return 5.0
+    matches = sum(1 for f in formes_offre if texte.contient(f))
     # Normaliser sur 10 (au moins 1 mot = 1 point, plafond 10)
-    return min(10.0, max(0.0, (matches / max(len(mots_offre), 1)) * 10.0))
+    return min(10.0, max(0.0, (matches / max(n_mots, 1)) * 10.0))
+
+
+def _score_experience(exp: dict, mots_offre: set) -> float:
+    """Score 0-10 : nombre de mots-clés de l'offre présents dans l'expérience (après normalisation)."""
+    if not mots_offre:
+        return 5.0
+    # Match sur les formes normalisées (« risques » ~ « risque », « contrôle » ~ « controle »)
+    return _score_index(TexteIndexe(_texte_experience(exp)), _formes_normalisees(mots_offre), len(mots_offre))
 
 
-def appliquer_regles(cv: dict, offre: dict) -> dict:
+def appliquer_regles(cv: dict, offre: dict, index: IndexCV | None = None) -> dict:
     """
     Enrichit le CV avec score_pertinence, a_renforcer, titre_a_adapter, resume_a_adapter,
     réordonne les expériences par pertinence, et ajoute un objet rapport.
+    index : IndexCV précompilé de cv (sinon pris dans le cache via index_cv). Ne modifie pas cv.
     """
-    cv_enrichi = deepcopy(cv)
+    if index is None:
+        from cv_base_cache import instantane_de
+        instantane = instantane_de(cv)
+        index = instantane.index if instantane is not None else index_cv(cv)
+    # Copie superficielle : seules des clés sont ajoutées au CV et à chaque expérience
+    cv_enrichi = dict(cv)
+    cv_enrichi["experiences"] = [dict(exp) for exp in cv.get("experiences", [])]
     mots_offre = _mots_offre(offre)
+    formes_offre = _formes_normalisees(mots_offre)
     titre_offre = (offre.get("titre") or "").lower()
-    titre_cv = (cv.get("titre_professionnel") or "").lower()
-    resume_cv = (cv.get("resume") or "").lower()
 
     # Règle 1 — Scoring de pertinence
-    for exp in cv_enrichi.get("experiences", []):
-        exp["score_pertinence"] = _score_experience(exp, mots_offre)
+    for exp, texte in zip(cv_enrichi["experiences"], index.experiences):
+        exp["score_pertinence"] = _score_index(texte, formes_offre, len(mots_offre))
 
     # Règle 2 — Marquage des zones à adapter
-    mots_dans_cv = _texte_plat(cv_enrichi)
-    mots_manquants = [m for m in mots_offre if len(m) > 2 and m not in mots_dans_cv]
-    titres_offre = set(re.findall(r"\w+", titre_offre))
+    mots_manquants = [m for f, m in formes_offre.items() if len(m) > 2 and not index.cv.contient(f)]
+    titres_offre = set(tokens_normalises(titre_offre))
 
-    titre_a_adapter = bool(titres_offre and not any(t in titre_cv for t in titres_offre))
+    titre_a_adapter = bool(titres_offre and not (titres_offre & index.titre.ngrammes))
     cv_enrichi["titre_a_adapter"] = titre_a_adapter
 
-    resume_mots = set(re.findall(r"\w+", resume_cv))
-    resume_match = sum(1 for m in mots_offre if m in resume_cv or m in resume_mots)
+    resume_match = sum(1 for f in formes_offre if index.resume.contient(f))
     cv_enrichi["resume_a_adapter"] = resume_match < 2
 
     # Marquer a_renforcer sur les expériences les plus pertinentes par secteur si mots manquants
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Serveur CLI résident : garde chauds les modules (WeasyPrint, google-genai, Pillow), les templates Jinja, les feuilles
+CSS, l'automate des mots-clés et cv_base.json, pour que `python main.py …` ne paie plus que le travail lui-même.
+- main.py devient un client léger : il transmet ses arguments et son dossier courant sur une socket Unix,
+  affiche la sortie au fil de l'eau et répond aux questions (input) ; le serveur est démarré au premier usage.
+- Un serveur obsolète (fichier .py ou .env modifié, variables CV_BOT_* / GEMINI_* différentes, autre interpréteur)
+  s'arrête de lui-même et le client en démarre un nouveau. Arrêt après INACTIVITE_S sans commande.
+- Une commande à la fois (elles changent de dossier courant) ; les commandes interactives ou sans fin
+  (--setup, --surveiller, --profile) restent exécutées dans le processus du client.
+Désactivable avec CV_BOT_SERVEUR_CLI=0 ; indisponible sous Windows (pas de socket Unix) : exécution directe.
+python main.py --serveur-cli-arreter pour l'arrêter, --direct pour exécuter une commande sans lui.
+"""
+
+import hashlib
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+ACTIF = os.environ.get("CV_BOT_SERVEUR_CLI", "1").strip().lower() not in ("0", "false", "non", "off") and hasattr(socket, "AF_UNIX") and os.name != "nt"
+INACTIVITE_S = float(os.environ.get("CV_BOT_SERVEUR_CLI_INACTIVITE_S", "1800") or 1800)
+DEMARRAGE_S = 30.0
+
+# Variables qui influencent le comportement des modules (lues à l'import) : un écart impose un nouveau serveur
+_PREFIXES_ENV = ("CV_BOT_", "GEMINI_", "GOOGLE_", "WEASYPRINT_")
+
+_canal: ContextVar["_Canal | None"] = ContextVar("cv_bot_canal_cli", default=None)
+
+
+def chemin_socket() -> Path:
+    """Socket du serveur : CV_BOT_SERVEUR_CLI_SOCKET, sinon une par copie du projet dans XDG_RUNTIME_DIR ou /tmp."""
+    explicite = os.environ.get("CV_BOT_SERVEUR_CLI_SOCKET", "").strip()
+    if explicite:
+        return Path(explicite)
+    # Chemin court (les sockets Unix sont limitées à ~100 caractères) : empreinte du dossier du projet
+    cle = hashlib.sha256(str(BASE_DIR).encode("utf-8")).hexdigest()[:10]
+    dossier = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return Path(dossier) / f"cv-bot-{os.getuid()}-{cle}.sock"
+
+
+def empreinte() -> str:
+    """Version de l'environnement d'exécution : sources .py, .env, variables pertinentes, interpréteur."""
+    h = hashlib.sha256(sys.executable.encode("utf-8"))
+    for f in sorted(BASE_DIR.glob("*.py")) + [BASE_DIR / ".env"]:
+        try:
+            h.update(f"{f.name}:{os.stat(f).st_mtime_ns}".encode("utf-8"))
+        except OSError:
+            continue
+    for cle in sorted(k for k in os.environ if k.startswith(_PREFIXES_ENV)):
+        h.update(f"{cle}={os.environ[cle]}".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def _envoyer(sock: socket.socket, message: dict) -> None:
+    sock.sendall(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+# --- Serveur -------------------------------------------------------------------------------------------------------
+
+
+class _Canal:
+    """Connexion d'un client : sortie / erreurs renvoyées au fil de l'eau, lectures de stdin à la demande."""
+
+    def __init__(self, sock: socket.socket, lecteur):
+        self.sock = sock
+        self.lecteur = lecteur
+        self.ferme = False
+        self._lock = threading.Lock()
+
+    def envoyer(self, message: dict) -> None:
+        with self._lock:
+            if self.ferme:
+                return
+            try:
+                _envoyer(self.sock, message)
+            except OSError:
+                # Client parti (Ctrl+C) : la commande se termine sans sortie
+                self.ferme = True
+
+    def lire_ligne(self) -> str:
+        self.envoyer({"lire": True})
+        if self.ferme:
+            return ""
+        try:
+            ligne = self.lecteur.readline()
+        except OSError:
+            ligne = ""
+        if not ligne:
+            self.ferme = True
+            return ""
+        return json.loads(ligne).get("ligne", "")
+
+
+class _Flux(io.TextIOBase):
+    """Remplace sys.stdout / sys.stderr / sys.stdin : aiguille vers le client de la commande courante (contextvars)."""
+
+    def __init__(self, origine, cle: str):
+        self.origine = origine
+        self.cle = cle
+
+    def write(self, texte: str) -> int:
+        canal = _canal.get()
+        if canal is None:
+            return self.origine.write(texte)
+        if texte:
+            canal.envoyer({self.cle: texte})
+        return len(texte)
+
+    def flush(self) -> None:
+        if _canal.get() is None:
+            self.origine.flush()
+
+    def readline(self, limite: int = -1) -> str:
+        canal = _canal.get()
+        if canal is None:
+            return self.origine.readline(limite)
+        return canal.lire_ligne()
+
+    def fileno(self) -> int:
+        # input() n'utilise le terminal (readline, écho) que si fileno() est celui du processus
+        if _canal.get() is not None:
+            raise io.UnsupportedOperation("fileno")
+        return self.origine.fileno()
+
+    def isatty(self) -> bool:
+        return _canal.get() is None and self.origine.isatty()
+
+    @property
+    def encoding(self):
+        return "utf-8" if _canal.get() is not None else self.origine.encoding
+
+
+def prechauffer() -> None:
+    """Importe et prépare une fois ce que chaque commande paierait sinon au démarrage."""
+    import main  # noqa: F401  (charge .env)
+    for module in ("weasyprint", "PIL.Image", "google.genai", "google.genai.types"):
+        try:
+            __import__(module)
+        except (ImportError, OSError):
+            pass
+    from generator import environnement_templates, feuille_css
+    env = environnement_templates()
+    for nom in ("template.html", "letter_template.html", "fiche_poste_template.html"):
+        env.get_template(nom)
+    for nom in ("template.css", "letter_template.css", "fiche_poste_template.css"):
+        try:
+            feuille_css(nom)
+        except (ImportError, OSError):
+            pass
+    import adapter  # noqa: F401
+    import export_package  # noqa: F401
+    import idf
+    import mots_cles
+    mots_cles.offre_from_description("préchargement")
+    idf.charger()
+    try:
+        from cv_base_cache import charger
+        instantane = charger()
+        instantane.index
+        instantane.fragment_prompt
+    except (FileNotFoundError, ValueError):
+        pass
+
+
+class Serveur:
+    """Serveur résident : une connexion = une commande main.py, exécutée dans ce processus."""
+
+    def __init__(self, chemin: Path | None = None, inactivite_s: float = INACTIVITE_S):
+        self.chemin = Path(chemin or chemin_socket())
+        self.inactivite_s = inactivite_s
+        self.empreinte = empreinte()
+        self._commande = threading.Lock()
+        self._derniere_activite = time.monotonic()
+        self._arret = threading.Event()
+        self._sock: socket.socket | None = None
+        self._inode: int | None = None
+
+    def _ecouter(self) -> bool:
+        """Crée la socket ; False si un autre serveur répond déjà sur ce chemin."""
+        if self.chemin.exists():
+            autre = _connecter(self.chemin)
+            if autre is not None:
+                autre.close()
+                return False
+            self.chemin.unlink(missing_ok=True)  # socket orpheline (serveur tué)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Socket créée directement en 0600 (pas de fenêtre entre bind et chmod où un autre utilisateur pourrait se connecter)
+        masque = os.umask(0o177)
+        try:
+            self._sock.bind(str(self.chemin))
+        finally:
+            os.umask(masque)
+        self._inode = os.stat(self.chemin).st_ino
+        self._sock.listen(16)
+        self._sock.settimeout(1.0)
+        return True
+
+    def _retirer_socket(self) -> None:
+        # Seulement si c'est encore la nôtre (un serveur plus récent a pu la remplacer)
+        try:
+            if self._inode is not None and os.stat(self.chemin).st_ino == self._inode:
+                self.chemin.unlink()
+        except OSError:
+            pass
+
+    def executer(self) -> None:
+        if not self._ecouter():
+            return
+        sys.stdout, sys.stderr, sys.stdin = _Flux(sys.stdout, "sortie"), _Flux(sys.stderr, "erreur"), _Flux(sys.stdin, "")
+        t0 = time.perf_counter()
+        prechauffer()
+        print(f"cv-bot : serveur CLI prêt en {time.perf_counter() - t0:.1f} s sur {self.chemin} (pid {os.getpid()})", flush=True)
+        try:
+            while not self._arret.is_set():
+                try:
+                    conn, _ = self._sock.accept()
+                except socket.timeout:
+                    if not self._commande.locked() and time.monotonic() - self._derniere_activite > self.inactivite_s:
+                        break
+                    continue
+                threading.Thread(target=self._servir, args=(conn,), daemon=True).start()
+        finally:
+            self._retirer_socket()
+            self._sock.close()
+            # Laisse finir une commande en cours
+            with self._commande:
+                pass
+
+    def _servir(self, conn: socket.socket) -> None:
+        with conn, conn.makefile("r", encoding="utf-8") as lecteur:
+            try:
+                requete = json.loads(lecteur.readline() or "{}")
+            except ValueError:
+                return
+            canal = _Canal(conn, lecteur)
+            if requete.get("arreter"):
+                self._retirer_socket()
+                canal.envoyer({"fin": 0})
+                self._arret.set()
+                return
+            if requete.get("empreinte") != self.empreinte:
+                # Code ou configuration modifiés : on libère le chemin tout de suite, le client démarre un nouveau serveur
+                self._retirer_socket()
+                canal.envoyer({"obsolete": True})
+                self._arret.set()
+                return
+            with self._commande:
+                self._derniere_activite = time.monotonic()
+                code = self._commande_main(canal, requete)
+                self._derniere_activite = time.monotonic()
+            canal.envoyer({"fin": code})
+
+    def _commande_main(self, canal: _Canal, requete: dict) -> int:
+        import main
+
+        jeton = _canal.set(canal)
+        try:
+            os.chdir(requete.get("cwd") or BASE_DIR)
+            parser = main._construire_parser()
+            args = parser.parse_args(requete.get("argv") or [])
+            main._executer(args, parser)
+            return 0
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except (KeyboardInterrupt, EOFError):
+            return 130
+        except Exception:
+            import traceback
+            traceback.print_exc()
+            return 1
+        finally:
+            sys.stdout.flush()
+            _canal.reset(jeton)
+            os.chdir(BASE_DIR)
+
+
+# --- Client --------------------------------------------------------------------------------------------------------
+
+
+def _connecter(chemin: Path) -> socket.socket | None:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(chemin))
+        return sock
+    except OSError:
+        sock.close()
+        return None
+
+
+def _demarrer(chemin: Path) -> socket.socket | None:
+    """Lance le serveur en arrière-plan (détaché du terminal) et attend qu'il écoute."""
+    from verrous import verrou_fichier
+
+    # Verrou : deux clients lancés en même temps ne démarrent qu'un serveur
+    with verrou_fichier(chemin):
+        sock = _connecter(chemin)
+        if sock is not None:
+            return sock
+        journal = chemin.with_name(chemin.name.replace(".sock", ".log"))
+        with open(journal, "ab") as sortie:
+            subprocess.Popen(
+                [sys.executable, str(Path(__file__).resolve())],
+                cwd=str(BASE_DIR),
+                stdin=subprocess.DEVNULL,
+                stdout=sortie,
+                stderr=sortie,
+                start_new_session=True,
+            )
+        limite = time.monotonic() + DEMARRAGE_S
+        while time.monotonic() < limite:
+            time.sleep(0.05)
+            sock = _connecter(chemin) if chemin.exists() else None
+            if sock is not None:
+                return sock
+    return None
+
+
+def transmettre(argv: list[str]) -> int | None:
+    """
+    Exécute la commande main.py dans le serveur résident (démarré si besoin) et retourne son code de sortie,
+    ou None si le serveur est indisponible avant l'envoi de la commande (l'appelant l'exécute alors lui-même).
+    Une fois la commande envoyée, une coupure retourne 1 : elle a pu commencer (appel Gemini, fichiers écrits),
+    la relancer en local la dupliquerait.
+    """
+    chemin = chemin_socket()
+    requete = {"argv": argv, "cwd": os.getcwd(), "empreinte": empreinte()}
+    for _ in range(2):
+        sock = _connecter(chemin) or _demarrer(chemin)
+        if sock is None:
+            return None
+        with sock, sock.makefile("r", encoding="utf-8") as lecteur:
+            try:
+                _envoyer(sock, requete)
+            except OSError:
+                return None
+            try:
+                for ligne in lecteur:
+                    message = json.loads(ligne)
+                    if "sortie" in message:
+                        sys.stdout.write(message["sortie"])
+                        sys.stdout.flush()
+                    elif "erreur" in message:
+                        sys.stderr.write(message["erreur"])
+                        sys.stderr.flush()
+                    elif "lire" in message:
+                        try:
+                            reponse = sys.stdin.readline()
+                        except (KeyboardInterrupt, EOFError):
+                            return 130
+                        _envoyer(sock, {"ligne": reponse})
+                    elif "fin" in message:
+                        return int(message["fin"] or 0)
+                    elif message.get("obsolete"):
+                        break
+                else:
+                    # Serveur tombé pendant la commande
+                    print("Le serveur CLI s'est arrêté pendant la commande (voir son journal).", file=sys.stderr)
+                    return 1
+            except (OSError, ValueError) as e:
+                print(f"Connexion au serveur CLI interrompue pendant la commande ({e}) ; voir son journal.", file=sys.stderr)
+                return 1
+            except KeyboardInterrupt:
+                return 130
+    return None
+
+
+def arreter() -> bool:
+    """Demande l'arrêt du serveur résident (après la commande en cours). False s'il ne tournait pas."""
+    sock = _connecter(chemin_socket())
+    if sock is None:
+        return False
+    with sock:
+        _envoyer(sock, {"arreter": True})
+        sock.recv(64)
+    return True
+
+
+if __name__ == "__main__":
+    Serveur().executer()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Dossier surveillé : chaque annonce déposée (.txt, .md, .html) est traitée automatiquement
+(extraction → règles → adaptation → dossier candidature CV + lettre + fiche de poste).
+- Détection : événements du système de fichiers (watchdog : inotify / FSEvents / ReadDirectoryChangesW) si installé,
+  sinon scrutation du dossier toutes les INTERVALLE_S.
+- Anti-rebond : un fichier n'est lu qu'une fois stable (taille et mtime inchangées pendant DEBOUNCE_S),
+  pour ne pas traiter une copie ou un enregistrement en cours.
+- Déduplication par empreinte du texte (même empreinte que les ids d'adaptation) ; annonces déjà traitées
+  persistées dans adaptations/surveillance.json, donc ignorées après un redémarrage. Une annonce en échec
+  (ou interrompue) n'y est pas inscrite : elle est retentée au prochain démarrage.
+- Au plus CONCURRENCE annonces traitées en même temps (une seule boucle asyncio).
+python main.py --surveiller offres/ [--sortie a-cote|export] [--concurrence N] [--brouillon]
+"""
+
+import asyncio
+import html
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from inbox import EXTENSIONS_OFFRES
+from mesures import etape
+from verrous import signature, verrou_fichier
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+BASE_DIR = Path(__file__).resolve().parent
+TRAITEES_PATH = BASE_DIR / "adaptations" / "surveillance.json"
+
+DEBOUNCE_S = float(os.environ.get("CV_BOT_SURVEILLANCE_DEBOUNCE_S", "2") or 2)
+INTERVALLE_S = float(os.environ.get("CV_BOT_SURVEILLANCE_INTERVALLE_S", "2") or 2)
+CONCURRENCE = int(os.environ.get("CV_BOT_SURVEILLANCE_CONCURRENCE", "2") or 2)
+
+_RE_BALISES_IGNOREES = re.compile(r"<(script|style|head)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_RE_BLOC = re.compile(r"<\s*(?:br|/p|/div|/li|/h[1-6]|/tr)\b[^>]*>", re.IGNORECASE)
+_RE_BALISE = re.compile(r"<[^>]+>")
+
+
+def _journal(message: str) -> None:
+    print(f"[{datetime.now():%H:%M:%S}] {message}", flush=True)
+
+
+def texte_annonce(path: Path) -> str:
+    """Texte d'une annonce déposée ; pour un .html, texte visible (balises retirées, un bloc par ligne)."""
+    texte = Path(path).read_text(encoding="utf-8", errors="replace")
+    if Path(path).suffix.lower() != ".html":
+        return texte
+    texte = _RE_BALISES_IGNOREES.sub(" ", texte)
+    texte = _RE_BALISE.sub(" ", _RE_BLOC.sub("\n", texte))
+    lignes = (" ".join(html.unescape(ligne).split()) for ligne in texte.splitlines())
+    return "\n".join(ligne for ligne in lignes if ligne)
+
+
+def _eligible(path: Path) -> bool:
+    """Annonce à considérer : extension connue, pas un fichier caché ou temporaire d'éditeur."""
+    nom = path.name
+    return path.suffix.lower() in EXTENSIONS_OFFRES and not nom.startswith((".", "~")) and not nom.endswith("~")
+
+
+class Traitees:
+    """Ensemble persistant des annonces traitées : empreinte → { fichier, date, dossier, source }."""
+
+    def __init__(self, path: Path | None = None):
+        self.path = Path(path or TRAITEES_PATH)
+        self.entrees: dict[str, dict] = self._lire()
+        self._lock = threading.Lock()
+
+    def _lire(self) -> dict:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data.get("traitees") or {}
+
+    def __contains__(self, empreinte: str) -> bool:
+        return empreinte in self.entrees
+
+    def __len__(self) -> int:
+        return len(self.entrees)
+
+    def ajouter(self, empreinte: str, entree: dict) -> None:
+        """Inscrit une annonce (relecture-fusion sous verrou : plusieurs démons peuvent partager le fichier)."""
+        with self._lock, verrou_fichier(self.path):
+            self.entrees = {**self._lire(), **self.entrees, empreinte: entree}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"traitees": self.entrees}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+
+
+async def traiter_annonce(path: Path, texte: str, sortie: str = "a-cote", brouillon: bool = False, fan_out: bool | None = None) -> dict:
+    """
+    Chaîne complète pour une annonce : extraction, règles, adaptation (Gemini, repli sur les règles),
+    enregistrement dans l'historique puis dossier candidature à côté du fichier (sortie "a-cote")
+    ou sous CV_BOT_EXPORT_BASE (sortie "export"), nommé d'après le fichier de l'annonce (deux annonces de même
+    intitulé ne partagent pas de dossier). Retourne l'entrée à inscrire dans les annonces traitées.
+    """
+    from adapter import apply_tweaks_to_cv
+    from adapter_local import _entreprise_offre, _poste_offre, adapter_avec_repli_async, adapter_cv_local
+    from adaptations_db import enregistrer, nouvel_id
+    from cv_base_cache import charger
+    from export_package import export_dossier_async
+    from mots_cles import apprendre_offres, offre_from_description
+    from rules import appliquer_regles
+    from telemetrie_llm import collecte
+
+    # Relu à chaque annonce via le cache versionné : une modification de cv_base.json est prise en compte sans redémarrer
+    instantane = charger()
+    cv_base = instantane.cv
+    with etape("extraction"):
+        offre = offre_from_description(texte)
+    with etape("idf"):
+        await asyncio.to_thread(apprendre_offres, [texte])
+    with etape("regles"):
+        rapport = appliquer_regles(cv_base, offre, index=instantane.index).get("rapport", {})
+    appels_llm, erreur = [], None
+    if brouillon:
+        tweaks, source = adapter_cv_local(cv_base, offre, rapport), "regles"
+    else:
+        with collecte() as appels_llm:
+            tweaks, source, erreur = await adapter_avec_repli_async(cv_base, offre, rapport=rapport, fan_out=fan_out)
+    titre = offre.get("titre") or tweaks.get("poste_offre") or _poste_offre(offre)
+    entreprise = _entreprise_offre(offre)
+    adaptation_id = nouvel_id(texte)
+    await asyncio.to_thread(enregistrer, adaptation_id, {
+        "resume": tweaks.get("resume"),
+        "experiences": tweaks.get("experiences", []),
+        "mots_cles_cache": tweaks.get("mots_cles_cache", ""),
+        "rapport": rapport,
+        "source": source,
+        "titre": titre,
+        "entreprise": entreprise,
+        "description": texte,
+        "description_preview": texte[:200] + "..." if len(texte) > 200 else texte,
+        "llm": appels_llm,
+    })
+    cv_adapte = apply_tweaks_to_cv(cv_base, tweaks)
+    output_base = str(path.parent) if sortie == "a-cote" else None
+    resultat = await export_dossier_async(
+        cv_adapte, titre, entreprise, texte, output_base=output_base, nom_dossier=path.stem
+    )
+    return {
+        "fichier": path.name,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "adaptation_id": adaptation_id,
+        "score_global": rapport.get("score_global", 0),
+        "source": source,
+        "repli": erreur,
+        "dossier": resultat.get("folder"),
+    }
+
+
+class Surveillant:
+    """Surveille un dossier (non récursif) et passe chaque nouvelle annonce stable à `traiter` (coroutine)."""
+
+    def __init__(
+        self,
+        dossier: Path,
+        traiter,
+        traitees: Traitees | None = None,
+        concurrence: int = CONCURRENCE,
+        debounce_s: float = DEBOUNCE_S,
+        intervalle_s: float = INTERVALLE_S,
+        evenements: bool | None = None,
+    ):
+        self.dossier = Path(dossier).resolve()
+        self.traiter = traiter
+        self.traitees = traitees if traitees is not None else Traitees()
+        self.concurrence = max(1, concurrence)
+        self.debounce_s = debounce_s
+        self.intervalle_s = intervalle_s
+        # None : événements si watchdog est installé, sinon scrutation
+        self.evenements = Observer is not None if evenements is None else (evenements and Observer is not None)
+        self._en_attente: dict[Path, tuple] = {}  # fichier → (signature, instant du dernier changement)
+        self._vus: dict[Path, tuple] = {}  # fichier → signature déjà prise en compte
+        self._en_cours: set[str] = set()
+        self._taches: set[asyncio.Task] = set()
+        self._semaphore: asyncio.Semaphore | None = None
+
+    def signaler(self, path: Path) -> None:
+        """Un fichier a (peut-être) changé : il sera lu une fois stable pendant debounce_s."""
+        path = Path(path)
+        if path.parent != self.dossier or not _eligible(path):
+            return
+        sig = signature(path)
+        if sig is None:
+            self._en_attente.pop(path, None)
+            return
+        if sig == self._vus.get(path):
+            return
+        precedent = self._en_attente.get(path)
+        if precedent is None or precedent[0] != sig:
+            self._en_attente[path] = (sig, time.monotonic())
+
+    def scruter(self) -> None:
+        """Parcourt le dossier (démarrage, et à chaque intervalle en l'absence d'événements)."""
+        try:
+            fichiers = [f for f in self.dossier.iterdir() if f.is_file()]
+        except OSError:
+            return
+        for f in fichiers:
+            self.signaler(f)
+
+    def _stables(self) -> list[Path]:
+        """Fichiers en attente dont la signature n'a pas bougé depuis debounce_s."""
+        maintenant, prets = time.monotonic(), []
+        for path, (sig, depuis) in list(self._en_attente.items()):
+            actuelle = signature(path)
+            if actuelle is None:
+                del self._en_attente[path]
+            elif actuelle != sig:
+                self._en_attente[path] = (actuelle, maintenant)
+            elif maintenant - depuis >= self.debounce_s:
+                del self._en_attente[path]
+                self._vus[path] = sig
+                prets.append(path)
+        return prets
+
+    def _lancer(self, path: Path) -> None:
+        from adaptations_db import hash_description
+
+        try:
+            texte = texte_annonce(path)
+        except OSError as e:
+            _journal(f"✗ {path.name} : lecture impossible ({e})")
+            return
+        if not texte.strip():
+            return
+        empreinte = hash_description(texte)
+        if empreinte in self.traitees or empreinte in self._en_cours:
+            _journal(f"= {path.name} : annonce déjà traitée ({empreinte})")
+            return
+        self._en_cours.add(empreinte)
+        tache = asyncio.create_task(self._traiter(path, texte, empreinte))
+        self._taches.add(tache)
+        tache.add_done_callback(self._taches.discard)
+
+    async def _traiter(self, path: Path, texte: str, empreinte: str) -> None:
+        try:
+            async with self._semaphore:
+                _journal(f"→ {path.name} ({empreinte})")
+                t0 = time.perf_counter()
+                entree = await self.traiter(path, texte)
+            await asyncio.to_thread(self.traitees.ajouter, empreinte, entree)
+            repli = f", règles : {entree['repli']}" if entree.get("repli") else ""
+            _journal(f"✓ {path.name} en {time.perf_counter() - t0:.1f} s → {entree.get('dossier')}{repli}")
+        except Exception as e:
+            message = str(e).splitlines()[0] if str(e) else type(e).__name__
+            _journal(f"✗ {path.name} : {message} (nouvel essai au prochain démarrage ou si le fichier change)")
+        finally:
+            self._en_cours.discard(empreinte)
+
+    def _observer(self, boucle: asyncio.AbstractEventLoop):
+        surveillant = self
+
+        class _Gestionnaire(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                # Création, écriture, renommage (fichier écrit ailleurs puis déplacé) : chemin final
+                for chemin in (getattr(event, "dest_path", None), event.src_path):
+                    if chemin:
+                        boucle.call_soon_threadsafe(surveillant.signaler, Path(os.fsdecode(chemin)))
+
+        observer = Observer()
+        observer.schedule(_Gestionnaire(), str(self.dossier), recursive=False)
+        observer.daemon = True
+        observer.start()
+        return observer
+
+    async def executer(self, arret: asyncio.Event | None = None) -> None:
+        """Boucle principale (jusqu'à `arret` ou annulation) ; les annonces déjà présentes sont traitées d'abord."""
+        self._semaphore = asyncio.Semaphore(self.concurrence)
+        observer = self._observer(asyncio.get_running_loop()) if self.evenements else None
+        pas = min(0.25, self.debounce_s / 4) if self.debounce_s else 0.05
+        prochaine_scrutation = 0.0
+        try:
+            while arret is None or not arret.is_set():
+                if observer is None and time.monotonic() >= prochaine_scrutation:
+                    self.scruter()
+                    prochaine_scrutation = time.monotonic() + self.intervalle_s
+                elif prochaine_scrutation == 0.0:
+                    self.scruter()
+                    prochaine_scrutation = float("inf")
+                for path in self._stables():
+                    self._lancer(path)
+                await asyncio.sleep(pas)
+            if self._taches:
+                await asyncio.gather(*self._taches, return_exceptions=True)
+        finally:
+            if observer is not None:
+                observer.stop()
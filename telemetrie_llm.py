@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Télémétrie des appels LLM (Gemini) : modèle, tokens (entrée, sortie, cache, réflexion), latence, tentative, cache.
+- appel(operation, modele, texte_offre) : context manager autour d'un generate_content ; la réponse est passée
+  via `a.reponse = r` pour lire r.usage_metadata. Une exception (quota, annulation par budget…) est aussi journalisée.
+- Chaque appel est ajouté au journal tournant adaptations/llm_journal.jsonl (archivé en .1.jsonl au-delà de
+  JOURNAL_MAX_OCTETS) et à la collecte en cours (contextvars) : l'adaptation l'enregistre dans sa clé "llm".
+- reponse_en_cache(operation, modele, texte_offre) : réponse servie par un cache applicatif (cache_lettres) au lieu
+  d'un appel ; journalisée avec zéro token et "depuis_cache": true, comptée à part des appels.
+- resume(jours) : latence p50/p95, tokens par annonce, totaux par jour (python main.py --llm-stats, GET /api/llm/stats).
+Appels non streamés : aucun premier token distinct de la réponse complète, ttft_ms vaut null.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+JOURNAL_PATH = BASE_DIR / "adaptations" / "llm_journal.jsonl"
+JOURNAL_MAX_OCTETS = int(os.environ.get("CV_BOT_LLM_JOURNAL_MAX_OCTETS", str(5 * 1024 * 1024)) or 5 * 1024 * 1024)
+
+_collecte: ContextVar[list | None] = ContextVar("cv_bot_appels_llm", default=None)
+_tentative: ContextVar[int] = ContextVar("cv_bot_tentative_llm", default=0)
+_lock = threading.Lock()
+
+# Champs de usage_metadata (google-genai) → clés du journal
+_USAGE = (
+    ("prompt_token_count", "tokens_entree"),
+    ("candidates_token_count", "tokens_sortie"),
+    ("cached_content_token_count", "tokens_cache"),
+    ("thoughts_token_count", "tokens_reflexion"),
+)
+
+
+class _Appel:
+    """Un appel LLM en cours ; l'appelant renseigne .reponse (objet GenerateContentResponse)."""
+
+    __slots__ = ("operation", "modele", "offre", "tentative", "reponse", "debut")
+
+    def __init__(self, operation: str, modele: str, offre: str, tentative: int):
+        self.operation = operation
+        self.modele = modele
+        self.offre = offre
+        self.tentative = tentative
+        self.reponse = None
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        usage = getattr(self.reponse, "usage_metadata", None)
+        entree = _entree(self.operation, self.modele, self.offre, self.tentative, time.perf_counter() - self.debut)
+        for attribut, cle in _USAGE:
+            entree[cle] = int(getattr(usage, attribut, None) or 0)
+        entree["cache"] = entree["tokens_cache"] > 0
+        entree["ok"] = exc_type is None
+        entree["erreur"] = None
+        if exc_type is not None:
+            message = str(exc).splitlines()[0] if str(exc) else ""
+            entree["erreur"] = f"{exc_type.__name__}: {message}" if message else exc_type.__name__
+        enregistrer(entree)
+        return False
+
+
+def _entree(operation: str, modele: str, offre: str, tentative: int, duree_s: float, depuis_cache: bool = False) -> dict:
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "operation": operation,
+        "modele": modele,
+        "offre": offre,
+        "tentative": tentative,
+        "latence_ms": round(duree_s * 1000, 1),
+        "ttft_ms": None,  # appels non streamés
+        "depuis_cache": depuis_cache,
+    }
+
+
+def appel(operation: str, modele: str, texte_offre: str = "", tentative: int = 0) -> _Appel:
+    """
+    Mesure un appel LLM. operation : "adaptation", "adaptation.section", "lettre"… ; texte_offre : annonce
+    concernée (seule son empreinte est journalisée) ; tentative : 0 pour le premier essai, +1 par nouvel essai.
+    """
+    from adaptations_db import hash_description
+    return _Appel(operation, modele, hash_description(texte_offre), tentative + _tentative.get())
+
+
+def reponse_en_cache(operation: str, modele: str, texte_offre: str = "", duree_s: float = 0.0) -> None:
+    """Journalise une réponse servie par un cache applicatif au lieu d'un appel (zéro token ; duree_s : lecture du cache)."""
+    from adaptations_db import hash_description
+
+    entree = _entree(operation, modele, hash_description(texte_offre), 0, duree_s, depuis_cache=True)
+    entree.update({cle: 0 for _, cle in _USAGE}, cache=True, ok=True, erreur=None)
+    enregistrer(entree)
+
+
+@contextmanager
+def reessai(n: int = 1):
+    """Les appels faits dans ce bloc sont journalisés comme la n-ième nouvelle tentative (ex. après une erreur 429)."""
+    jeton = _tentative.set(_tentative.get() + n)
+    try:
+        yield
+    finally:
+        _tentative.reset(jeton)
+
+
+@contextmanager
+def collecte():
+    """Collecte les appels faits dans ce contexte (threads / tâches asyncio compris) : with collecte() as appels: …"""
+    appels: list = []
+    jeton = _collecte.set(appels)
+    try:
+        yield appels
+    finally:
+        _collecte.reset(jeton)
+
+
+def enregistrer(entree: dict, path: Path | None = None) -> None:
+    """Ajoute un appel à la collecte en cours et au journal (rotation sous verrou inter-processus)."""
+    from verrous import verrou_fichier
+
+    appels = _collecte.get()
+    if appels is not None:
+        appels.append(entree)
+    path = Path(path or JOURNAL_PATH)
+    ligne = json.dumps(entree, ensure_ascii=False, separators=(",", ":")) + "\n"
+    try:
+        with _lock, verrou_fichier(path):
+            if path.exists() and path.stat().st_size + len(ligne) > JOURNAL_MAX_OCTETS:
+                os.replace(path, _archive(path))
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(ligne)
+    except OSError:
+        # La télémétrie ne doit jamais faire échouer une adaptation
+        pass
+
+
+def _archive(path: Path) -> Path:
+    return path.with_name(path.name.replace(".jsonl", ".1.jsonl"))
+
+
+def lire(jours: int | None = None, path: Path | None = None) -> list[dict]:
+    """Appels journalisés (archive puis journal courant), éventuellement limités aux `jours` derniers jours."""
+    path = Path(path or JOURNAL_PATH)
+    depuis = (datetime.now() - timedelta(days=jours)).isoformat(timespec="seconds") if jours else ""
+    appels = []
+    for fichier in (_archive(path), path):
+        try:
+            with open(fichier, encoding="utf-8") as f:
+                for ligne in f:
+                    try:
+                        entree = json.loads(ligne)
+                    except ValueError:
+                        continue  # ligne tronquée (arrêt brutal pendant une écriture)
+                    if entree.get("date", "") >= depuis:
+                        appels.append(entree)
+        except OSError:
+            continue
+    return appels
+
+
+def _percentile(valeurs: list[float], p: float) -> float | None:
+    """Percentile au rang le plus proche (valeurs déjà triées)."""
+    if not valeurs:
+        return None
+    rang = max(1, -(-len(valeurs) * p // 100))
+    return valeurs[int(rang) - 1]
+
+
+def _stats(entrees: list[dict]) -> dict:
+    """Compteurs et latences des appels réels ; les réponses servies par un cache sont seulement comptées (depuis_cache)."""
+    appels = [a for a in entrees if not a.get("depuis_cache")]
+    latences = sorted(a["latence_ms"] for a in appels if a.get("ok"))
+    return {
+        "appels": len(appels),
+        "depuis_cache": len(entrees) - len(appels),
+        "erreurs": sum(1 for a in appels if not a.get("ok")),
+        "nouvelles_tentatives": sum(1 for a in appels if a.get("tentative")),
+        "cache": sum(1 for a in appels if a.get("cache")),
+        "latence_p50_ms": _percentile(latences, 50),
+        "latence_p95_ms": _percentile(latences, 95),
+        "tokens_entree": sum(a.get("tokens_entree", 0) for a in appels),
+        "tokens_sortie": sum(a.get("tokens_sortie", 0) for a in appels),
+        "tokens_cache": sum(a.get("tokens_cache", 0) for a in appels),
+    }
+
+
+def resume(jours: int | None = None, path: Path | None = None) -> dict:
+    """
+    Synthèse du journal : totaux et latence p50/p95 (appels réussis), détail par opération et par modèle,
+    tokens moyens par annonce (toutes opérations d'une même annonce cumulées) et totaux par jour.
+    """
+    appels = lire(jours, path)
+    par_operation, par_modele, par_jour, par_offre = defaultdict(list), defaultdict(list), defaultdict(list), defaultdict(int)
+    for a in appels:
+        par_operation[a.get("operation", "?")].append(a)
+        par_modele[a.get("modele", "?")].append(a)
+        par_jour[a.get("date", "")[:10]].append(a)
+        if not a.get("depuis_cache"):
+            par_offre[a.get("offre", "")] += a.get("tokens_entree", 0) + a.get("tokens_sortie", 0)
+    tokens_offres = sorted(par_offre.values())
+    return {
+        "jours": jours,
+        **_stats(appels),
+        "offres": len(par_offre),
+        "tokens_par_offre_moyenne": round(sum(tokens_offres) / len(tokens_offres)) if tokens_offres else 0,
+        "tokens_par_offre_p95": _percentile(tokens_offres, 95) or 0,
+        "par_operation": {op: _stats(liste) for op, liste in sorted(par_operation.items())},
+        "par_modele": {m: _stats(liste) for m, liste in sorted(par_modele.items())},
+        "par_jour": [{"jour": jour, **_stats(liste)} for jour, liste in sorted(par_jour.items())],
+    }
@@ -0,0 +1,18 @@
+"""Base des adaptations : deux adaptations de la même annonce ne s'écrasent pas."""
+
+import adaptations_db
+import artefacts
+
+
+def test_meme_annonce_adaptee_deux_fois(tmp_path, monkeypatch):
+    monkeypatch.setattr(artefacts, "ARTEFACTS_DIR", tmp_path / "artefacts")
+    db = tmp_path / "adaptations.db"
+    description = "Analyste risque de crédit (H/F)"
+    ids = [adaptations_db.nouvel_id(description) for _ in range(2)]
+    assert ids[0] != ids[1]
+    for i, adaptation_id in enumerate(ids):
+        adaptations_db.enregistrer(adaptation_id, {"description": description, "resume": f"v{i}", "source": "regles"}, path=db)
+
+    trouves = adaptations_db.rechercher(description_hash=adaptations_db.hash_description(description), path=db)
+    assert trouves["total"] == 2
+    assert {adaptations_db.obtenir(i, path=db)["payload"]["resume"] for i in ids} == {"v0", "v1"}
@@ -0,0 +1,70 @@
+"""JSON Patch (RFC 6902) d'apercu.appliquer_patch : exemples de l'annexe A et cas d'erreur."""
+
+import pytest
+
+from apercu import appliquer_patch
+
+
+@pytest.mark.parametrize("doc, patch, attendu", [
+    # A.1 / A.2 : ajout d'une clé, insertion dans une liste
+    ({"foo": "bar"}, [{"op": "add", "path": "/baz", "value": "qux"}], {"foo": "bar", "baz": "qux"}),
+    ({"foo": ["bar", "baz"]}, [{"op": "add", "path": "/foo/1", "value": "qux"}], {"foo": ["bar", "qux", "baz"]}),
+    ({"foo": ["bar"]}, [{"op": "add", "path": "/foo/-", "value": ["abc"]}], {"foo": ["bar", ["abc"]]}),
+    ({"foo": ["bar"]}, [{"op": "add", "path": "/foo/1", "value": "fin"}], {"foo": ["bar", "fin"]}),
+    ({"foo": "bar"}, [{"op": "add", "path": "/foo", "value": "remplacé"}], {"foo": "remplacé"}),
+    # A.3 / A.4 : retrait
+    ({"baz": "qux", "foo": "bar"}, [{"op": "remove", "path": "/baz"}], {"foo": "bar"}),
+    ({"foo": ["bar", "qux", "baz"]}, [{"op": "remove", "path": "/foo/1"}], {"foo": ["bar", "baz"]}),
+    # A.5 : remplacement, y compris du document entier
+    ({"baz": "qux", "foo": "bar"}, [{"op": "replace", "path": "/baz", "value": "boo"}], {"baz": "boo", "foo": "bar"}),
+    ({"a": 1}, [{"op": "replace", "path": "", "value": {"b": 2}}], {"b": 2}),
+    # A.6 / A.7 : déplacement
+    (
+        {"foo": {"bar": "baz", "waldo": "fred"}, "qux": {"corge": "grault"}},
+        [{"op": "move", "from": "/foo/waldo", "path": "/qux/thud"}],
+        {"foo": {"bar": "baz"}, "qux": {"corge": "grault", "thud": "fred"}},
+    ),
+    ({"foo": ["all", "grass", "cows", "eat"]}, [{"op": "move", "from": "/foo/1", "path": "/foo/3"}], {"foo": ["all", "cows", "eat", "grass"]}),
+    # Copie (indépendante de la source)
+    ({"a": {"x": [1]}}, [{"op": "copy", "from": "/a", "path": "/b"}, {"op": "add", "path": "/b/x/-", "value": 2}], {"a": {"x": [1]}, "b": {"x": [1, 2]}}),
+    # A.8 / A.14 / A.16 : test réussi, échappement ~0 ~1
+    ({"baz": "qux", "foo": ["a", 2, "c"]}, [{"op": "test", "path": "/baz", "value": "qux"}, {"op": "test", "path": "/foo/1", "value": 2}], {"baz": "qux", "foo": ["a", 2, "c"]}),
+    ({"/": 9, "~1": 10}, [{"op": "test", "path": "/~01", "value": 10}, {"op": "remove", "path": "/~1"}], {"~1": 10}),
+    # A.10 : ajout d'un objet imbriqué
+    ({"foo": "bar"}, [{"op": "add", "path": "/child", "value": {"grandchild": {}}}], {"foo": "bar", "child": {"grandchild": {}}}),
+])
+def test_operations(doc, patch, attendu):
+    assert appliquer_patch(doc, patch) == attendu
+
+
+@pytest.mark.parametrize("doc, patch", [
+    ({"baz": "qux"}, [{"op": "test", "path": "/baz", "value": "bar"}]),           # A.9 : test échoué
+    ({"foo": "bar"}, [{"op": "add", "path": "/baz/bat", "value": "qux"}]),         # A.12 : parent absent
+    ({"foo": ["bar", "baz"]}, [{"op": "add", "path": "/foo/3", "value": "x"}]),    # indice au-delà de la fin
+    ({"foo": ["bar"]}, [{"op": "remove", "path": "/foo/1"}]),
+    ({"foo": ["bar"]}, [{"op": "replace", "path": "/foo/01", "value": 1}]),        # zéro initial
+    ({"foo": ["bar"]}, [{"op": "remove", "path": "/foo/-"}]),
+    ({"foo": 1}, [{"op": "remove", "path": "/absent"}]),
+    ({"foo": 1}, [{"op": "replace", "path": "/absent", "value": 2}]),
+    ({"foo": 1}, [{"op": "add", "path": "/bar"}]),                                 # valeur manquante
+    ({"foo": 1}, [{"op": "move", "path": "/bar"}]),                                # « from » manquant
+    ({"foo": 1}, [{"op": "copy", "from": "/absent", "path": "/bar"}]),
+    ({"a": {"b": {}}}, [{"op": "move", "from": "/a", "path": "/a/b/c"}]),         # §4.4 : dans son propre enfant
+    ({"a": {"b": {}}}, [{"op": "move", "from": "", "path": "/a/x"}]),             # racine dans un enfant
+    ({"foo": 1}, [{"op": "frobnicate", "path": "/foo"}]),
+    ({"foo": 1}, [{"op": "add", "path": "foo", "value": 2}]),                      # pointeur sans « / »
+    ({"foo": 1}, [{"op": "remove", "path": ""}]),
+    ({"foo": 1}, [{"op": "replace", "path": "", "value": [1]}]),                   # le CV doit rester un objet
+    ({"foo": 1}, [{"op": "add"}]),
+    ({"foo": 1}, {"op": "add", "path": "/x", "value": 1}),                         # pas une liste
+])
+def test_erreurs(doc, patch):
+    with pytest.raises(ValueError):
+        appliquer_patch(doc, patch)
+
+
+def test_document_inchange_si_erreur():
+    doc = {"foo": ["bar"], "n": 1}
+    with pytest.raises(ValueError):
+        appliquer_patch(doc, [{"op": "replace", "path": "/n", "value": 2}, {"op": "remove", "path": "/foo/5"}])
+    assert doc == {"foo": ["bar"], "n": 1}
@@ -0,0 +1,46 @@
+"""Magasin d'artefacts : une référence posée par stocker ne doit jamais pointer vers un contenu collecté par gc."""
+
+import threading
+
+import artefacts
+
+
+def test_stocker_et_gc_concurrents(tmp_path):
+    dossier = tmp_path / "artefacts"
+    contenus = [f"pdf {i}".encode() * 500 for i in range(4)]
+    arret = threading.Event()
+
+    def ramasser():
+        while not arret.is_set():
+            artefacts.gc(dossier)
+
+    def exporter(k):
+        for i in range(150):
+            proprietaire = f"export:{k}"
+            artefacts.dereferencer(proprietaire, dossier)
+            h = artefacts.stocker(contenus[i % len(contenus)], "application/pdf", dossier, proprietaire=proprietaire, nom="cv.pdf")
+            assert artefacts.lire(h, dossier) == contenus[i % len(contenus)]
+            artefacts.materialiser(h, tmp_path / f"sortie{k}" / "cv.pdf", mode="lien", dossier=dossier)
+
+    gc = threading.Thread(target=ramasser)
+    gc.start()
+    exportateurs = [threading.Thread(target=exporter, args=(k,)) for k in range(3)]
+    for t in exportateurs:
+        t.start()
+    for t in exportateurs:
+        t.join()
+    arret.set()
+    gc.join()
+
+    for k in range(3):
+        refs = artefacts.references(f"export:{k}", dossier)
+        assert artefacts.lire(refs["cv.pdf"], dossier) is not None
+
+
+def test_gc_supprime_les_orphelins(tmp_path):
+    dossier = tmp_path / "artefacts"
+    garde = artefacts.stocker("gardé", dossier=dossier, proprietaire="a", nom="x")
+    orphelin = artefacts.stocker("orphelin", dossier=dossier)
+    assert artefacts.gc(dossier)[0] == 1
+    assert artefacts.lire(orphelin, dossier) is None
+    assert artefacts.lire_texte(garde, dossier) == "gardé"
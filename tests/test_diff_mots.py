@@ -0,0 +1,118 @@
+"""Le surlignage mémoïsé / par lot doit rester identique à l'ancien _diff_highlight_html (SequenceMatcher)."""
+
+import html
+import random
+from difflib import SequenceMatcher
+
+import pytest
+
+import diff_mots
+
+
+def _reference(base: str, current: str) -> str:
+    """Ancien app._diff_highlight_html, recopié tel quel."""
+    base = (base or "").strip()
+    current = (current or "").strip()
+    if base == current:
+        return html.escape(current)
+    base_words = base.split()
+    current_words = current.split()
+    if not current_words:
+        return ""
+    matcher = SequenceMatcher(None, base_words, current_words)
+    out = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        segment = current_words[j1:j2]
+        if not segment:
+            continue
+        text = " ".join(segment)
+        escaped = html.escape(text)
+        if tag == "equal":
+            out.append(escaped)
+        else:
+            out.append(f'<span class="cv-changed">{escaped}</span>')
+    return " ".join(out)
+
+
+def _texte_modifie(rng: random.Random, mots: list[str], vocab: list[str], taux: float) -> list[str]:
+    out = []
+    for m in mots:
+        r = rng.random()
+        if r < taux / 3:
+            continue
+        if r < 2 * taux / 3:
+            out.append(rng.choice(vocab))
+        elif r < taux:
+            out.extend([m, rng.choice(vocab)])
+        else:
+            out.append(m)
+    return out
+
+
+@pytest.fixture(autouse=True)
+def _cache_vide():
+    diff_mots._cache.clear()
+    yield
+    diff_mots._cache.clear()
+
+
+def test_aleatoire_mots_repetes():
+    rng = random.Random(0)
+    vocab = ["le", "la", "de", "risque", "<b>", "a&b", "analyse", "client"]
+    for _ in range(3000):
+        base = [rng.choice(vocab) for _ in range(rng.randint(0, 25))]
+        courant = _texte_modifie(rng, base, vocab, rng.random())
+        b, c = " ".join(base), " ".join(courant)
+        attendu = _reference(b, c)
+        assert diff_mots.diff_highlight_html(b, c) == attendu
+        assert diff_mots.diff_highlight_html(b, c) == attendu  # depuis le cache
+
+
+@pytest.mark.parametrize("n_mots", [150, 250, 800])
+def test_textes_longs_autojunk(n_mots):
+    rng = random.Random(n_mots)
+    vocab = [f"mot{i}" for i in range(40)] + ["de", "la", "et"] * 10
+    base = [rng.choice(vocab) for _ in range(n_mots)]
+    courant = _texte_modifie(rng, base, vocab, 0.1)
+    b, c = " ".join(base), " ".join(courant)
+    assert diff_mots.diff_highlight_html(b, c) == _reference(b, c)
+
+
+def test_lot_identique_aux_appels_unitaires():
+    rng = random.Random(1)
+    vocab = "analyse risque données reporting client projet pilotage".split()
+    paires = []
+    for _ in range(200):
+        base = [rng.choice(vocab) for _ in range(rng.randint(0, 15))]
+        paires.append((" ".join(base), " ".join(_texte_modifie(rng, base, vocab, 0.4))))
+    paires += paires[:20]
+    assert diff_mots.diff_highlight_lot(paires) == [_reference(b, c) for b, c in paires]
+
+
+def test_cv_benchmark():
+    from benchmark import cv_modifie, cv_synthetique
+
+    base_cv = cv_synthetique(16)
+    cv = cv_modifie(base_cv)
+    paires = [(base_cv.get("resume", ""), cv.get("resume", ""))]
+    base_par_id = {e["id"]: e for e in base_cv["experiences"]}
+    for exp in cv["experiences"]:
+        base_bullets = base_par_id.get(exp["id"], {}).get("bullet_points") or []
+        for j, b in enumerate(exp.get("bullet_points") or []):
+            paires.append((base_bullets[j] if j < len(base_bullets) else "", b))
+    assert len(paires) > 50
+    assert diff_mots.diff_highlight_lot(paires) == [_reference(b, c) for b, c in paires]
+
+
+def test_lot_partage_le_decoupage_et_le_cache(monkeypatch):
+    appels = []
+    calculer = diff_mots._calculer
+    monkeypatch.setattr(diff_mots, "_calculer", lambda b, c, bw=None, cw=None: (appels.append((bw, cw)), calculer(b, c, bw, cw))[1])
+    original = "Analyse des risques de crédit"
+    paires = [(original, "Analyse des risques de marché"), (original, "Suivi des risques de crédit"), (original, original)]
+    assert diff_mots.diff_highlight_lot(paires) == [_reference(b, c) for b, c in paires]
+    assert len(appels) == 3
+    assert appels[0][0] is appels[1][0]  # l'original n'est découpé qu'une fois
+    appels.clear()
+    diff_mots.diff_highlight_lot(paires)
+    assert appels == []
@@ -0,0 +1,34 @@
+"""Index IDF : lecture servie depuis le cache tant que rien ne change, apprentissage hors du chemin de la requête."""
+
+import json
+import time
+
+import idf
+import mots_cles
+
+
+def test_charger_ne_relit_le_journal_que_s_il_change(tmp_path, monkeypatch):
+    path = tmp_path / "idf_index.json.gz"
+    idf.ajouter_documents([({"risque", "audit"}, "a"), ({"sql"}, "b")], path)
+    rejeux = []
+    rejouer = idf._rejouer_journal
+    monkeypatch.setattr(idf, "_rejouer_journal", lambda p: (rejeux.append(p), rejouer(p)))
+
+    for _ in range(50):
+        assert idf.charger(path).n_docs == 2
+    assert rejeux == []
+
+    # Ajout par un autre processus : la taille du journal change, l'entrée est rejouée
+    with open(idf._chemin_journal(path), "ab") as f:
+        f.write((json.dumps({"cle": "c", "termes": ["python"]}) + "\n").encode("utf-8"))
+    assert idf.charger(path).n_docs == 3
+    assert len(rejeux) == 1
+
+
+def test_apprendre_offres_en_fond(tmp_path, monkeypatch):
+    monkeypatch.setattr(idf, "IDF_PATH", tmp_path / "idf_index.json.gz")
+    mots_cles.apprendre_offres_en_fond(["Analyste risque de crédit, Python et SQL", "Auditeur interne", "  "])
+    fin = time.monotonic() + 5
+    while idf.charger().n_docs < 2 and time.monotonic() < fin:
+        time.sleep(0.01)
+    assert idf.charger().n_docs == 2
@@ -0,0 +1,23 @@
+"""Normalisation des mots-clés : les exemples des docstrings doivent rester vrais."""
+
+import pytest
+
+from normalisation import normaliser_terme, normaliser_token, replier_accents
+
+
+def test_normaliser_terme_exemple_docstring():
+    assert normaliser_terme("Gestion des Risques") == "gestion des risqu"
+
+
+@pytest.mark.parametrize(
+    "a, b",
+    [("risques", "risque"), ("contrôle", "controle"), ("analyste", "analyse"), ("réseaux", "réseau"), ("commerciaux", "commercial")],
+)
+def test_variantes_regroupees(a, b):
+    assert normaliser_token(a) == normaliser_token(b)
+
+
+def test_mots_courts_conserves():
+    assert normaliser_token("des") == "des"
+    assert normaliser_token("Bâle") == "bal"
+    assert replier_accents("Contrôle Général") == "controle general"
@@ -0,0 +1,43 @@
+"""Choix des bullets affichés : la clé de cache d'un CV issu de cv_base_cache ne sérialise que ce qui a changé."""
+
+import copy
+import json
+
+import cv_base_cache
+import pertinence
+from adapter import apply_tweaks_to_cv
+
+
+def _cv():
+    return {
+        "prenom": "Camille",
+        "nom": "Martin",
+        "experiences": [
+            {"id": f"e{i}", "bullet_points": [f"Suivi du reporting {i}", f"Analyse des risques de crédit {i}", f"Audit interne {i}"]}
+            for i in range(8)
+        ],
+    }
+
+
+def test_cle_partagee_avec_l_instantane(tmp_path, monkeypatch):
+    monkeypatch.setattr(cv_base_cache, "_courant", None)
+    path = tmp_path / "cv_base.json"
+    path.write_text(json.dumps(_cv()), encoding="utf-8")
+    base = cv_base_cache.charger(path).cv
+    tweaks = {"mots_cles_cache": "risques crédit audit", "experiences": [{"id": "e3", "bullet_points": ["Pilotage ALM et risques"]}]}
+    merged = apply_tweaks_to_cv(base, tweaks)
+
+    hachees = []
+    empreinte = pertinence._empreinte
+    monkeypatch.setattr(pertinence, "_empreinte", lambda exps: (hachees.append(len(exps)), empreinte(exps))[1])
+    choix = pertinence.choisir_affichage(merged)
+    assert hachees == [1]  # seule l'expérience modifiée est sérialisée
+
+    # Même résultat que pour une copie profonde (aucune expérience partagée)
+    pertinence._cache.clear()
+    profond = pertinence.choisir_affichage(copy.deepcopy(merged))
+    assert [(e["id"], i) for e, i in choix] == [(e["id"], i) for e, i in profond]
+
+    # Une autre modification donne une autre clé
+    autre = apply_tweaks_to_cv(base, {**tweaks, "experiences": [{"id": "e3", "bullet_points": ["Autre texte"]}]})
+    assert pertinence._cle_cv(autre["experiences"]) != pertinence._cle_cv(merged["experiences"])
@@ -0,0 +1,25 @@
+"""Télémétrie LLM : ttft nul hors streaming, réponses du cache de lettres comptées à part des appels."""
+
+import cache_lettres
+import letter_generator
+import telemetrie_llm
+
+
+def test_appel_non_streame_et_lettre_en_cache(tmp_path, monkeypatch):
+    journal = tmp_path / "llm_journal.jsonl"
+    monkeypatch.setattr(telemetrie_llm, "JOURNAL_PATH", journal)
+    monkeypatch.setattr(cache_lettres, "DB_PATH", tmp_path / "lettres.db")
+
+    with telemetrie_llm.appel("adaptation", "gemini-test", "annonce"):
+        pass
+    cv, fiche = {"prenom": "Camille", "nom": "Martin", "resume": "Analyste"}, "Analyste risque de crédit"
+    cache_lettres.enregistrer(letter_generator._cle_lettre(cv, fiche, "Analyste", "Banque"), "Madame, Monsieur…")
+    with telemetrie_llm.collecte() as appels:
+        assert letter_generator.generer_corps_lettre(cv, fiche, "Analyste", "Banque") == "Madame, Monsieur…"
+
+    assert len(appels) == 1 and appels[0]["depuis_cache"] and appels[0]["tokens_entree"] == 0
+    entrees = telemetrie_llm.lire(path=journal)
+    assert [e["ttft_ms"] for e in entrees] == [None, None]
+    s = telemetrie_llm.resume(path=journal)
+    assert (s["appels"], s["depuis_cache"]) == (1, 1)
+    assert s["par_operation"]["lettre"]["latence_p50_ms"] is None
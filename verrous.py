@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Verrou exclusif inter-processus sur un fichier d'état partagé (adaptations/inbox.json, index IDF, …),
+pour les lectures-modifications-écritures faites par plusieurs workers WSGI ou par le CLI en parallèle du serveur.
+Verrou posé sur un fichier compagnon <nom>.lock (fcntl.flock sous Linux/macOS, msvcrt.locking sous Windows).
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def verrou_fichier(path: Path):
+    """Bloque jusqu'à obtenir le verrou exclusif de path (le fichier lui-même n'a pas besoin d'exister)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(f"{path.name}.lock"), "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            return
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def signature(path: Path) -> tuple | None:
+    """(mtime_ns, taille) du fichier, ou None s'il n'existe pas : détecte une écriture par un autre processus."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Point d'entrée de production (à la place du serveur de debug de `python app.py`).
+- Linux / macOS : gunicorn -c gunicorn.conf.py wsgi:app  (plusieurs workers, app préchargée avant le fork)
+- Windows : python wsgi.py  (waitress, un processus multi-thread ; gunicorn n'existe pas sous Windows)
+Réglages par variables d'environnement : CV_BOT_BIND, CV_BOT_WORKERS, CV_BOT_THREADS, CV_BOT_TIMEOUT (voir .env.example).
+"""
+
+import os
+
+from app import app, precharger
+
+precharger()
+
+
+def _serve_waitress() -> None:
+    from waitress import serve
+    bind = os.environ.get("CV_BOT_BIND", "127.0.0.1:5000")
+    threads = int(os.environ.get("CV_BOT_THREADS", "8"))
+    timeout = int(os.environ.get("CV_BOT_TIMEOUT", "180"))
+    print(f"cv-bot : waitress sur http://{bind} ({threads} threads)")
+    serve(app, listen=bind, threads=threads, channel_timeout=timeout)
+
+
+if __name__ == "__main__":
+    _serve_waitress()